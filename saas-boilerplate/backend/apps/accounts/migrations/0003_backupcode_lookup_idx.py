@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_backupcode_updated_at_totpdevice_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='backupcode',
+            index=models.Index(fields=['user', 'code_hash'], name='accounts_backupcode_lookup_idx'),
+        ),
+    ]
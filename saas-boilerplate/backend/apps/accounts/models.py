@@ -2,7 +2,9 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.contrib.auth.hashers import make_password, check_password
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.utils.crypto import constant_time_compare, salted_hmac
 import secrets
 import pyotp
 from .managers import UserManager
@@ -109,7 +111,19 @@ class BackupCode(UUIDModel, TimeStampedModel):
     """
     Backup codes for account recovery when TOTP device is unavailable.
     Codes are hashed before storage for security.
+
+    Codes are random, so a keyed HMAC-SHA256 with a server pepper is enough
+    to protect them at rest. The digest is deterministic, which lets a code
+    be found and consumed with one indexed UPDATE instead of running a slow
+    password hash against every unused code.
     """
+    CODE_ALPHABET = '0123456789ABCDEF'
+    CODE_LENGTH = 8
+    CODE_HASH_PREFIX = 'hmac_sha256$'
+    CODE_HMAC_SALT = 'apps.accounts.BackupCode.code'
+    # Codes are issued ten at a time; bounds the legacy check_password loop
+    LEGACY_BATCH_LIMIT = 10
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='backup_codes')
     code_hash = models.CharField(max_length=255, help_text=_('Hashed backup code'))
     used = models.BooleanField(default=False)
@@ -118,6 +132,9 @@ class BackupCode(UUIDModel, TimeStampedModel):
     class Meta:
         verbose_name = _('backup code')
         verbose_name_plural = _('backup codes')
+        indexes = [
+            models.Index(fields=['user', 'code_hash'], name='accounts_backupcode_lookup_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - Backup code"
@@ -131,29 +148,91 @@ class BackupCode(UUIDModel, TimeStampedModel):
         # Remove old unused backup codes
         user.backup_codes.filter(used=False).delete()
 
-        codes = []
-        for _ in range(count):
-            # Generate a random 8-character code
-            code = ''.join(secrets.choice('0123456789ABCDEF') for _ in range(8))
-            code_hash = make_password(code)
-            cls.objects.create(user=user, code_hash=code_hash)
-            # Format as XXXX-XXXX for readability
-            codes.append(f"{code[:4]}-{code[4:]}")
+        codes = [
+            ''.join(secrets.choice(cls.CODE_ALPHABET) for _ in range(cls.CODE_LENGTH))
+            for _ in range(count)
+        ]
+        cls.objects.bulk_create([
+            cls(user=user, code_hash=cls.hash_code(code))
+            for code in codes
+        ])
 
-        return codes
+        # Format as XXXX-XXXX for readability
+        return [f"{code[:4]}-{code[4:]}" for code in codes]
+
+    @classmethod
+    def use_code(cls, user, code):
+        """
+        Consume one of a user's unused backup codes.
+
+        A single conditional UPDATE on the (user, code_hash) index finds the
+        code and marks it used, so a code cannot be redeemed twice by
+        concurrent requests. Codes issued before HMAC hashing cannot be
+        rehashed without the plaintext, so they keep working until used:
+        only on a miss, and only if the user still has some, are they
+        checked with ``check_password``, at most one batch of codes per
+        attempt. ``has_legacy_codes`` flags users who should regenerate.
+
+        Args:
+            user: Code owner
+            code: Plaintext code as entered, with or without the hyphen
+
+        Returns:
+            bool: True if the code was valid and is now used
+        """
+        now = timezone.now()
+        consumed = cls.objects.filter(
+            user=user,
+            code_hash=cls.hash_code(code),
+            used=False,
+        ).update(used=True, used_at=now, updated_at=now)
+        if consumed:
+            return True
+
+        legacy = cls.legacy_codes(user)[:cls.LEGACY_BATCH_LIMIT]
+        return any(backup_code.verify_code(code) for backup_code in legacy)
+
+    @classmethod
+    def legacy_codes(cls, user):
+        """Unused codes of a user that are still hashed with make_password."""
+        return user.backup_codes.filter(used=False).exclude(code_hash__startswith=cls.CODE_HASH_PREFIX)
+
+    @classmethod
+    def has_legacy_codes(cls, user):
+        """Whether a user should regenerate codes issued before HMAC hashing."""
+        return cls.legacy_codes(user).exists()
+
+    @classmethod
+    def hash_code(cls, code):
+        """Return the stored form of a plaintext code."""
+        digest = salted_hmac(
+            cls.CODE_HMAC_SALT,
+            cls.normalize_code(code),
+            secret=settings.BACKUP_CODE_PEPPER,
+            algorithm='sha256',
+        ).hexdigest()
+        return f'{cls.CODE_HASH_PREFIX}{digest}'
+
+    @staticmethod
+    def normalize_code(code):
+        """Strip the readability hyphen and whitespace and ignore case."""
+        # JSON bodies may carry the code as a number
+        return ''.join(str(code).split()).replace('-', '').upper()
 
     def verify_code(self, code):
         """Verify a backup code and mark it as used."""
-        # Remove any hyphens from the input
-        code = code.replace('-', '')
-
         if self.used:
             return False
 
-        is_valid = check_password(code, self.code_hash)
+        if self.code_hash.startswith(self.CODE_HASH_PREFIX):
+            is_valid = constant_time_compare(self.hash_code(code), self.code_hash)
+        else:
+            # Legacy code hashed with make_password
+            is_valid = check_password(str(code).replace('-', ''), self.code_hash)
+
         if is_valid:
             self.used = True
             self.used_at = timezone.now()
-            self.save(update_fields=['used', 'used_at'])
+            self.save(update_fields=['used', 'used_at', 'updated_at'])
 
         return is_valid
@@ -0,0 +1,167 @@
+"""
+Buffered activity log writes
+
+Collects ActivityLog records in a bounded in-process queue and writes them
+with bulk_create from a background flusher thread, so audited requests do not
+pay for an INSERT each.
+
+A batch that fails to write is requeued and retried on the next flush. A
+record that still cannot be written after ``max_attempts`` flushes, or that
+cannot be requeued because the buffer is full, is emitted as JSON on the
+``apps.analytics.audit_fallback`` logger so it can be replayed.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+fallback_logger = logging.getLogger('apps.analytics.audit_fallback')
+
+
+class ActivityLogBuffer:
+    """
+    Bounded buffer of unsaved ActivityLog instances.
+
+    When the buffer is full, ``add`` refuses the record so the caller writes
+    it synchronously; that backpressure keeps memory bounded without losing
+    audit entries. The flusher thread is started lazily per process, so the
+    buffer is safe to use across forks.
+    """
+
+    def __init__(self, max_size=5000, batch_size=200, flush_interval=1.0, max_attempts=5, autostart=True):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.autostart = autostart
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = queue.Queue(maxsize=max_size)
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, entry):
+        """
+        Queue an unsaved ActivityLog for writing.
+
+        Returns:
+            bool: False if the buffer is full and the caller must save it
+        """
+        self._ensure_started()
+        entry._buffered_at = timezone.now()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._wakeup.set()
+            return False
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """
+        Write every queued record in batches.
+
+        On a failed write the batch is requeued and the flush stops, so the
+        retry waits for the next flush.
+
+        Returns:
+            int: Number of records written
+        """
+        written = 0
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return written
+
+            try:
+                ActivityLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                written += len(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} buffered activity logs: {e}")
+                self._requeue(batch)
+                return written
+
+    def _requeue(self, batch):
+        for entry in batch:
+            entry._buffer_attempts = getattr(entry, '_buffer_attempts', 0) + 1
+            if entry._buffer_attempts >= self.max_attempts:
+                self._write_fallback(entry)
+                continue
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self._write_fallback(entry)
+
+    @staticmethod
+    def _write_fallback(entry):
+        fallback_logger.error(json.dumps({
+            'id': str(entry.pk),
+            'user_id': str(entry.user_id) if entry.user_id else None,
+            'action': entry.action,
+            'description': entry.description,
+            'ip_address': entry.ip_address,
+            'user_agent': entry.user_agent,
+            'metadata': entry.metadata,
+            'logged_at': entry._buffered_at.isoformat(),
+        }, default=str))
+
+    def _ensure_started(self):
+        if not self.autostart or (self._pid == os.getpid() and self._thread and self._thread.is_alive()):
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's queue and thread are not ours
+                self._queue = queue.Queue(maxsize=self.max_size)
+                self._wakeup = threading.Event()
+                self._pid = os.getpid()
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='activity-log-flusher',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+activity_log_buffer = ActivityLogBuffer(
+    max_size=getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 5000),
+    batch_size=getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 1.0),
+    max_attempts=getattr(settings, 'ACTIVITY_LOG_MAX_ATTEMPTS', 5),
+)
+
+
+@atexit.register
+def _flush_on_exit():
+    activity_log_buffer.flush()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def _flush_on_worker_shutdown(**kwargs):
+    activity_log_buffer.flush()
@@ -0,0 +1,217 @@
+"""
+Real-time dashboard counters
+
+Keeps the admin dashboard numbers current in the cache as rows are created
+or change status, so reading them is one multi-key lookup instead of a
+dozen COUNT(*) scans. A periodic reconciliation recomputes every counter
+from the database to correct drift.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.organizations.models import Organization
+from apps.subscriptions.models import Subscription
+from .models import UserSession
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class DashboardCounters:
+    """
+    Cache-backed counters for the analytics dashboard.
+
+    Totals never expire; daily counters are keyed by date and expire once
+    they fall out of the dashboard window.
+    """
+
+    KEY_PREFIX = 'analytics:counter'
+    DAILY_TIMEOUT = 60 * 60 * 24 * 9  # 9 days
+    ACTIVE_MARKER_TIMEOUT = 60 * 60 * 24 * 2  # 2 days
+    WEEK_DAYS = 7
+
+    SUBSCRIPTION_STATUS_COUNTERS = {
+        'active': 'subs.active',
+        'trialing': 'subs.trialing',
+        'canceled': 'subs.canceled',
+    }
+
+    @classmethod
+    def key(cls, counter, day=None):
+        """Cache key of a total counter, or of a daily counter for ``day``."""
+        if day is None:
+            return f'{cls.KEY_PREFIX}:{counter}'
+        return f'{cls.KEY_PREFIX}:{counter}:{day.isoformat()}'
+
+    @classmethod
+    def increment(cls, counter, delta=1, daily=False):
+        """
+        Adjust a counter once the current transaction commits.
+
+        Args:
+            counter: Counter name (e.g. 'users.total')
+            delta: Amount to add (negative to decrement)
+            daily: Whether the counter is bucketed by day
+        """
+        transaction.on_commit(lambda: cls._apply(counter, delta, daily))
+
+    @classmethod
+    def mark_active(cls, user_id):
+        """Count a user as active today, at most once per day."""
+        def _apply():
+            marker = cls._active_marker(user_id, timezone.now().date())
+            if cache.add(marker, 1, timeout=cls.ACTIVE_MARKER_TIMEOUT):
+                cls._apply('users.active', 1, daily=True)
+
+        transaction.on_commit(_apply)
+
+    @classmethod
+    def _apply(cls, counter, delta, daily):
+        try:
+            if daily:
+                key = cls.key(counter, timezone.now().date())
+                cache.add(key, 0, timeout=cls.DAILY_TIMEOUT)
+            else:
+                key = cls.key(counter)
+            cache.incr(key, delta)
+        except ValueError:
+            # Counter not seeded yet; the next reconciliation sets it
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to update dashboard counter {counter}: {e}")
+
+    @classmethod
+    def get_stats(cls):
+        """
+        Read the dashboard statistics.
+
+        Reads every counter in a single cache round trip and reconciles
+        against the database only when a counter is missing.
+
+        Returns:
+            dict: Users, organizations and subscriptions statistics
+        """
+        today = timezone.now().date()
+        keys = cls._keys(today)
+        values = cache.get_many(keys)
+        if len(values) != len(keys):
+            values = cls.reconcile()
+
+        week = cls._week(today)
+
+        def daily_sum(counter):
+            return sum(values[cls.key(counter, day)] for day in week)
+
+        return {
+            'users': {
+                'total': values[cls.key('users.total')],
+                'new_today': values[cls.key('users.new', today)],
+                'new_this_week': daily_sum('users.new'),
+                'active_today': values[cls.key('users.active', today)],
+            },
+            'organizations': {
+                'total': values[cls.key('orgs.total')],
+                'new_today': values[cls.key('orgs.new', today)],
+                'new_this_week': daily_sum('orgs.new'),
+            },
+            'subscriptions': {
+                'active': values[cls.key('subs.active')],
+                'trial': values[cls.key('subs.trialing')],
+                'cancelled': values[cls.key('subs.canceled')],
+                'new_today': values[cls.key('subs.new', today)],
+            },
+        }
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recompute every counter from the database and store it.
+
+        Returns:
+            dict: Cache key to counter value
+        """
+        today = timezone.now().date()
+        week = cls._week(today)
+        today_start, today_end = cls._day_bounds(today)
+
+        user_aggregates = {'total': Count('id', filter=Q(is_active=True))}
+        org_aggregates = {'total': Count('id')}
+        for day in week:
+            start, end = cls._day_bounds(day)
+            user_aggregates[day.isoformat()] = Count(
+                'id', filter=Q(date_joined__gte=start, date_joined__lt=end)
+            )
+            org_aggregates[day.isoformat()] = Count(
+                'id', filter=Q(created_at__gte=start, created_at__lt=end)
+            )
+        users = User.objects.aggregate(**user_aggregates)
+        orgs = Organization.objects.aggregate(**org_aggregates)
+
+        active_user_ids = set(
+            UserSession.objects.filter(
+                last_activity__gte=today_start,
+                last_activity__lt=today_end,
+                user__isnull=False,
+            ).values_list('user_id', flat=True)
+        )
+
+        subs = Subscription.objects.aggregate(
+            new_today=Count('id', filter=Q(created_at__gte=today_start, created_at__lt=today_end)),
+            **{
+                status: Count('id', filter=Q(status=status))
+                for status in cls.SUBSCRIPTION_STATUS_COUNTERS
+            },
+        )
+
+        totals = {
+            cls.key('users.total'): users['total'],
+            cls.key('orgs.total'): orgs['total'],
+            **{
+                cls.key(counter): subs[status]
+                for status, counter in cls.SUBSCRIPTION_STATUS_COUNTERS.items()
+            },
+        }
+        daily = {
+            cls.key('users.active', today): len(active_user_ids),
+            cls.key('subs.new', today): subs['new_today'],
+        }
+        for day in week:
+            daily[cls.key('users.new', day)] = users[day.isoformat()]
+            daily[cls.key('orgs.new', day)] = orgs[day.isoformat()]
+
+        cache.set_many(totals, timeout=None)
+        cache.set_many(daily, timeout=cls.DAILY_TIMEOUT)
+        # Restore the markers behind the active count, so a user already
+        # counted is not counted again on their next session activity
+        cache.set_many(
+            {cls._active_marker(user_id, today): 1 for user_id in active_user_ids},
+            timeout=cls.ACTIVE_MARKER_TIMEOUT,
+        )
+        return {**totals, **daily}
+
+    @classmethod
+    def _keys(cls, today):
+        keys = [cls.key('users.total'), cls.key('orgs.total')]
+        keys += [cls.key(counter) for counter in cls.SUBSCRIPTION_STATUS_COUNTERS.values()]
+        keys += [cls.key('users.active', today), cls.key('subs.new', today)]
+        for day in cls._week(today):
+            keys += [cls.key('users.new', day), cls.key('orgs.new', day)]
+        return keys
+
+    @classmethod
+    def _active_marker(cls, user_id, day):
+        return f"{cls.key('users.active', day)}:{user_id}"
+
+    @classmethod
+    def _week(cls, today):
+        """Today and the preceding ``WEEK_DAYS`` days."""
+        return [today - timedelta(days=offset) for offset in range(cls.WEEK_DAYS + 1)]
+
+    @staticmethod
+    def _day_bounds(day):
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from celery import group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from apps.analytics.services import MetricsBackfill
+from apps.analytics.tasks import backfill_daily_metrics_chunk
+
+
+def _run_chunk(checkpoint_key, start_date, end_date):
+    """Process pool entry point; each worker opens its own DB connection."""
+    try:
+        return start_date, end_date, MetricsBackfill.run_chunk(checkpoint_key, start_date, end_date)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Recomputes DailyMetric history for a date range in parallel chunks. Safe to re-run; completed chunks are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            required=True,
+            type=date.fromisoformat,
+            help='First date to backfill (YYYY-MM-DD).',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last date to backfill (YYYY-MM-DD, defaults to yesterday).',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days aggregated per chunk.',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['serial', 'processes', 'celery'],
+            default='processes',
+            help='Run chunks inline, in a local process pool, or as a Celery group.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Process pool size when --mode=processes.',
+        )
+        parser.add_argument(
+            '--no-wait',
+            action='store_true',
+            help='With --mode=celery, enqueue the chunks and exit immediately.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and recompute every chunk.',
+        )
+
+    def handle(self, *args, **options):
+        start_date = options['start']
+        end_date = options['end'] or timezone.now().date() - timedelta(days=1)
+
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        try:
+            backfill = MetricsBackfill(start_date, end_date, chunk_days=options['chunk_days'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['restart']:
+            backfill.reset()
+
+        chunks = backfill.pending_chunks()
+        total_chunks = len(backfill.chunks())
+        self.stdout.write(
+            f'Backfilling {start_date} to {end_date}: '
+            f'{len(chunks)} of {total_chunks} chunks pending'
+        )
+        if not chunks:
+            self.stdout.write(self.style.SUCCESS('Nothing to do.'))
+            return
+
+        mode = options['mode']
+        if mode == 'celery':
+            self._run_celery(backfill, chunks, wait=not options['no_wait'])
+        elif mode == 'processes':
+            self._run_processes(backfill, chunks, workers=options['workers'])
+        else:
+            for chunk_start, chunk_end in chunks:
+                written = MetricsBackfill.run_chunk(backfill.checkpoint_key, chunk_start, chunk_end)
+                self._report(chunk_start, chunk_end, written)
+
+        self.stdout.write(self.style.SUCCESS('Backfill complete.'))
+
+    def _run_processes(self, backfill, chunks, workers):
+        # Forked workers must not share the parent's open connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_run_chunk, backfill.checkpoint_key, chunk_start, chunk_end)
+                for chunk_start, chunk_end in chunks
+            ]
+            for future in as_completed(futures):
+                self._report(*future.result())
+
+    def _run_celery(self, backfill, chunks, wait):
+        result = group(
+            backfill_daily_metrics_chunk.s(
+                backfill.checkpoint_key,
+                chunk_start.isoformat(),
+                chunk_end.isoformat(),
+            )
+            for chunk_start, chunk_end in chunks
+        ).apply_async()
+
+        if not wait:
+            self.stdout.write(f'Enqueued {len(chunks)} chunks (group {result.id}).')
+            return
+
+        for message in result.get(propagate=True):
+            self.stdout.write(message)
+
+    def _report(self, chunk_start, chunk_end, written):
+        self.stdout.write(f'  {chunk_start} to {chunk_end}: {written} metrics')
@@ -3,6 +3,7 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from apps.analytics.models import DailyMetric
+from apps.analytics.services import metrics_cache
 
 class Command(BaseCommand):
     help = 'Generates fake analytics data for testing'
@@ -40,4 +41,6 @@ class Command(BaseCommand):
                 )
             current_date += timedelta(days=1)
 
+        metrics_cache.invalidate()
+
         self.stdout.write(self.style.SUCCESS('Successfully generated fake analytics data'))
@@ -0,0 +1,97 @@
+"""
+Convert analytics_activitylog into a table range-partitioned by month on
+created_at (PostgreSQL only; a no-op on other databases).
+
+PostgreSQL requires the partition key in the primary key, so the table's
+primary key becomes (id, created_at). Existing rows are copied into monthly
+partitions; a default partition catches rows outside the created ranges.
+Further partitions are created ahead of time by the
+create_activity_log_partitions task.
+"""
+from datetime import date, datetime, time, timezone
+
+from django.db import migrations
+
+TABLE = 'analytics_activitylog'
+LEGACY_TABLE = 'analytics_activitylog_legacy'
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ('analytics_a_created_b5efc6_idx', '"created_at" DESC'),
+    ('analytics_a_user_id_abe786_idx', '"user_id", "created_at" DESC'),
+    ('analytics_a_action_8c93de_idx', '"action", "created_at" DESC'),
+    ('analytics_activitylog_user_id_idx', '"user_id"'),
+]
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month):
+    return datetime.combine(month, time.min, tzinfo=timezone.utc)
+
+
+def _create_indexes(cursor):
+    for name, columns in INDEXES:
+        cursor.execute(f'CREATE INDEX "{name}" ON "{TABLE}" ({columns})')
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "analytics_activitylog_user_id_fk_accounts_user_id" '
+        'FOREIGN KEY ("user_id") REFERENCES "accounts_user" ("id") DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def partition_activitylog(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("created_at") FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0]
+        current = datetime.now(timezone.utc).date().replace(day=1)
+        month = oldest.date().replace(day=1) if oldest else current
+        last = _add_months(current, MONTHS_AHEAD)
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE ("created_at")'
+        )
+
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month:%Y_%m}" PARTITION OF "{TABLE}" '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [_bound(month), _bound(_add_months(month, 1))],
+            )
+            month = _add_months(month, 1)
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY_TABLE}"')
+        cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY ("id", "created_at")')
+        _create_indexes(cursor)
+
+
+def unpartition_activitylog(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY_TABLE}"')
+        cursor.execute(f'DROP TABLE "{LEGACY_TABLE}" CASCADE')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY ("id")')
+        _create_indexes(cursor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activitylog, unpartition_activitylog),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_partition_activitylog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['-created_at'], name='analytics_u_created_488b46_idx'),
+        ),
+    ]
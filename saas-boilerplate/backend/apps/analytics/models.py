@@ -132,6 +132,7 @@ class UserSession(BaseModel):
         indexes = [
             models.Index(fields=['user', '-started_at']),
             models.Index(fields=['is_active', '-last_activity']),
+            models.Index(fields=['-created_at']),
         ]
 
     def __str__(self):
@@ -0,0 +1,210 @@
+"""
+PostgreSQL range partitioning helpers
+
+ActivityLog is stored in monthly range partitions on created_at (see
+migration 0002_partition_activitylog). These helpers create partitions ahead
+of time and retire expired data by detaching and dropping whole partitions,
+which takes constant time instead of a large DELETE.
+
+Rows outside every monthly range, e.g. written while the partition task was
+not running, land in the table's DEFAULT partition. Creating a partition
+first moves the rows of its month out of the default partition, which
+PostgreSQL would otherwise refuse, and retiring expired data also deletes
+expired rows from it.
+"""
+import logging
+import re
+from datetime import date, datetime, time, timezone as dt_timezone
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    """Return the first day of the month containing a date or datetime."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    """Return the first day of the month ``count`` months after ``month``."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """Name of the partition of ``table`` holding ``month``."""
+    return f'{table}_p{month:%Y_%m}'
+
+
+def is_partitioned(table, using='default'):
+    """
+    Check whether a table is a partitioned PostgreSQL table.
+
+    Always False on other database backends.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+            """,
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def default_partition(table, using='default'):
+    """
+    Return the name of a partitioned table's DEFAULT partition, or None.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT d.relname FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            JOIN pg_class d ON d.oid = pt.partdefid
+            WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+            """,
+            [table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def list_partitions(table, using='default'):
+    """
+    List the monthly partitions of a table.
+
+    Returns:
+        list: ``(partition_name, month)`` tuples in chronological order
+    """
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$')
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partitions(table, months_ahead=3, using='default'):
+    """
+    Create monthly partitions from the current month to ``months_ahead``.
+
+    Existing partitions are left untouched. If the default partition holds
+    rows of a month being created, it is detached while the partition is
+    created and those rows are moved into it, then attached again.
+
+    Returns:
+        list: Names of the partitions that were created
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    existing = {name for name, _ in list_partitions(table, using)}
+    default = default_partition(table, using)
+    current = month_start(timezone.now())
+    created = []
+
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+
+        bounds = [_bound(month), _bound(add_months(month, 1))]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            stranded = False
+            if default:
+                cursor.execute(
+                    f'SELECT 1 FROM {quote(default)} WHERE created_at >= %s AND created_at < %s LIMIT 1',
+                    bounds,
+                )
+                stranded = cursor.fetchone() is not None
+            if stranded:
+                cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(default)}')
+
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {quote(name)} '
+                f'PARTITION OF {quote(table)} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                bounds,
+            )
+
+            if stranded:
+                cursor.execute(
+                    f'WITH moved AS ('
+                    f'DELETE FROM {quote(default)} WHERE created_at >= %s AND created_at < %s RETURNING *'
+                    f') INSERT INTO {quote(name)} SELECT * FROM moved',
+                    bounds,
+                )
+                logger.info(f"Moved {cursor.rowcount} rows from {default} into {name}")
+                cursor.execute(f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(default)} DEFAULT')
+        created.append(name)
+        logger.info(f"Created partition {name}")
+
+    return created
+
+
+def drop_partitions_before(table, cutoff, using='default'):
+    """
+    Detach and drop every partition holding only rows older than ``cutoff``,
+    and delete rows older than ``cutoff`` from the default partition.
+
+    Rows in the partition that straddles the cutoff are kept until that
+    partition expires as a whole.
+
+    Returns:
+        list: Names of the partitions that were dropped
+    """
+    connection = connections[using]
+    cutoff_date = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    dropped = []
+
+    default = default_partition(table, using)
+    if default:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(default)} WHERE created_at < %s',
+                [cutoff],
+            )
+            if cursor.rowcount:
+                logger.info(f"Deleted {cursor.rowcount} expired rows from {default}")
+
+    for name, month in list_partitions(table, using):
+        if add_months(month, 1) > cutoff_date:
+            break
+
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {connection.ops.quote_name(table)} '
+                f'DETACH PARTITION {connection.ops.quote_name(name)}'
+            )
+            cursor.execute(f'DROP TABLE {connection.ops.quote_name(name)}')
+        dropped.append(name)
+        logger.info(f"Dropped partition {name}")
+
+    return dropped
+
+
+def _bound(month):
+    return datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
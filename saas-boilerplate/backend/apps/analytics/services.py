@@ -3,16 +3,28 @@ Analytics service layer
 
 Business logic for tracking and aggregating analytics.
 """
-from datetime import datetime, timedelta
-from django.db.models import Count, Sum, Avg, Q
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from apps.core.cache import ReadThroughCache
 from apps.organizations.models import Organization
 from apps.subscriptions.models import Subscription
+from .buffer import activity_log_buffer
+from .counters import DashboardCounters
 from .models import ActivityLog, DailyMetric, UserSession
 
 User = get_user_model()
 
+# DailyMetric rows only change when the aggregator runs, which invalidates
+# this cache. The dashboard mixes in live counters, so it is cached briefly.
+metrics_cache = ReadThroughCache('analytics:metrics', timeout=60 * 60 * 6)
+DASHBOARD_CACHE_TIMEOUT = 60
+
 
 class ActivityLogger:
     """
@@ -24,6 +36,10 @@ class ActivityLogger:
         """
         Log an activity.
 
+        With ``ACTIVITY_LOG_BUFFERED`` enabled the record is queued and
+        written in a batch by a background flusher; it is saved inline only
+        when the buffer is full.
+
         Args:
             action: Action type (from ActivityLog.ACTION_TYPES)
             user: User performing the action
@@ -38,7 +54,7 @@ class ActivityLogger:
             ip_address = ActivityLogger._get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
 
-        return ActivityLog.objects.create(
+        entry = ActivityLog(
             user=user,
             action=action,
             description=description,
@@ -46,6 +62,11 @@ class ActivityLogger:
             user_agent=user_agent,
             metadata=metadata
         )
+        if getattr(settings, 'ACTIVITY_LOG_BUFFERED', False) and activity_log_buffer.add(entry):
+            return entry
+
+        entry.save()
+        return entry
 
     @staticmethod
     def _get_client_ip(request):
@@ -61,6 +82,11 @@ class ActivityLogger:
 class MetricsAggregator:
     """
     Service for aggregating daily metrics.
+
+    Every metric for a day (or a range of days) is computed with a handful of
+    conditional-aggregate queries over half-open ``[start, end)`` datetime
+    ranges, so the indexed timestamp columns can be used and the number of
+    round trips does not grow with the number of metrics.
     """
 
     @classmethod
@@ -74,125 +100,320 @@ class MetricsAggregator:
         if date is None:
             date = timezone.now().date() - timedelta(days=1)
 
-        # User metrics
-        cls._aggregate_user_metrics(date)
+        return cls.aggregate_date_range(date, date)
+
+    @classmethod
+    def aggregate_date_range(cls, start_date, end_date):
+        """
+        Aggregate all metrics for every day between two dates (inclusive).
+
+        Args:
+            start_date: First date to aggregate
+            end_date: Last date to aggregate
+
+        Returns:
+            int: Number of DailyMetric rows written
+        """
+        windows = [
+            (day, *cls._day_bounds(day))
+            for day in (
+                start_date + timedelta(days=offset)
+                for offset in range((end_date - start_date).days + 1)
+            )
+        ]
+        if not windows:
+            return 0
 
-        # Organization metrics
-        cls._aggregate_org_metrics(date)
+        values = {}
+        values.update(cls._aggregate_user_metrics(windows))
+        values.update(cls._aggregate_org_metrics(windows))
+        values.update(cls._aggregate_subscription_metrics(windows))
 
-        # Subscription metrics
-        cls._aggregate_subscription_metrics(date)
+        return cls._save_metrics(values)
 
-        # Revenue metrics
-        cls._aggregate_revenue_metrics(date)
+    @staticmethod
+    def _day_bounds(date):
+        """Return the aware ``[start, end)`` datetimes covering a date."""
+        start = timezone.make_aware(datetime.combine(date, time.min))
+        return start, start + timedelta(days=1)
 
     @classmethod
-    def _aggregate_user_metrics(cls, date):
+    def _aggregate_user_metrics(cls, windows):
         """Aggregate user-related metrics."""
-        # New users
-        new_users = User.objects.filter(
-            date_joined__date=date
-        ).count()
-        cls._save_metric(date, 'users.new', new_users)
-
-        # Active users (logged in that day)
-        active_users = UserSession.objects.filter(
-            last_activity__date=date
-        ).values('user').distinct().count()
-        cls._save_metric(date, 'users.active', active_users)
-
-        # Total users
-        total_users = User.objects.filter(
-            date_joined__date__lte=date,
-            is_active=True
-        ).count()
-        cls._save_metric(date, 'users.total', total_users)
+        aggregates = {}
+        for index, (_, start, end) in enumerate(windows):
+            # New users
+            aggregates[f'new_{index}'] = Count(
+                'id', filter=Q(date_joined__gte=start, date_joined__lt=end)
+            )
+            # Total users
+            aggregates[f'total_{index}'] = Count(
+                'id', filter=Q(date_joined__lt=end, is_active=True)
+            )
+        users = User.objects.aggregate(**aggregates)
+
+        # Active users (had session activity that day)
+        first_start, last_end = windows[0][1], windows[-1][2]
+        sessions = UserSession.objects.filter(
+            last_activity__gte=first_start,
+            last_activity__lt=last_end,
+        ).aggregate(**{
+            f'active_{index}': Count(
+                'user', distinct=True,
+                filter=Q(last_activity__gte=start, last_activity__lt=end),
+            )
+            for index, (_, start, end) in enumerate(windows)
+        })
+
+        values = {}
+        for index, (date, _, _) in enumerate(windows):
+            values[(date, 'users.new')] = users[f'new_{index}']
+            values[(date, 'users.active')] = sessions[f'active_{index}']
+            values[(date, 'users.total')] = users[f'total_{index}']
+        return values
 
     @classmethod
-    def _aggregate_org_metrics(cls, date):
+    def _aggregate_org_metrics(cls, windows):
         """Aggregate organization-related metrics."""
-        # New organizations
-        new_orgs = Organization.objects.filter(
-            created_at__date=date
-        ).count()
-        cls._save_metric(date, 'orgs.new', new_orgs)
-
-        # Active organizations (with recent activity)
-        active_orgs = Organization.objects.filter(
-            updated_at__date=date
-        ).count()
-        cls._save_metric(date, 'orgs.active', active_orgs)
-
-        # Total organizations
-        total_orgs = Organization.objects.filter(
-            created_at__date__lte=date
-        ).count()
-        cls._save_metric(date, 'orgs.total', total_orgs)
+        aggregates = {}
+        for index, (_, start, end) in enumerate(windows):
+            # New organizations
+            aggregates[f'new_{index}'] = Count(
+                'id', filter=Q(created_at__gte=start, created_at__lt=end)
+            )
+            # Active organizations (with activity that day)
+            aggregates[f'active_{index}'] = Count(
+                'id', filter=Q(updated_at__gte=start, updated_at__lt=end)
+            )
+            # Total organizations
+            aggregates[f'total_{index}'] = Count(
+                'id', filter=Q(created_at__lt=end)
+            )
+        orgs = Organization.objects.aggregate(**aggregates)
+
+        values = {}
+        for index, (date, _, _) in enumerate(windows):
+            values[(date, 'orgs.new')] = orgs[f'new_{index}']
+            values[(date, 'orgs.active')] = orgs[f'active_{index}']
+            values[(date, 'orgs.total')] = orgs[f'total_{index}']
+        return values
 
     @classmethod
-    def _aggregate_subscription_metrics(cls, date):
-        """Aggregate subscription-related metrics."""
-        # New subscriptions
-        new_subs = Subscription.objects.filter(
-            created_at__date=date,
-            status='active'
-        ).count()
-        cls._save_metric(date, 'subs.new', new_subs)
-
-        # Active subscriptions
-        active_subs = Subscription.objects.filter(
-            Q(created_at__date__lte=date) &
-            Q(Q(cancelled_at__isnull=True) | Q(cancelled_at__date__gt=date)),
-            status='active'
-        ).count()
-        cls._save_metric(date, 'subs.active', active_subs)
-
-        # Cancelled subscriptions
-        cancelled_subs = Subscription.objects.filter(
-            cancelled_at__date=date
-        ).count()
-        cls._save_metric(date, 'subs.cancelled', cancelled_subs)
+    def _aggregate_subscription_metrics(cls, windows):
+        """
+        Aggregate subscription and revenue metrics.
+
+        Subscriptions carry no cancellation timestamp, so a subscription counts
+        as cancelled on the day its row last changed into the canceled status.
+        """
+        monthly_amount = RevenueCalculator.monthly_amount()
+        aggregates = {}
+        for index, (_, start, end) in enumerate(windows):
+            created_that_day = Q(created_at__gte=start, created_at__lt=end, status='active')
+            active_at_close = Q(created_at__lt=end, status='active')
+
+            aggregates[f'new_{index}'] = Count('id', filter=created_that_day)
+            aggregates[f'active_{index}'] = Count('id', filter=active_at_close)
+            aggregates[f'cancelled_{index}'] = Count(
+                'id', filter=Q(updated_at__gte=start, updated_at__lt=end, status='canceled')
+            )
+            # Monthly Recurring Revenue, yearly plans normalized to a month
+            aggregates[f'mrr_{index}'] = Sum(monthly_amount, filter=active_at_close)
+            # New revenue from new subscriptions
+            aggregates[f'revenue_new_{index}'] = Sum(monthly_amount, filter=created_that_day)
+        subs = Subscription.objects.aggregate(**aggregates)
+
+        values = {}
+        for index, (date, _, _) in enumerate(windows):
+            mrr = subs[f'mrr_{index}'] or Decimal('0')
+            values[(date, 'subs.new')] = subs[f'new_{index}']
+            values[(date, 'subs.active')] = subs[f'active_{index}']
+            values[(date, 'subs.cancelled')] = subs[f'cancelled_{index}']
+            values[(date, 'revenue.mrr')] = mrr
+            # Annual Recurring Revenue
+            values[(date, 'revenue.arr')] = mrr * 12
+            values[(date, 'revenue.new')] = subs[f'revenue_new_{index}'] or Decimal('0')
+        return values
 
     @classmethod
-    def _aggregate_revenue_metrics(cls, date):
-        """Aggregate revenue-related metrics."""
-        # Get active subscriptions with their amounts
-        active_subs = Subscription.objects.filter(
-            Q(created_at__date__lte=date) &
-            Q(Q(cancelled_at__isnull=True) | Q(cancelled_at__date__gt=date)),
-            status='active'
-        ).select_related('plan')
-
-        # Calculate MRR (Monthly Recurring Revenue)
-        mrr = sum(
-            sub.plan.price if sub.plan.interval == 'month'
-            else sub.plan.price / 12  # Convert annual to monthly
-            for sub in active_subs
+    def _save_metrics(cls, values):
+        """
+        Upsert metrics in a single statement.
+
+        Args:
+            values: Mapping of ``(date, metric_type)`` to metric value
+
+        Returns:
+            int: Number of rows written
+        """
+        metrics = [
+            DailyMetric(
+                date=date,
+                metric_type=metric_type,
+                value=Decimal(value).quantize(Decimal('0.01')),
+            )
+            for (date, metric_type), value in values.items()
+        ]
+        DailyMetric.objects.bulk_create(
+            metrics,
+            update_conflicts=True,
+            unique_fields=['date', 'metric_type'],
+            update_fields=['value', 'updated_at'],
+        )
+        transaction.on_commit(metrics_cache.invalidate)
+        return len(metrics)
+
+
+class MetricsBackfill:
+    """
+    Service for rebuilding DailyMetric history over a date range.
+
+    The range is split into fixed-size chunks that can be aggregated
+    independently. Every chunk is an idempotent upsert, and completed chunks
+    are recorded in a cache checkpoint so an interrupted backfill resumes
+    where it stopped.
+    """
+
+    CHECKPOINT_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
+    def __init__(self, start_date, end_date, chunk_days=31):
+        if end_date < start_date:
+            raise ValueError('end_date must not be before start_date')
+        if chunk_days < 1:
+            raise ValueError('chunk_days must be at least 1')
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.chunk_days = chunk_days
+
+    @property
+    def checkpoint_key(self):
+        """Cache key prefix identifying this backfill run."""
+        return (
+            f'analytics:backfill:{self.start_date.isoformat()}:'
+            f'{self.end_date.isoformat()}:{self.chunk_days}'
         )
-        cls._save_metric(date, 'revenue.mrr', mrr)
 
-        # Calculate ARR (Annual Recurring Revenue)
-        arr = mrr * 12
-        cls._save_metric(date, 'revenue.arr', arr)
+    def chunks(self):
+        """
+        Split the range into inclusive ``(start, end)`` date chunks.
 
-        # New revenue from new subscriptions
-        new_revenue = Subscription.objects.filter(
-            created_at__date=date,
-            status='active'
-        ).select_related('plan').aggregate(
-            total=Sum('plan__price')
-        )['total'] or 0
-        cls._save_metric(date, 'revenue.new', new_revenue)
+        Returns:
+            list: Date tuples in chronological order
+        """
+        chunks = []
+        chunk_start = self.start_date
+        while chunk_start <= self.end_date:
+            chunk_end = min(chunk_start + timedelta(days=self.chunk_days - 1), self.end_date)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+        return chunks
+
+    def pending_chunks(self):
+        """Return the chunks not yet recorded as completed."""
+        chunks = self.chunks()
+        completed = cache.get_many([
+            self._chunk_key(self.checkpoint_key, chunk_start)
+            for chunk_start, _ in chunks
+        ])
+        return [
+            (chunk_start, chunk_end)
+            for chunk_start, chunk_end in chunks
+            if self._chunk_key(self.checkpoint_key, chunk_start) not in completed
+        ]
+
+    def reset(self):
+        """Forget completed chunks so the whole range is recomputed."""
+        cache.delete_many([
+            self._chunk_key(self.checkpoint_key, chunk_start)
+            for chunk_start, _ in self.chunks()
+        ])
 
     @classmethod
-    def _save_metric(cls, date, metric_type, value):
-        """Save or update a metric."""
-        DailyMetric.objects.update_or_create(
-            date=date,
-            metric_type=metric_type,
-            defaults={'value': value}
+    def run_chunk(cls, checkpoint_key, start_date, end_date):
+        """
+        Aggregate one chunk and record it in the checkpoint.
+
+        Args:
+            checkpoint_key: Checkpoint of the backfill the chunk belongs to
+            start_date: First date of the chunk
+            end_date: Last date of the chunk
+
+        Returns:
+            int: Number of DailyMetric rows written
+        """
+        written = MetricsAggregator.aggregate_date_range(start_date, end_date)
+        cache.set(
+            cls._chunk_key(checkpoint_key, start_date),
+            written,
+            timeout=cls.CHECKPOINT_TIMEOUT,
+        )
+        return written
+
+    @staticmethod
+    def _chunk_key(checkpoint_key, chunk_start):
+        return f'{checkpoint_key}:{chunk_start.isoformat()}'
+
+
+class RevenueCalculator:
+    """
+    Service for computing recurring revenue inside the database.
+
+    Plan prices are normalized to a monthly amount by the subscription's
+    billing cycle in SQL, so the cost of a revenue query does not depend on
+    the number of paying subscriptions.
+    """
+
+    @staticmethod
+    def monthly_amount():
+        """
+        Expression for a subscription's plan price normalized to one month.
+        """
+        return Case(
+            When(billing_cycle='yearly', then=F('plan__price_yearly') / Value(12)),
+            default=F('plan__price_monthly'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
         )
 
+    @classmethod
+    def calculate(cls, subscriptions=None):
+        """
+        Calculate MRR, ARR and the per-plan MRR breakdown in one query.
+
+        Args:
+            subscriptions: Subscription queryset to include
+                (defaults to active subscriptions)
+
+        Returns:
+            dict: ``mrr``, ``arr`` and ``by_plan`` (one entry per plan)
+        """
+        if subscriptions is None:
+            subscriptions = Subscription.objects.filter(status='active')
+
+        rows = subscriptions.order_by().values(
+            'plan_id', 'plan__name', 'plan__display_order'
+        ).annotate(
+            subscriptions=Count('id'),
+            mrr=Sum(cls.monthly_amount()),
+        ).order_by('plan__display_order', 'plan_id')
+
+        by_plan = [
+            {
+                'plan': row['plan_id'],
+                'name': row['plan__name'],
+                'subscriptions': row['subscriptions'],
+                'mrr': row['mrr'] or Decimal('0'),
+            }
+            for row in rows
+        ]
+        mrr = sum((entry['mrr'] for entry in by_plan), Decimal('0'))
+
+        return {
+            'mrr': mrr,
+            'arr': mrr * 12,
+            'by_plan': by_plan,
+        }
+
 
 class AnalyticsService:
     """
@@ -207,50 +428,27 @@ class AnalyticsService:
         Returns:
             dict: Dashboard statistics
         """
-        now = timezone.now()
-        today = now.date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-
-        return {
-            'users': {
-                'total': User.objects.filter(is_active=True).count(),
-                'new_today': User.objects.filter(date_joined__date=today).count(),
-                'new_this_week': User.objects.filter(date_joined__date__gte=week_ago).count(),
-                'active_today': UserSession.objects.filter(
-                    last_activity__date=today
-                ).values('user').distinct().count(),
-            },
-            'organizations': {
-                'total': Organization.objects.count(),
-                'new_today': Organization.objects.filter(created_at__date=today).count(),
-                'new_this_week': Organization.objects.filter(created_at__date__gte=week_ago).count(),
+        return metrics_cache.get(
+            'dashboard',
+            lambda: {
+                **DashboardCounters.get_stats(),
+                'revenue': AnalyticsService._calculate_revenue_stats(),
             },
-            'subscriptions': {
-                'active': Subscription.objects.filter(status='active').count(),
-                'trial': Subscription.objects.filter(status='trialing').count(),
-                'cancelled': Subscription.objects.filter(status='canceled').count(),
-                'new_today': Subscription.objects.filter(created_at__date=today).count(),
-            },
-            'revenue': AnalyticsService._calculate_revenue_stats(),
-        }
+            timeout=DASHBOARD_CACHE_TIMEOUT,
+        )
 
     @staticmethod
     def _calculate_revenue_stats():
         """Calculate revenue statistics."""
-        active_subs = Subscription.objects.filter(
-            status='active'
-        ).select_related('plan')
-
-        mrr = sum(
-            sub.plan.price if sub.plan.interval == 'month'
-            else sub.plan.price / 12
-            for sub in active_subs
-        )
+        revenue = RevenueCalculator.calculate()
 
         return {
-            'mrr': float(mrr),
-            'arr': float(mrr * 12),
+            'mrr': float(revenue['mrr']),
+            'arr': float(revenue['arr']),
+            'by_plan': [
+                {**entry, 'mrr': float(entry['mrr'])}
+                for entry in revenue['by_plan']
+            ],
         }
 
     @staticmethod
@@ -268,19 +466,25 @@ class AnalyticsService:
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
 
-        metrics = DailyMetric.objects.filter(
-            metric_type=metric_type,
-            date__gte=start_date,
-            date__lte=end_date
-        ).order_by('date')
-
-        return [
-            {
-                'date': m.date.isoformat(),
-                'value': float(m.value)
-            }
-            for m in metrics
-        ]
+        def compute():
+            metrics = DailyMetric.objects.filter(
+                metric_type=metric_type,
+                date__gte=start_date,
+                date__lte=end_date
+            ).order_by('date')
+
+            return [
+                {
+                    'date': m.date.isoformat(),
+                    'value': float(m.value)
+                }
+                for m in metrics
+            ]
+
+        return metrics_cache.get(
+            f'time_series:{metric_type}:{start_date.isoformat()}:{end_date.isoformat()}',
+            compute,
+        )
 
     @staticmethod
     def get_recent_activity(limit=50):
@@ -0,0 +1,90 @@
+"""
+Analytics signal handlers
+
+Feed the real-time dashboard counters from model changes.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from apps.organizations.models import Organization
+from apps.subscriptions.models import Subscription
+from .counters import DashboardCounters
+from .models import UserSession
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._counted_is_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=User)
+def count_user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        DashboardCounters.increment('users.new', daily=True)
+        if instance.is_active:
+            DashboardCounters.increment('users.total')
+    elif instance._counted_is_active is not None and instance._counted_is_active != instance.is_active:
+        DashboardCounters.increment('users.total', 1 if instance.is_active else -1)
+
+    instance._counted_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=User)
+def count_user_deleted(sender, instance, **kwargs):
+    if instance._counted_is_active:
+        DashboardCounters.increment('users.total', -1)
+
+
+@receiver(post_save, sender=Organization)
+def count_organization_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        DashboardCounters.increment('orgs.new', daily=True)
+        DashboardCounters.increment('orgs.total')
+
+
+@receiver(post_delete, sender=Organization)
+def count_organization_deleted(sender, instance, **kwargs):
+    DashboardCounters.increment('orgs.total', -1)
+
+
+@receiver(post_init, sender=Subscription)
+def remember_subscription_state(sender, instance, **kwargs):
+    instance._counted_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Subscription)
+def count_subscription_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    counters = DashboardCounters.SUBSCRIPTION_STATUS_COUNTERS
+    if created:
+        DashboardCounters.increment('subs.new', daily=True)
+        if instance.status in counters:
+            DashboardCounters.increment(counters[instance.status])
+    elif instance._counted_status is not None and instance._counted_status != instance.status:
+        if instance._counted_status in counters:
+            DashboardCounters.increment(counters[instance._counted_status], -1)
+        if instance.status in counters:
+            DashboardCounters.increment(counters[instance.status])
+
+    instance._counted_status = instance.status
+
+
+@receiver(post_delete, sender=Subscription)
+def count_subscription_deleted(sender, instance, **kwargs):
+    counter = DashboardCounters.SUBSCRIPTION_STATUS_COUNTERS.get(instance._counted_status)
+    if counter:
+        DashboardCounters.increment(counter, -1)
+
+
+@receiver(post_save, sender=UserSession)
+def count_session_activity(sender, instance, raw=False, **kwargs):
+    if not raw and instance.user_id:
+        DashboardCounters.mark_active(instance.user_id)
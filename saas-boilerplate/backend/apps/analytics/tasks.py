@@ -4,10 +4,13 @@ Celery tasks for analytics
 Automated tasks for metrics aggregation and cleanup.
 """
 from celery import shared_task
-from datetime import timedelta
+from datetime import date, timedelta
 from django.utils import timezone
-from .services import MetricsAggregator
+from apps.core.deletion import delete_in_batches
+from .counters import DashboardCounters
+from .services import MetricsAggregator, MetricsBackfill
 from .models import ActivityLog, UserSession
+from .partitions import create_partitions, drop_partitions_before, is_partitioned
 
 
 @shared_task
@@ -24,33 +27,93 @@ def aggregate_daily_metrics():
 
 
 @shared_task
-def cleanup_old_activity_logs(days=90):
+def backfill_daily_metrics_chunk(checkpoint_key, start_date, end_date):
+    """
+    Recompute metrics for one chunk of a backfill.
+
+    Args:
+        checkpoint_key: Checkpoint of the backfill the chunk belongs to
+        start_date: First date of the chunk (ISO format)
+        end_date: Last date of the chunk (ISO format)
+    """
+    written = MetricsBackfill.run_chunk(
+        checkpoint_key,
+        date.fromisoformat(start_date),
+        date.fromisoformat(end_date),
+    )
+    return f"Backfilled {written} metrics for {start_date} to {end_date}"
+
+
+@shared_task
+def reconcile_dashboard_counters():
+    """
+    Recompute the real-time dashboard counters from the database.
+
+    Corrects drift from bulk updates and deletes that bypass model signals.
+    """
+    DashboardCounters.reconcile()
+    return "Reconciled dashboard counters"
+
+
+@shared_task
+def cleanup_old_activity_logs(days=90, batch_size=1000):
     """
     Clean up activity logs older than specified days.
 
+    With partitioned storage, only partitions entirely older than the cutoff
+    are dropped, so rows may be kept up to one extra month.
+
     Args:
         days: Number of days to retain (default: 90)
+        batch_size: Rows deleted per batch on non-partitioned storage
     """
     cutoff_date = timezone.now() - timedelta(days=days)
-    deleted_count, _ = ActivityLog.objects.filter(
-        created_at__lt=cutoff_date
-    ).delete()
+
+    # Partitioned storage: drop whole expired months in constant time
+    table = ActivityLog._meta.db_table
+    if is_partitioned(table):
+        dropped = drop_partitions_before(table, cutoff_date)
+        return f"Dropped {len(dropped)} activity log partitions older than {days} days"
+
+    deleted_count = delete_in_batches(
+        'analytics:cleanup_activity_logs',
+        ActivityLog.objects.filter(created_at__lt=cutoff_date),
+        batch_size=batch_size,
+    )
     return f"Deleted {deleted_count} activity logs older than {days} days"
 
 
 @shared_task
-def cleanup_old_sessions(days=30):
+def create_activity_log_partitions(months_ahead=3):
+    """
+    Create monthly ActivityLog partitions ahead of time.
+
+    Args:
+        months_ahead: Number of future months to prepare (default: 3)
+    """
+    table = ActivityLog._meta.db_table
+    if not is_partitioned(table):
+        return "Activity logs are not partitioned"
+
+    created = create_partitions(table, months_ahead=months_ahead)
+    return f"Created {len(created)} activity log partitions"
+
+
+@shared_task
+def cleanup_old_sessions(days=30, batch_size=1000):
     """
     Clean up inactive sessions older than specified days.
 
     Args:
         days: Number of days to retain (default: 30)
+        batch_size: Rows deleted per batch
     """
     cutoff_date = timezone.now() - timedelta(days=days)
-    deleted_count, _ = UserSession.objects.filter(
-        is_active=False,
-        ended_at__lt=cutoff_date
-    ).delete()
+    deleted_count = delete_in_batches(
+        'analytics:cleanup_sessions',
+        UserSession.objects.filter(is_active=False, ended_at__lt=cutoff_date),
+        batch_size=batch_size,
+    )
     return f"Deleted {deleted_count} sessions older than {days} days"
 
 
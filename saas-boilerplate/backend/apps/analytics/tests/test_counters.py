@@ -0,0 +1,100 @@
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from apps.accounts.tests.factories import UserFactory
+from apps.analytics.counters import DashboardCounters
+from apps.analytics.models import UserSession
+from apps.organizations.tests.factories import OrganizationFactory
+from apps.subscriptions.models import Plan, Subscription
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def plan():
+    return Plan.objects.create(
+        id='starter',
+        name='Starter',
+        stripe_price_id_monthly='price_monthly',
+        stripe_price_id_yearly='price_yearly',
+        price_monthly=10,
+        price_yearly=100,
+    )
+
+
+@pytest.mark.django_db
+class TestDashboardCounters:
+    def test_reconcile_counts_from_database(self, plan):
+        UserFactory()
+        UserFactory(is_active=False, date_joined=timezone.now() - timedelta(days=3))
+        org = OrganizationFactory()
+        Subscription.objects.create(
+            organization=org,
+            plan=plan,
+            stripe_price_id='price_monthly',
+            billing_cycle='monthly',
+            current_period_start=timezone.now(),
+            current_period_end=timezone.now() + timedelta(days=30),
+            status='trialing',
+        )
+
+        stats = DashboardCounters.get_stats()
+
+        assert stats['users'] == {'total': 1, 'new_today': 1, 'new_this_week': 2, 'active_today': 0}
+        assert stats['organizations']['total'] == 1
+        assert stats['subscriptions'] == {'active': 0, 'trial': 1, 'cancelled': 0, 'new_today': 1}
+
+    def test_warm_counters_read_without_queries(self, django_assert_num_queries):
+        DashboardCounters.reconcile()
+
+        with django_assert_num_queries(0):
+            DashboardCounters.get_stats()
+
+    def test_signals_keep_counters_current(self, plan, django_capture_on_commit_callbacks):
+        DashboardCounters.reconcile()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user = UserFactory()
+            org = OrganizationFactory()
+            subscription = Subscription.objects.create(
+                organization=org,
+                plan=plan,
+                stripe_price_id='price_monthly',
+                billing_cycle='monthly',
+                current_period_start=timezone.now(),
+                current_period_end=timezone.now() + timedelta(days=30),
+                status='trialing',
+            )
+            UserSession.objects.create(user=user, session_key='session-1')
+            UserSession.objects.create(user=user, session_key='session-2')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            subscription = Subscription.objects.get(pk=subscription.pk)
+            subscription.status = 'active'
+            subscription.save()
+            user.is_active = False
+            user.save()
+
+        stats = DashboardCounters.get_stats()
+
+        assert stats['users'] == {'total': 0, 'new_today': 1, 'new_this_week': 1, 'active_today': 1}
+        assert stats['organizations']['new_today'] == 1
+        assert stats['subscriptions'] == {'active': 1, 'trial': 0, 'cancelled': 0, 'new_today': 1}
+
+    def test_reconcile_restores_active_markers(self, django_capture_on_commit_callbacks):
+        user = UserFactory()
+        session = UserSession.objects.create(user=user, session_key='session-1')
+        # Markers lost, e.g. evicted or written by another cache node
+        cache.clear()
+        DashboardCounters.reconcile()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            session.save()
+
+        assert DashboardCounters.get_stats()['users']['active_today'] == 1
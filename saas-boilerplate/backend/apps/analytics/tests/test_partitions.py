@@ -0,0 +1,104 @@
+import pytest
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from django.apps import apps
+from django.db import connection
+from django.utils import timezone
+from apps.accounts.tests.factories import UserFactory
+from apps.analytics.models import ActivityLog
+from apps.analytics.partitions import (
+    add_months,
+    create_partitions,
+    default_partition,
+    drop_partitions_before,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+from apps.analytics.tasks import cleanup_old_activity_logs, create_activity_log_partitions
+
+
+class TestPartitionHelpers:
+    def test_month_arithmetic(self):
+        assert month_start(datetime(2024, 3, 17, 12, 30)) == date(2024, 3, 1)
+        assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+        assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+    def test_partition_name(self):
+        assert partition_name('analytics_activitylog', date(2024, 3, 1)) == 'analytics_activitylog_p2024_03'
+
+
+postgres_only = pytest.mark.skipif(connection.vendor != 'postgresql', reason='Partitioning needs PostgreSQL')
+
+
+@pytest.mark.django_db
+class TestPartitionTasks:
+    @pytest.mark.skipif(connection.vendor == 'postgresql', reason='Checks the fallback of other databases')
+    def test_non_postgres_table_is_not_partitioned(self):
+        assert is_partitioned(ActivityLog._meta.db_table) is False
+        assert create_activity_log_partitions() == "Activity logs are not partitioned"
+
+    @pytest.mark.skipif(connection.vendor == 'postgresql', reason='Checks the fallback of other databases')
+    def test_cleanup_falls_back_to_delete(self):
+        user = UserFactory()
+        old = ActivityLog.objects.create(user=user, action='login')
+        ActivityLog.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=120))
+        recent = ActivityLog.objects.create(user=user, action='login')
+
+        assert cleanup_old_activity_logs(days=90) == "Deleted 1 activity logs older than 90 days"
+        assert list(ActivityLog.objects.values_list('pk', flat=True)) == [recent.pk]
+
+
+@postgres_only
+@pytest.mark.django_db
+class TestPostgresPartitions:
+    table = ActivityLog._meta.db_table
+
+    @pytest.fixture(autouse=True)
+    def partitioned(self):
+        # Tests run without migrations; the test transaction rolls this back
+        if not is_partitioned(self.table):
+            migration = import_module('apps.analytics.migrations.0002_partition_activitylog')
+            with connection.schema_editor() as schema_editor:
+                migration.partition_activitylog(apps, schema_editor)
+
+    def log_at(self, created_at):
+        log = ActivityLog.objects.create(user=UserFactory(), action='login')
+        ActivityLog.objects.filter(pk=log.pk).update(created_at=created_at)
+        return log
+
+    def count(self, partition):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(partition)}')
+            return cursor.fetchone()[0]
+
+    def test_migration_partitions_by_month(self):
+        current = month_start(timezone.now())
+
+        assert is_partitioned(self.table)
+        assert default_partition(self.table) == f'{self.table}_default'
+        assert partition_name(self.table, add_months(current, 3)) in dict(list_partitions(self.table))
+
+    def test_create_moves_rows_out_of_default_partition(self):
+        month = add_months(month_start(timezone.now()), 5)
+        self.log_at(timezone.make_aware(datetime(month.year, month.month, 10)))
+        default = default_partition(self.table)
+        assert self.count(default) == 1
+
+        created = create_partitions(self.table, months_ahead=5)
+
+        assert partition_name(self.table, month) in created
+        assert self.count(partition_name(self.table, month)) == 1
+        assert self.count(default) == 0
+        assert default_partition(self.table) == default
+
+    def test_drop_retires_expired_rows_in_default_partition(self):
+        oldest = list_partitions(self.table)[0][1]
+        expired = self.log_at(timezone.make_aware(datetime.combine(add_months(oldest, -6), datetime.min.time())))
+        kept = self.log_at(timezone.now())
+
+        drop_partitions_before(self.table, timezone.now() - timedelta(days=90))
+
+        assert not ActivityLog.objects.filter(pk=expired.pk).exists()
+        assert ActivityLog.objects.filter(pk=kept.pk).exists()
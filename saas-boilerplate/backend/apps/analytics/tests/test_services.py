@@ -0,0 +1,222 @@
+import json
+import logging
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from apps.accounts.tests.factories import UserFactory
+from apps.analytics.buffer import ActivityLogBuffer
+from apps.analytics.models import ActivityLog, DailyMetric
+from apps.analytics.services import ActivityLogger, MetricsAggregator, MetricsBackfill, RevenueCalculator
+from apps.organizations.tests.factories import OrganizationFactory
+from apps.subscriptions.models import Plan, Subscription
+
+
+@pytest.fixture
+def plan():
+    return Plan.objects.create(
+        id='starter',
+        name='Starter',
+        stripe_price_id_monthly='price_monthly',
+        stripe_price_id_yearly='price_yearly',
+        price_monthly=Decimal('30.00'),
+        price_yearly=Decimal('240.00'),
+    )
+
+
+def _subscribe(plan, billing_cycle='monthly', status='active'):
+    now = timezone.now()
+    return Subscription.objects.create(
+        organization=OrganizationFactory(),
+        plan=plan,
+        stripe_price_id=plan.stripe_price_id_monthly,
+        billing_cycle=billing_cycle,
+        current_period_start=now,
+        current_period_end=now + timedelta(days=30),
+        status=status,
+    )
+
+
+def _metric(date, metric_type):
+    return DailyMetric.objects.get(date=date, metric_type=metric_type).value
+
+
+@pytest.mark.django_db
+class TestMetricsAggregator:
+    def test_aggregate_daily_metrics(self, plan):
+        today = timezone.now().date()
+        UserFactory()
+        UserFactory(date_joined=timezone.now() - timedelta(days=3))
+        _subscribe(plan, billing_cycle='monthly')
+        _subscribe(plan, billing_cycle='yearly')
+        _subscribe(plan, status='canceled')
+
+        MetricsAggregator.aggregate_daily_metrics(today)
+
+        assert _metric(today, 'users.new') == 1
+        assert _metric(today, 'users.total') == 2
+        assert _metric(today, 'orgs.new') == 3
+        assert _metric(today, 'subs.new') == 2
+        assert _metric(today, 'subs.active') == 2
+        assert _metric(today, 'subs.cancelled') == 1
+        assert _metric(today, 'revenue.mrr') == Decimal('50.00')
+        assert _metric(today, 'revenue.arr') == Decimal('600.00')
+
+    def test_reaggregating_updates_existing_rows(self, plan):
+        today = timezone.now().date()
+        MetricsAggregator.aggregate_daily_metrics(today)
+        UserFactory()
+
+        MetricsAggregator.aggregate_daily_metrics(today)
+
+        assert DailyMetric.objects.filter(date=today).count() == len(DailyMetric.METRIC_TYPES)
+        assert _metric(today, 'users.new') == 1
+
+    def test_date_range_uses_constant_queries(self, django_assert_max_num_queries):
+        end = timezone.now().date()
+        start = end - timedelta(days=6)
+
+        with django_assert_max_num_queries(5):
+            written = MetricsAggregator.aggregate_date_range(start, end)
+
+        assert written == 7 * len(DailyMetric.METRIC_TYPES)
+
+
+@pytest.mark.django_db
+class TestRevenueCalculator:
+    def test_calculate_normalizes_billing_cycles_per_plan(self, plan, django_assert_num_queries):
+        pro = Plan.objects.create(
+            id='pro',
+            name='Pro',
+            stripe_price_id_monthly='price_pro_monthly',
+            stripe_price_id_yearly='price_pro_yearly',
+            price_monthly=Decimal('100.00'),
+            price_yearly=Decimal('960.00'),
+            display_order=2,
+        )
+        _subscribe(plan, billing_cycle='monthly')
+        _subscribe(plan, billing_cycle='yearly')
+        _subscribe(pro, billing_cycle='yearly')
+        _subscribe(pro, status='canceled')
+
+        with django_assert_num_queries(1):
+            revenue = RevenueCalculator.calculate()
+
+        assert revenue['mrr'] == Decimal('130.00')
+        assert revenue['arr'] == Decimal('1560.00')
+        assert [(entry['plan'], entry['subscriptions'], entry['mrr']) for entry in revenue['by_plan']] == [
+            ('starter', 2, Decimal('50.00')),
+            ('pro', 1, Decimal('80.00')),
+        ]
+
+    def test_calculate_without_subscriptions(self):
+        revenue = RevenueCalculator.calculate()
+
+        assert revenue == {'mrr': Decimal('0'), 'arr': Decimal('0'), 'by_plan': []}
+
+
+@pytest.mark.django_db
+class TestMetricsBackfill:
+    def test_chunks_cover_range(self):
+        start = timezone.now().date() - timedelta(days=9)
+        backfill = MetricsBackfill(start, start + timedelta(days=9), chunk_days=4)
+
+        assert backfill.chunks() == [
+            (start, start + timedelta(days=3)),
+            (start + timedelta(days=4), start + timedelta(days=7)),
+            (start + timedelta(days=8), start + timedelta(days=9)),
+        ]
+
+    def test_completed_chunks_are_skipped(self):
+        start = timezone.now().date() - timedelta(days=9)
+        backfill = MetricsBackfill(start, start + timedelta(days=9), chunk_days=4)
+        first_start, first_end = backfill.chunks()[0]
+
+        MetricsBackfill.run_chunk(backfill.checkpoint_key, first_start, first_end)
+
+        assert len(backfill.pending_chunks()) == 2
+        backfill.reset()
+        assert len(backfill.pending_chunks()) == 3
+
+    def test_command_backfills_range(self):
+        start = timezone.now().date() - timedelta(days=5)
+        out = StringIO()
+
+        call_command(
+            'backfill_daily_metrics',
+            '--start', start.isoformat(),
+            '--end', (start + timedelta(days=4)).isoformat(),
+            '--chunk-days', '2',
+            '--mode', 'serial',
+            '--restart',
+            stdout=out,
+        )
+
+        assert DailyMetric.objects.count() == 5 * len(DailyMetric.METRIC_TYPES)
+        assert 'Backfill complete.' in out.getvalue()
+
+    def test_command_rejects_invalid_workers(self):
+        with pytest.raises(CommandError, match='--workers'):
+            call_command('backfill_daily_metrics', '--start', '2026-01-01', '--workers', '0', stdout=StringIO())
+
+        assert not DailyMetric.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBufferedActivityLogger:
+    @pytest.fixture
+    def log_buffer(self, settings):
+        settings.ACTIVITY_LOG_BUFFERED = True
+        log_buffer = ActivityLogBuffer(max_size=3, batch_size=2, autostart=False)
+        with patch('apps.analytics.services.activity_log_buffer', log_buffer):
+            yield log_buffer
+
+    def test_logs_are_written_in_batches_on_flush(self, log_buffer, django_assert_num_queries):
+        user = UserFactory()
+        for _ in range(3):
+            ActivityLogger.log('user.login', user=user, source='test')
+
+        assert ActivityLog.objects.count() == 0
+        with django_assert_num_queries(2):
+            assert log_buffer.flush() == 3
+        assert ActivityLog.objects.filter(user=user, action='user.login').count() == 3
+
+    def test_full_buffer_falls_back_to_synchronous_write(self, log_buffer):
+        for _ in range(4):
+            ActivityLogger.log('user.logout')
+
+        assert ActivityLog.objects.count() == 1
+        log_buffer.flush()
+        assert ActivityLog.objects.count() == 4
+
+    def test_failed_write_is_requeued(self, log_buffer):
+        """Test a batch that fails to write is retried on the next flush."""
+        for _ in range(3):
+            ActivityLogger.log('user.login')
+
+        with patch.object(ActivityLog.objects, 'bulk_create', side_effect=DatabaseError('down')):
+            assert log_buffer.flush() == 0
+
+        assert log_buffer.flush() == 3
+        assert ActivityLog.objects.count() == 3
+
+    def test_exhausted_records_go_to_fallback_log(self, log_buffer, caplog):
+        """Test records that keep failing are logged for replay, not lost silently."""
+        log_buffer.max_attempts = 2
+        ActivityLogger.log('user.logout', source='test')
+
+        with patch.object(ActivityLog.objects, 'bulk_create', side_effect=DatabaseError('down')):
+            with caplog.at_level(logging.ERROR, logger='apps.analytics.audit_fallback'):
+                log_buffer.flush()
+                log_buffer.flush()
+
+        assert log_buffer.flush() == 0
+        fallback = [r for r in caplog.records if r.name == 'apps.analytics.audit_fallback']
+        assert len(fallback) == 1
+        record = json.loads(fallback[0].getMessage())
+        assert record['action'] == 'user.logout'
+        assert record['metadata'] == {'source': 'test'}
@@ -1,7 +1,9 @@
 import pytest
+from unittest.mock import patch
 from django.urls import reverse
 from rest_framework import status
-from apps.analytics.models import DailyMetric
+from apps.analytics.models import ActivityLog, DailyMetric
+from apps.analytics.services import MetricsAggregator
 from django.utils import timezone
 from datetime import timedelta
 
@@ -44,3 +46,77 @@ class TestAnalyticsViewSet:
         response = authenticated_client.get(url)
         
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_time_series_cached_until_aggregation(
+        self, authenticated_client, user, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        user.is_superuser = True
+        user.save()
+        today = timezone.now().date()
+        url = reverse('analytics:analytics-time-series')
+        params = {'metric_type': 'users.new', 'days': 3}
+
+        first = authenticated_client.get(url, params)
+        with django_assert_num_queries(0):
+            cached = authenticated_client.get(url, params)
+        with django_capture_on_commit_callbacks(execute=True):
+            MetricsAggregator.aggregate_daily_metrics(today)
+        refreshed = authenticated_client.get(url, params)
+
+        assert first.data == cached.data == []
+        assert refreshed.data == [{'date': today.isoformat(), 'value': 1.0}]
+
+
+@pytest.mark.django_db
+class TestActivityLogPagination:
+    @pytest.fixture
+    def logs(self, user):
+        user.is_superuser = True
+        user.save()
+        now = timezone.now()
+        logs = [ActivityLog.objects.create(user=user, action='user.login') for _ in range(5)]
+        # Two entries share a timestamp to exercise the id tie-breaker
+        for log, minutes in zip(logs, [5, 4, 4, 2, 1]):
+            ActivityLog.objects.filter(pk=log.pk).update(created_at=now - timedelta(minutes=minutes))
+        return sorted(
+            ActivityLog.objects.all(),
+            key=lambda log: (-log.created_at.timestamp(), str(log.id)),
+        )
+
+    def test_cursor_walks_every_row_once(self, authenticated_client, logs):
+        url = reverse('analytics:activity-log-list')
+        response = authenticated_client.get(url, {'page_size': 2})
+        seen = []
+        pages = [response]
+        while response.data['meta']['next']:
+            seen += [item['id'] for item in response.data['data']]
+            response = authenticated_client.get(response.data['meta']['next'])
+            pages.append(response)
+        seen += [item['id'] for item in response.data['data']]
+
+        assert seen == [str(log.id) for log in logs]
+        assert pages[0].data['meta']['previous'] is None
+        assert 'total_count' not in pages[0].data['meta']
+
+        previous = authenticated_client.get(pages[-1].data['meta']['previous'])
+        assert [item['id'] for item in previous.data['data']] == [str(log.id) for log in logs[2:4]]
+
+    def test_optional_count(self, authenticated_client, logs):
+        url = reverse('analytics:activity-log-list')
+        response = authenticated_client.get(url, {'include_count': 'true'})
+
+        assert response.data['meta']['total_count'] == 5
+
+    def test_invalid_cursor(self, authenticated_client, logs):
+        url = reverse('analytics:activity-log-list')
+        response = authenticated_client.get(url, {'cursor': 'not-a-cursor'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_count_uses_planner_estimate(self, authenticated_client, logs):
+        url = reverse('analytics:activity-log-list')
+        with patch('apps.core.pagination.estimate_count', return_value=250000):
+            response = authenticated_client.get(url, {'include_count': 'true'})
+
+        assert response.data['meta']['total_count'] == 250000
+        assert response.data['meta']['count_is_estimate'] is True
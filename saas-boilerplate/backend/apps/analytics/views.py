@@ -6,6 +6,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from apps.core.pagination import KeysetPagination
 from .models import ActivityLog, DailyMetric, UserSession
 from .serializers import (
     ActivityLogSerializer,
@@ -95,14 +96,14 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ActivityLog.objects.select_related('user').all()
     serializer_class = ActivityLogSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = KeysetPagination
+    count_estimate_threshold = 10000
     filterset_fields = ['action', 'user']
     search_fields = ['description', 'user__email']
-    ordering_fields = ['created_at']
-    ordering = ['-created_at']
 
     @extend_schema(
         summary="List activity logs",
-        description="Retrieve a paginated list of activity logs with filtering and search capabilities.",
+        description="Retrieve a cursor-paginated list of activity logs, newest first, with filtering and search capabilities.",
         tags=['Analytics'],
     )
     def list(self, request, *args, **kwargs):
@@ -126,13 +127,13 @@ class UserSessionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UserSession.objects.select_related('user').all()
     serializer_class = UserSessionSerializer
     permission_classes = [IsSuperUser]
+    pagination_class = KeysetPagination
+    count_estimate_threshold = 10000
     filterset_fields = ['user', 'is_active']
-    ordering_fields = ['started_at', 'last_activity']
-    ordering = ['-started_at']
 
     @extend_schema(
         summary="List user sessions",
-        description="Retrieve a paginated list of user sessions.",
+        description="Retrieve a cursor-paginated list of user sessions, newest first.",
         tags=['Analytics'],
     )
     def list(self, request, *args, **kwargs):
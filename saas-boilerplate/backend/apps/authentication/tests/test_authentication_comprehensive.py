@@ -21,7 +21,7 @@ from django.utils.encoding import force_bytes, force_str
 from rest_framework import status
 from apps.accounts.models import User, TOTPDevice, BackupCode
 from apps.accounts.tests.factories import UserFactory
-from django.test.utils import override_settings
+from apps.analytics.models import ActivityLog
 
 
 @pytest.mark.django_db
@@ -41,6 +41,16 @@ class TestLogin:
         assert response.status_code == status.HTTP_200_OK
         assert response.data is None
 
+    def test_login_is_audited(self, api_client):
+        """Test a successful login writes an activity log entry."""
+        user = UserFactory(email='audit@example.com')
+        user.set_password('SecurePass123!')
+        user.save()
+
+        api_client.post(reverse('login'), {'email': 'audit@example.com', 'password': 'SecurePass123!'})
+
+        assert ActivityLog.objects.filter(user=user, action='user.login').count() == 1
+
     def test_login_invalid_credentials(self, api_client):
         """Test login with invalid credentials returns 400."""
         user = UserFactory(email='test@example.com')
@@ -73,7 +83,6 @@ class TestLogin:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
-    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
     def test_login_rate_limiting(self, api_client):
         """Test login rate limiting (5 attempts per minute per IP)."""
         user = UserFactory(email='test@example.com')
@@ -82,20 +91,35 @@ class TestLogin:
 
         url = reverse('login')
 
-        # Make requests - rate limiting may kick in
-        # django-ratelimit uses 403 Forbidden when rate limit is exceeded
         for i in range(5):
             data = {'email': 'test@example.com', 'password': f'wrongpass{i}'}
             response = api_client.post(url, data)
-            # Should get 400 for wrong password, 403 if rate limited, or 200 if correct password
-            assert response.status_code in [status.HTTP_400_BAD_REQUEST, status.HTTP_200_OK, status.HTTP_403_FORBIDDEN]
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response['X-RateLimit-Limit'] == '5'
+            assert response['X-RateLimit-Remaining'] == str(4 - i)
 
-        # Additional request to verify rate limiting is active
-        # Note: django-ratelimit uses 403 by default when block=True
+        # The sixth attempt within the minute is throttled
         data = {'email': 'test@example.com', 'password': 'wrongpass6'}
         response = api_client.post(url, data)
-        # Should be rate limited or bad request
-        assert response.status_code in [status.HTTP_400_BAD_REQUEST, status.HTTP_403_FORBIDDEN]
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response['X-RateLimit-Remaining'] == '0'
+        assert int(response['Retry-After']) > 0
+
+    def test_login_rate_limiting_by_email(self, api_client):
+        """Test login attempts against one email are limited across IPs (10 per hour)."""
+        url = reverse('login')
+        data = {'email': 'Target@Example.com', 'password': 'wrongpass'}
+
+        for i in range(10):
+            response = api_client.post(url, data, REMOTE_ADDR=f'198.51.100.{i}')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = api_client.post(
+            url,
+            {'email': 'target@example.com', 'password': 'wrongpass'},
+            REMOTE_ADDR='198.51.100.200',
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
 
 
 @pytest.mark.django_db
@@ -695,6 +719,93 @@ class TestBackupCodes:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert '2fa' in response.data['error'].lower()
 
+    def test_generate_stores_hmac_in_one_insert(self, user, django_assert_num_queries):
+        """Test backup codes are created with a single INSERT and stored as HMACs."""
+        # One DELETE of the old unused codes, one INSERT
+        with django_assert_num_queries(2):
+            codes = BackupCode.generate_for_user(user, count=10)
+
+        assert len(codes) == 10
+        stored = set(BackupCode.objects.filter(user=user).values_list('code_hash', flat=True))
+        assert stored == {BackupCode.hash_code(code) for code in codes}
+        assert all(code_hash.startswith('hmac_sha256$') for code_hash in stored)
+
+    def test_use_code_takes_one_query(self, user, django_assert_num_queries):
+        """Test a valid backup code is consumed with one indexed UPDATE."""
+        codes = BackupCode.generate_for_user(user, count=10)
+
+        with django_assert_num_queries(1):
+            assert BackupCode.use_code(user, codes[0]) is True
+
+        assert BackupCode.objects.filter(user=user, used=True).count() == 1
+
+    def test_use_code_is_single_use(self, user):
+        """Test a backup code cannot be redeemed twice."""
+        codes = BackupCode.generate_for_user(user, count=2)
+
+        assert BackupCode.use_code(user, codes[0]) is True
+        assert BackupCode.use_code(user, codes[0]) is False
+
+    def test_use_code_normalizes_input(self, user):
+        """Test codes are accepted without the hyphen and in lower case."""
+        codes = BackupCode.generate_for_user(user, count=1)
+
+        assert BackupCode.use_code(user, codes[0].replace('-', '').lower()) is True
+
+    def test_use_code_rejects_other_users_code(self, user):
+        """Test a code only works for the user it was issued to."""
+        other = UserFactory()
+        codes = BackupCode.generate_for_user(other, count=1)
+
+        assert BackupCode.use_code(user, codes[0]) is False
+        assert BackupCode.objects.get(user=other).used is False
+
+    def test_use_code_accepts_legacy_hash(self, user):
+        """Test codes hashed with make_password before HMAC storage still work."""
+        from django.contrib.auth.hashers import make_password
+        BackupCode.objects.create(user=user, code_hash=make_password('ABCD1234'))
+
+        assert BackupCode.use_code(user, 'ABCD-1234') is True
+        assert BackupCode.objects.get(user=user).used is True
+
+    def test_status_flags_legacy_codes(self, authenticated_client, user):
+        """Test users holding legacy codes are told to regenerate them."""
+        from django.contrib.auth.hashers import make_password
+        device = TOTPDevice.create_for_user(user, name='Test Device')
+        device.confirmed = True
+        device.save()
+        BackupCode.objects.create(user=user, code_hash=make_password('ABCD1234'))
+
+        response = authenticated_client.get(reverse('totp-status'))
+        assert response.data['backup_codes_need_regeneration'] is True
+
+        BackupCode.generate_for_user(user, count=10)
+        response = authenticated_client.get(reverse('totp-status'))
+        assert response.data['backup_codes_need_regeneration'] is False
+
+    def test_use_code_accepts_non_string_input(self, user):
+        """Test a code sent as a JSON number is compared, not crashed on."""
+        assert BackupCode.use_code(user, 12345678) is False
+
+    def test_verify_login_rejects_numeric_token(self, authenticated_client, user):
+        """Test a numeric token in the JSON body gets a 400, not a 500."""
+        from django.core.cache import cache
+        session = authenticated_client.session
+        session.save()
+        cache.set(f'2fa_pending:{session.session_key}', user.id)
+
+        response = authenticated_client.post(reverse('totp-verify-login'), {'token': 12345678}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_hash_depends_on_pepper(self, settings):
+        """Test the stored hash is keyed with the server pepper."""
+        settings.BACKUP_CODE_PEPPER = 'pepper-one'
+        first = BackupCode.hash_code('ABCD-1234')
+        settings.BACKUP_CODE_PEPPER = 'pepper-two'
+
+        assert BackupCode.hash_code('ABCD-1234') != first
+
 
 @pytest.mark.django_db
 class TestCSRFToken:
@@ -32,13 +32,16 @@ def totp_status(request):
         return Response({
             'enabled': user.totp_enabled and device.confirmed,
             'device': serializer.data if device.confirmed else None,
-            'backup_codes_remaining': backup_codes_count
+            'backup_codes_remaining': backup_codes_count,
+            # Codes issued before HMAC hashing still work but should be replaced
+            'backup_codes_need_regeneration': BackupCode.has_legacy_codes(user)
         })
     except TOTPDevice.DoesNotExist:
         return Response({
             'enabled': False,
             'device': None,
-            'backup_codes_remaining': 0
+            'backup_codes_remaining': 0,
+            'backup_codes_need_regeneration': False
         })
 
 
@@ -282,7 +285,7 @@ def totp_verify_login(request):
     # Try TOTP verification first
     try:
         device = user.totp_device
-        if device.verified and device.verify_token(token):
+        if device.confirmed and device.verify_token(token):
             # Clear the pending 2FA flag
             cache.delete(f'2fa_pending:{request.session.session_key}')
             # Complete the login (this would integrate with your auth system)
@@ -291,14 +294,13 @@ def totp_verify_login(request):
         pass
     
     # Try backup code verification
-    for backup_code in user.backup_codes.filter(used=False):
-        if backup_code.verify_code(token):
-            # Clear the pending 2FA flag
-            cache.delete(f'2fa_pending:{request.session.session_key}')
-            return Response({
-                'message': '2FA verification successful using backup code.',
-                'backup_codes_remaining': user.backup_codes.filter(used=False).count()
-            })
+    if BackupCode.use_code(user, token):
+        # Clear the pending 2FA flag
+        cache.delete(f'2fa_pending:{request.session.session_key}')
+        return Response({
+            'message': '2FA verification successful using backup code.',
+            'backup_codes_remaining': user.backup_codes.filter(used=False).count()
+        })
     
     return Response(
         {'error': 'Invalid verification code or backup code.'},
@@ -9,9 +9,12 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from apps.core.ratelimit import RateLimiter, hash_identity
 
 User = get_user_model()
 
+PASSWORD_RESET_EMAIL_RATE = '3/h'
+
 
 def get_client_ip(request):
     """
@@ -198,21 +201,17 @@ def check_password_reset_rate_limit(email):
     Check if password reset requests are rate limited for an email.
     Limit: 3 requests per hour.
 
+    Uses the same limiter as ``PasswordResetView``'s email throttle, so a
+    request is counted once whichever of the two checks it.
+
     Args:
         email: Email address
 
     Returns:
         bool: True if rate limit exceeded, False otherwise
     """
-    cache_key = f'password_reset_limit:{email}'
-    attempts = cache.get(cache_key, 0)
-
-    if attempts >= 3:
-        return True
-
-    # Increment counter
-    cache.set(cache_key, attempts + 1, timeout=3600)
-    return False
+    identity = f'email:{hash_identity(email.strip().lower())}'
+    return not RateLimiter('password_reset', PASSWORD_RESET_EMAIL_RATE).hit(identity).allowed
 
 
 def invalidate_all_sessions(user):
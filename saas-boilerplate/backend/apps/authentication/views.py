@@ -5,20 +5,26 @@ from django.contrib.auth import login, logout
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from django.middleware.csrf import get_token
-from django_ratelimit.decorators import ratelimit
 from drf_spectacular.utils import extend_schema
 from .serializers import LoginSerializer, SignupSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer, VerifyEmailSerializer
 from apps.authentication.serializers import PasswordChangeSerializer
 from apps.accounts.serializers import UserSerializer, ProfileUpdateSerializer
 from apps.accounts.models import User
+from apps.analytics.services import ActivityLogger
+from apps.core.ratelimit import rate_limit
+from .utils import PASSWORD_RESET_EMAIL_RATE
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
-@method_decorator(ratelimit(key='ip', rate='5/m', method='POST', block=True), name='dispatch')
 class LoginView(views.APIView):
     """
-    Login endpoint with rate limiting (5 attempts per minute per IP).
+    Login endpoint with rate limiting (5 attempts per minute per IP and
+    10 per hour per email address).
     """
     permission_classes = [AllowAny]
+    throttle_classes = [
+        rate_limit('login', '5/m', key='ip'),
+        rate_limit('login', '10/h', key='email'),
+    ]
     serializer_class = LoginSerializer
 
     def post(self, request):
@@ -26,21 +32,23 @@ class LoginView(views.APIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         login(request, user)
+        ActivityLogger.log('user.login', user=user, request=request)
         return Response(None, status=status.HTTP_200_OK)
 
 class LogoutView(views.APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        ActivityLogger.log('user.logout', user=request.user, request=request)
         logout(request)
         return Response(None, status=status.HTTP_200_OK)
 
-@method_decorator(ratelimit(key='ip', rate='3/h', method='POST', block=True), name='dispatch')
 class SignupView(generics.CreateAPIView):
     """
     Signup endpoint with rate limiting (3 signups per hour per IP).
     """
     permission_classes = [AllowAny]
+    throttle_classes = [rate_limit('signup', '3/h', key='ip')]
     serializer_class = SignupSerializer
 
     def perform_create(self, serializer):
@@ -52,6 +60,7 @@ class SignupView(generics.CreateAPIView):
 
         # Create the user
         user = serializer.save()
+        ActivityLogger.log('user.register', user=user, request=self.request)
 
         # Generate email verification token
         token = default_token_generator.make_token(user)
@@ -86,12 +95,16 @@ The Team
             fail_silently=False,
         )
 
-@method_decorator(ratelimit(key='ip', rate='5/h', method='POST', block=True), name='dispatch')
 class PasswordResetView(views.APIView):
     """
-    Password reset request endpoint with rate limiting (5 per hour per IP).
+    Password reset request endpoint with rate limiting (5 per hour per IP
+    and 3 per hour per email address).
     """
     permission_classes = [AllowAny]
+    throttle_classes = [
+        rate_limit('password_reset', '5/h', key='ip'),
+        rate_limit('password_reset', PASSWORD_RESET_EMAIL_RATE, key='email'),
+    ]
     serializer_class = PasswordResetSerializer
 
     def post(self, request):
@@ -149,12 +162,12 @@ The Team
         # Always return success to prevent email enumeration
         return Response({"detail": "Password reset e-mail has been sent."}, status=status.HTTP_200_OK)
 
-@method_decorator(ratelimit(key='ip', rate='5/h', method='POST', block=True), name='dispatch')
 class PasswordResetConfirmView(views.APIView):
     """
     Password reset confirmation endpoint with rate limiting (5 per hour per IP).
     """
     permission_classes = [AllowAny]
+    throttle_classes = [rate_limit('password_reset_confirm', '5/h', key='ip')]
     serializer_class = PasswordResetConfirmSerializer
 
     def post(self, request):
@@ -266,12 +279,12 @@ class VerifyEmailView(views.APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-@method_decorator(ratelimit(key='user', rate='10/h', method='POST', block=True), name='dispatch')
 class PasswordChangeView(views.APIView):
     """
     Password change endpoint with rate limiting (10 per hour per user).
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [rate_limit('password_change', '10/h', key='user')]
     serializer_class = PasswordChangeSerializer
 
     @extend_schema(request=PasswordChangeSerializer, responses={200: None})
@@ -287,6 +300,7 @@ class PasswordChangeView(views.APIView):
             
             user.set_password(serializer.validated_data['new_password'])
             user.save()
+            ActivityLogger.log('user.password_change', user=user, request=request)
             return Response({'message': 'Password changed successfully.'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -0,0 +1,225 @@
+"""
+Admission control for expensive, CPU-bound work.
+
+Password hashing with Argon2 takes tens of milliseconds of CPU and a large
+block of memory. Run inline on a handful of sync gunicorn workers, a burst of
+logins can occupy every worker and starve cheap requests and health checks.
+``AdmissionPool`` caps how many such operations run at once across the
+workers of each host, makes callers wait at most a short queue budget for a
+slot, and fails fast once the budget is spent.
+
+Failing fast only happens inside DRF views, where ``AdmissionRejected``
+becomes a 503 with Retry-After; ``AdmissionControlMiddleware`` turns it on
+for them through ``reject_when_saturated``. Everywhere else (Django admin,
+allauth, management commands, Celery tasks) a caller that finds the pool
+saturated proceeds without a slot and is counted as an overflow.
+"""
+import logging
+import secrets
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .ratelimit import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Whether a saturated pool raises AdmissionRejected in the current context
+reject_when_saturated = ContextVar('reject_when_saturated', default=False)
+
+
+class AdmissionRejected(APIException):
+    """Raised when no slot frees up within the queue budget."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy. Please try again shortly.'
+    default_code = 'service_busy'
+
+    def __init__(self, detail=None, code=None, wait=1):
+        super().__init__(detail, code)
+        # Rendered as a Retry-After header by DRF's exception handler
+        self.wait = wait
+
+
+class AdmissionPool:
+    """
+    Bounded concurrency pool shared by the workers of one host through the
+    cache.
+
+    Each of the ``limit`` slots is a cache key claimed with ``cache.add``;
+    a slot expires after ``slot_timeout`` so a killed worker cannot leak it.
+    Slot keys include the host name, since the work is bound by the host's
+    CPU: ``limit`` applies per host, not to the whole fleet. Callers poll
+    for a free slot until ``queue_timeout`` has passed. A slot holds a
+    random token and is only released by its holder, so a holder that
+    outlived ``slot_timeout`` cannot free a slot someone else has since
+    taken.
+
+    Usage:
+        pool = AdmissionPool('password_hash', limit=2, queue_timeout=0.5)
+        with pool.admit():
+            run_expensive_work()
+
+    Counters for admitted, rejected and overflow calls, queue wait and hold
+    time are kept in the cache for the whole fleet; ``metrics()`` returns
+    them with the slots in use on this host.
+    """
+
+    POLL_INTERVAL = 0.02  # seconds
+    METRICS_TIMEOUT = 60 * 60 * 24  # seconds
+    COUNTERS = ('admitted', 'rejected', 'overflow', 'wait_ms', 'hold_ms')
+
+    # Deletes a slot only while it still holds the releasing caller's token
+    RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+    _release_script = None
+
+    def __init__(self, name, limit, queue_timeout, slot_timeout=10, host=None):
+        """
+        Args:
+            name: Namespace of the pool's cache keys
+            limit: Maximum number of concurrent holders per host
+            queue_timeout: Seconds a caller may wait for a slot
+            slot_timeout: Seconds after which an unreleased slot expires
+            host: Host the slots belong to (this machine's name by default)
+        """
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.slot_timeout = slot_timeout
+        self.host = host or socket.gethostname()
+
+    def slot_key(self, index):
+        return f'admission:{self.name}:{self.host}:slot:{index}'
+
+    def counter_key(self, counter):
+        return f'admission:{self.name}:{counter}'
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold a slot for the duration of the block.
+
+        If no slot frees up within ``queue_timeout``, the block runs without
+        a slot unless ``reject_when_saturated`` is set.
+
+        Raises:
+            AdmissionRejected: If no slot freed up within ``queue_timeout``
+                and ``reject_when_saturated`` is set
+        """
+        started = time.monotonic()
+        slot = self._acquire(started + self.queue_timeout)
+        admitted = time.monotonic()
+        wait_ms = int((admitted - started) * 1000)
+
+        if slot is None:
+            if reject_when_saturated.get():
+                self._record(rejected=1, wait_ms=wait_ms)
+                logger.warning(
+                    f"Admission pool {self.name} saturated: rejected after {wait_ms}ms "
+                    f"with {self.limit} slots in use"
+                )
+                raise AdmissionRejected(wait=max(1, int(self.queue_timeout + 0.999)))
+            self._record(overflow=1)
+            logger.warning(
+                f"Admission pool {self.name} saturated: running without a slot after {wait_ms}ms"
+            )
+
+        try:
+            yield
+        finally:
+            hold_ms = int((time.monotonic() - admitted) * 1000)
+            self._release(slot)
+            self._record(admitted=1, wait_ms=wait_ms, hold_ms=hold_ms)
+
+    def metrics(self):
+        """
+        Return the pool's counters and current occupancy.
+
+        Returns:
+            dict: limit, in_use, admitted, rejected, overflow, wait_ms, hold_ms and the
+            average wait and hold per admitted call in milliseconds
+        """
+        keys = {counter: self.counter_key(counter) for counter in self.COUNTERS}
+        slots = [self.slot_key(index) for index in range(self.limit)]
+        found = cache.get_many([*keys.values(), *slots])
+
+        data = {counter: found.get(key, 0) for counter, key in keys.items()}
+        admitted = data['admitted']
+        data.update({
+            'limit': self.limit,
+            'in_use': sum(1 for key in slots if key in found),
+            'avg_wait_ms': round(data['wait_ms'] / admitted, 1) if admitted else 0,
+            'avg_hold_ms': round(data['hold_ms'] / admitted, 1) if admitted else 0,
+        })
+        return data
+
+    def _acquire(self, deadline):
+        # An integer, which the Redis cache backends store unpickled, so the
+        # release script can compare it with the stored value
+        token = secrets.randbits(62)
+        while True:
+            for index in range(self.limit):
+                key = self.slot_key(index)
+                try:
+                    if cache.add(key, token, timeout=self.slot_timeout):
+                        return key, token
+                except Exception as e:
+                    # Without the cache there is nothing to coordinate on;
+                    # admit rather than fail every login
+                    logger.warning(f"Admission pool {self.name} unavailable: {e}")
+                    return ''
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def _release(self, slot):
+        if not slot:
+            return
+        key, token = slot
+        try:
+            client = get_redis_client(key)
+            if client is not None:
+                self._get_release_script(client)(keys=[cache.make_key(key)], args=[token], client=client)
+            elif cache.get(key) == token:
+                # Other backends are local to the process (LocMemCache), where
+                # the check and delete cannot interleave with another host
+                cache.delete(key)
+        except Exception as e:
+            logger.warning(f"Admission pool {self.name} release failed: {e}")
+
+    @classmethod
+    def _get_release_script(cls, client):
+        if cls._release_script is None:
+            cls._release_script = client.register_script(cls.RELEASE_SCRIPT)
+        return cls._release_script
+
+    def _record(self, **deltas):
+        for counter, delta in deltas.items():
+            if not delta:
+                continue
+            key = self.counter_key(counter)
+            try:
+                cache.add(key, 0, timeout=self.METRICS_TIMEOUT)
+                cache.incr(key, delta)
+            except Exception as e:
+                logger.warning(f"Admission pool {self.name} metrics update failed: {e}")
+
+
+def get_password_hash_pool():
+    """Return the pool guarding password hashing, built from settings."""
+    return AdmissionPool(
+        'password_hash',
+        limit=settings.PASSWORD_HASH_CONCURRENCY,
+        queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+        slot_timeout=settings.PASSWORD_HASH_SLOT_TIMEOUT,
+    )
@@ -0,0 +1,158 @@
+"""
+Read-through caching with stampede protection, and a small in-process LRU.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ReadThroughCache:
+    """
+    Read-through cache for a namespace of computed values.
+
+    Each value is stored with the namespace generation it was computed for and
+    a freshness deadline. Invalidating the namespace bumps the generation, so
+    existing values become stale without being deleted. When a value is stale,
+    a single caller takes a short lock and recomputes it while every other
+    caller keeps serving the stale value; only a cold key makes callers wait.
+
+    Usage:
+        metrics_cache = ReadThroughCache('analytics', timeout=3600)
+        data = metrics_cache.get('dashboard', compute_dashboard)
+        metrics_cache.invalidate()
+    """
+
+    LOCK_POLL_INTERVAL = 0.05  # seconds
+    LOCK_POLL_ATTEMPTS = 20
+
+    def __init__(self, namespace, timeout=300, stale_timeout=60 * 60 * 24, lock_timeout=30):
+        """
+        Args:
+            namespace: Prefix shared by all keys of this cache
+            timeout: Seconds a value is served as fresh
+            stale_timeout: Extra seconds a stale value is kept for serving
+                while it is being recomputed
+            lock_timeout: Upper bound on how long a recompute holds the lock
+        """
+        self.namespace = namespace
+        self.timeout = timeout
+        self.stale_timeout = stale_timeout
+        self.lock_timeout = lock_timeout
+
+    @property
+    def generation_key(self):
+        return f'{self.namespace}:generation'
+
+    def get(self, key, compute, timeout=None):
+        """
+        Return the cached value for ``key``, computing it when needed.
+
+        Args:
+            key: Key within the namespace
+            compute: Callable producing the value
+            timeout: Freshness override for this key
+
+        Returns:
+            The cached or freshly computed value
+        """
+        cache_key = f'{self.namespace}:{key}'
+        try:
+            found = cache.get_many([cache_key, self.generation_key])
+        except Exception as e:
+            logger.warning(f"Cache read failed for {cache_key}: {e}")
+            return compute()
+
+        generation = found.get(self.generation_key, 0)
+        entry = found.get(cache_key)
+        if entry and entry['generation'] == generation and entry['fresh_until'] > time.time():
+            return entry['value']
+
+        lock_key = f'{cache_key}:lock'
+        if cache.add(lock_key, 1, timeout=self.lock_timeout):
+            try:
+                value = compute()
+                self._store(cache_key, value, generation, timeout)
+                return value
+            finally:
+                cache.delete(lock_key)
+
+        if entry:
+            # Another worker is refreshing this key
+            return entry['value']
+
+        for _ in range(self.LOCK_POLL_ATTEMPTS):
+            time.sleep(self.LOCK_POLL_INTERVAL)
+            entry = cache.get(cache_key)
+            if entry:
+                return entry['value']
+
+        return compute()
+
+    def invalidate(self):
+        """Mark every value in the namespace as stale."""
+        try:
+            cache.add(self.generation_key, 0, timeout=None)
+            cache.incr(self.generation_key)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {self.namespace}: {e}")
+
+    def _store(self, cache_key, value, generation, timeout):
+        fresh_for = self.timeout if timeout is None else timeout
+        entry = {
+            'value': value,
+            'generation': generation,
+            'fresh_until': time.time() + fresh_for,
+        }
+        cache.set(cache_key, entry, timeout=fresh_for + self.stale_timeout)
+
+
+class LocalLRUCache:
+    """
+    Thread-safe, size-bounded in-process cache with a per-entry TTL.
+
+    Entries cannot be invalidated across processes, so the TTL bounds how
+    long another worker's change can go unnoticed. Use it in front of the
+    shared cache for small, hot, rarely changing values.
+    """
+
+    def __init__(self, max_size=1024, timeout=30):
+        """
+        Args:
+            max_size: Maximum number of entries kept
+            timeout: Seconds an entry is served before it expires
+        """
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
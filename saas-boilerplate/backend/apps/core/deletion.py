@@ -0,0 +1,114 @@
+"""
+Batched deletion for large retention jobs.
+
+Deleting a large queryset in one statement holds locks for the whole run,
+produces one huge replication event and, when Django has to collect related
+objects, loads every row into memory. ``BatchDeleter`` walks the primary key
+index instead and deletes bounded key ranges, pausing between batches.
+"""
+import logging
+import time
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class BatchDeleter:
+    """
+    Delete the rows of a queryset in primary key ranges.
+
+    Each batch looks up the key that closes the next range of ``batch_size``
+    matching rows and deletes everything up to it with
+    ``QuerySet.delete()``, so cascades and signals still apply but at most
+    one batch is ever in memory. Progress is checkpointed in the cache after
+    every batch; a run interrupted by a killed worker resumes after the last
+    completed range.
+
+    Usage:
+        deleter = BatchDeleter('cleanup-sessions', UserSession.objects.filter(...))
+        deleted = deleter.run()
+    """
+
+    CHECKPOINT_TIMEOUT = 60 * 60 * 24  # seconds
+
+    def __init__(self, name, queryset, batch_size=1000, pause=0.1, progress=None):
+        """
+        Args:
+            name: Stable identifier of the job, used for its checkpoint
+            queryset: Rows to delete
+            batch_size: Maximum rows deleted per statement
+            pause: Seconds to sleep between batches
+            progress: Optional callable receiving ``(deleted, batches)``
+                after each batch
+        """
+        self.name = name
+        self.queryset = queryset.order_by()
+        self.batch_size = batch_size
+        self.pause = pause
+        self.progress = progress
+
+    @property
+    def checkpoint_key(self):
+        return f'core:batch_delete:{self.name}'
+
+    def run(self):
+        """
+        Delete every matching row, resuming from the last checkpoint.
+
+        Returns:
+            int: Number of rows deleted by this job, including resumed runs
+        """
+        checkpoint = cache.get(self.checkpoint_key) or {}
+        cursor = checkpoint.get('cursor')
+        deleted = checkpoint.get('deleted', 0)
+        batches = 0
+        if cursor is not None:
+            logger.info(f"Resuming batch delete {self.name} after {deleted} rows")
+
+        while True:
+            batch = self.queryset if cursor is None else self.queryset.filter(pk__gt=cursor)
+            upper = (
+                batch.order_by('pk')
+                .values_list('pk', flat=True)[self.batch_size - 1:self.batch_size]
+                .first()
+            )
+            if upper is not None:
+                batch = batch.filter(pk__lte=upper)
+
+            count, _ = batch.delete()
+            deleted += count
+            batches += 1
+            if self.progress:
+                self.progress(deleted, batches)
+
+            if upper is None:
+                break
+
+            cursor = upper
+            cache.set(
+                self.checkpoint_key,
+                {'cursor': cursor, 'deleted': deleted},
+                timeout=self.CHECKPOINT_TIMEOUT,
+            )
+            logger.info(f"Batch delete {self.name}: {deleted} rows deleted")
+            if self.pause:
+                time.sleep(self.pause)
+
+        cache.delete(self.checkpoint_key)
+        logger.info(f"Batch delete {self.name} finished: {deleted} rows deleted")
+        return deleted
+
+
+def delete_in_batches(name, queryset, **kwargs):
+    """
+    Delete a queryset in bounded batches.
+
+    Args:
+        name: Stable identifier of the job, used for its checkpoint
+        queryset: Rows to delete
+        **kwargs: Options passed to ``BatchDeleter``
+
+    Returns:
+        int: Number of rows deleted
+    """
+    return BatchDeleter(name, queryset, **kwargs).run()
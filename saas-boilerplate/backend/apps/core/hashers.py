@@ -0,0 +1,27 @@
+"""
+Password hashers that run under admission control.
+"""
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from .admission import get_password_hash_pool
+
+
+class AdmissionControlledArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 hasher whose hashing and verification take a slot in the
+    password hash pool (see ``apps.core.admission``).
+
+    Login (``authenticate``, including its dummy hash for unknown users),
+    signup (``set_password``) and every other password check go through the
+    hasher, so they all share one concurrency limit. When the pool is
+    saturated inside a DRF view ``AdmissionRejected`` is raised and DRF
+    answers 503 with a Retry-After header; elsewhere the hash runs anyway.
+    The algorithm name is unchanged, so existing hashes keep verifying.
+    """
+
+    def encode(self, password, salt):
+        with get_password_hash_pool().admit():
+            return super().encode(password, salt)
+
+    def verify(self, password, encoded):
+        with get_password_hash_pool().admit():
+            return super().verify(password, encoded)
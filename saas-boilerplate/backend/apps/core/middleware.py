@@ -1,9 +0,0 @@
-class TenantMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        # Logic to determine tenant from request (e.g. header or subdomain)
-        # For now, we'll just pass through
-        response = self.get_response(request)
-        return response
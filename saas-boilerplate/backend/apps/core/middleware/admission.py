@@ -0,0 +1,31 @@
+"""
+Admission control middleware.
+"""
+from rest_framework.views import APIView
+from apps.core.admission import reject_when_saturated
+
+
+class AdmissionControlMiddleware:
+    """
+    Let admission pools reject work inside DRF views only.
+
+    DRF's exception handler turns ``AdmissionRejected`` into a 503 with
+    Retry-After; a plain Django view (the admin, allauth) would answer 500
+    instead, so for those a saturated pool lets the caller through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = reject_when_saturated.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            reject_when_saturated.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if isinstance(view_class, type) and issubclass(view_class, APIView):
+            reject_when_saturated.set(True)
+        return None
@@ -3,6 +3,8 @@ Security Middleware
 
 Adds additional security headers to all responses.
 """
+import math
+from apps.core.ratelimit import REQUEST_ATTR
 
 
 class SecurityHeadersMiddleware:
@@ -67,7 +69,9 @@ class RateLimitHeadersMiddleware:
     """
     Adds rate limit information to responses.
 
-    Works with Django Ratelimit or similar packages.
+    Renders the most restrictive decision recorded by the throttles in
+    ``apps.core.ratelimit`` as ``X-RateLimit-Limit``, ``X-RateLimit-Remaining``
+    and ``X-RateLimit-Reset`` (seconds until the limit is fully restored).
     """
 
     def __init__(self, get_response):
@@ -76,11 +80,13 @@ class RateLimitHeadersMiddleware:
     def __call__(self, request):
         response = self.get_response(request)
 
-        # Add rate limit headers if rate limiting is enabled
-        if hasattr(request, 'limited'):
-            response['X-RateLimit-Limit'] = getattr(request, 'ratelimit_limit', '')
-            response['X-RateLimit-Remaining'] = getattr(request, 'ratelimit_remaining', '')
-            response['X-RateLimit-Reset'] = getattr(request, 'ratelimit_reset', '')
+        result = getattr(request, REQUEST_ATTR, None)
+        if result is not None:
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = str(result.remaining)
+            response['X-RateLimit-Reset'] = str(math.ceil(result.reset_after))
+            if not result.allowed:
+                response.setdefault('Retry-After', str(math.ceil(result.retry_after)))
 
         return response
 
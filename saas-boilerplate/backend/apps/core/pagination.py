@@ -1,18 +1,283 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-class StandardResultsSetPagination(PageNumberPagination):
+
+def estimate_count(queryset):
+    """
+    Return the PostgreSQL planner's row estimate for a queryset.
+
+    Unfiltered querysets read ``pg_class.reltuples`` of the table, or of its
+    leaf partitions for a partitioned table (once analyzed, the parent also
+    carries an estimate covering its partitions, so it is left out); anything
+    else uses the row estimate of ``EXPLAIN``.
+
+    Returns:
+        int or None: The estimate, or None on other database backends
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            table = connection.ops.quote_name(queryset.model._meta.db_table)
+            cursor.execute(
+                """
+                WITH RECURSIVE tree(oid) AS (
+                    SELECT %s::regclass::oid
+                    UNION ALL
+                    SELECT i.inhrelid FROM pg_inherits i JOIN tree t ON i.inhparent = t.oid
+                )
+                SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+                FROM pg_class c JOIN tree t ON c.oid = t.oid
+                WHERE c.relkind = 'r'
+                """,
+                [table],
+            )
+            return int(cursor.fetchone()[0])
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset, estimate_threshold=None):
+    """
+    Count a queryset, trusting the planner estimate for large results.
+
+    Args:
+        queryset: Rows to count
+        estimate_threshold: Estimates at or above this are returned as is;
+            None always counts exactly
+
+    Returns:
+        tuple: (count, whether the count is an estimate)
+    """
+    if estimate_threshold is not None:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= estimate_threshold:
+            return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Django paginator whose count may come from the planner estimate.
+    """
+
+    def __init__(self, *args, estimate_threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate_threshold = estimate_threshold
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        count, self.count_is_estimate = count_rows(self.object_list, self.estimate_threshold)
+        return count
+
+
+class CountEstimateMixin:
+    """
+    Per-viewset opt-in to estimated counts.
+
+    Views set ``count_estimate_threshold``; results the planner expects to
+    reach that many rows report its estimate instead of running COUNT(*),
+    and the response meta carries ``count_is_estimate``.
+    """
+    count_estimate_threshold = None
+
+    def get_count_estimate_threshold(self, view):
+        return getattr(view, 'count_estimate_threshold', self.count_estimate_threshold)
+
+
+class StandardResultsSetPagination(CountEstimateMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+    def paginate_queryset(self, queryset, request, view=None):
+        self.estimate_threshold = self.get_count_estimate_threshold(view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return EstimatedCountPaginator(object_list, per_page, estimate_threshold=self.estimate_threshold)
+
     def get_paginated_response(self, data):
+        meta = {
+            'page': self.page.number,
+            'page_size': self.page.paginator.per_page,
+            'total_count': self.page.paginator.count,
+            'total_pages': self.page.paginator.num_pages
+        }
+        if self.estimate_threshold is not None:
+            meta['count_is_estimate'] = self.page.paginator.count_is_estimate
         return Response({
             'data': data,
-            'meta': {
-                'page': self.page.number,
-                'page_size': self.page.paginator.per_page,
-                'total_count': self.page.paginator.count,
-                'total_pages': self.page.paginator.num_pages
-            }
+            'meta': meta
         })
+
+
+class KeysetPagination(CountEstimateMixin, BasePagination):
+    """
+    Cursor pagination keyed on an ordered (field, tie-breaker) pair.
+
+    Each page continues from the key of the last row of the previous one, so
+    deep pages cost the same index range scan as the first page: there is no
+    OFFSET and no COUNT(*) unless the client asks for one with
+    ``?include_count=true``. Results keep the ``{'data', 'meta'}`` envelope.
+
+    The ordering is fixed by the paginator; ``?ordering=`` is ignored.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    ordering = ('-created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.estimate_threshold = self.get_count_estimate_threshold(view)
+        self.count, self.count_is_estimate = (
+            self.get_count(queryset) if self.count_requested(request) else (None, False)
+        )
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self._reversed(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, bool(results)
+        else:
+            self.has_previous, self.has_next = position is not None and bool(results), has_more
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        meta = {
+            'page_size': self.page_size,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            meta['total_count'] = self.count
+            if self.estimate_threshold is not None:
+                meta['count_is_estimate'] = self.count_is_estimate
+        return Response({'data': data, 'meta': meta})
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_count(self, queryset):
+        return count_rows(queryset, self.estimate_threshold)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        """
+        Build the URL of the page after (or before) ``instance``.
+        """
+        position = [str(getattr(instance, name.lstrip('-'))) for name in self.ordering]
+        payload = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'))
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        """
+        Parse the cursor query parameter.
+
+        Returns:
+            tuple: (position values or None, reverse flag)
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            position = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, payload['p'], strict=True)
+            ]
+            return position, bool(payload['r'])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include the total number of results.',
+                'schema': {'type': 'boolean'},
+            },
+        ]
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    @staticmethod
+    def _after(position, ordering):
+        # key <= value AND (key < value OR tie-breaker after) keeps the
+        # leading condition a plain index range
+        (field, tie), (value, tie_value) = ordering, position
+        field_name, tie_name = field.lstrip('-'), tie.lstrip('-')
+        strict, inclusive = ('lt', 'lte') if field.startswith('-') else ('gt', 'gte')
+        tie_strict = 'lt' if tie.startswith('-') else 'gt'
+        return Q(**{f'{field_name}__{inclusive}': value}) & (
+            Q(**{f'{field_name}__{strict}': value}) | Q(**{f'{tie_name}__{tie_strict}': tie_value})
+        )
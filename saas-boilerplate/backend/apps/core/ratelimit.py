@@ -0,0 +1,349 @@
+"""
+Rate limiting with the generic cell rate algorithm (GCRA) and token buckets.
+
+GCRA stores a single timestamp per key, the "theoretical arrival time"
+(TAT), and behaves like a sliding window without keeping a log of hits.
+With Redis as the cache, each decision is one EVALSHA of a Lua script that
+reads the clock, checks and updates the TAT atomically, so concurrent
+requests cannot slip past the limit and the key expires exactly when its
+window drains. ``TokenBucket`` does the same for quotas whose burst size is
+set apart from the sustained rate. Other cache backends (LocMemCache in
+development and tests) run the same algorithms in-process under a lock.
+
+DRF views opt in through ``rate_limit``, which builds a throttle class:
+
+    class LoginView(APIView):
+        throttle_classes = [
+            rate_limit('login', '5/m', key='ip'),
+            rate_limit('login', '10/h', key='email'),
+        ]
+
+The most restrictive decision of a request is stored on it and rendered as
+``X-RateLimit-*`` headers by ``RateLimitHeadersMiddleware``.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import NamedTuple
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ATTR = 'ratelimit'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, tostring(allow_at - now), tostring(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'EX', math.max(1, math.ceil(new_tat - now)))
+return {1, math.floor((now - allow_at) / emission), '0', tostring(new_tat - now)}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+if tokens < 1 then
+    return {0, 0, tostring((1 - tokens) / rate), tostring((burst - tokens) / rate)}
+end
+tokens = tokens - 1
+local reset_after = (burst - tokens) / rate
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.max(1, math.ceil(reset_after)))
+return {1, math.floor(tokens), '0', tostring(reset_after)}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of one rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request is allowed
+    reset_after: float  # seconds until the limit is fully restored
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as '5/m' or '100/h'.
+
+    Returns:
+        tuple: (limit, period in seconds)
+    """
+    count, _, unit = rate.partition('/')
+    return int(count), PERIODS[unit[-1]] * int(unit[:-1] or 1)
+
+
+class BaseLimiter:
+    """
+    Shared plumbing of the limiters: key naming, the Redis script call and
+    the in-process fallback.
+
+    Subclasses set ``SCRIPT`` and implement ``script_args`` and
+    ``_hit_local``; both return (allowed, remaining, retry_after,
+    reset_after).
+    """
+
+    KEY_PREFIX = 'ratelimit'
+    SCRIPT = None
+
+    _local_lock = threading.Lock()
+    _scripts = {}
+
+    scope = None
+    limit = None
+
+    def key(self, identity):
+        raise NotImplementedError
+
+    def script_args(self):
+        raise NotImplementedError
+
+    def hit(self, identity):
+        """
+        Count one request for ``identity`` if the limit allows it.
+
+        Args:
+            identity: What is being limited, e.g. 'ip:203.0.113.7'
+
+        Returns:
+            RateLimitResult: The decision; denied requests are not counted
+        """
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return RateLimitResult(True, self.limit, self.limit, 0, 0)
+
+        key = self.key(identity)
+        try:
+            client = get_redis_client(key)
+            if client is not None:
+                allowed, remaining, retry_after, reset_after = self._get_script(client)(
+                    keys=[cache.make_key(key)],
+                    args=self.script_args(),
+                    client=client,
+                )
+            else:
+                with self._local_lock:
+                    allowed, remaining, retry_after, reset_after = self._hit_local(key, time.time())
+        except Exception as e:
+            # Fail open: an unavailable cache must not lock everyone out
+            logger.warning(f"Rate limit check failed for {self.scope}: {e}")
+            return RateLimitResult(True, self.limit, self.limit, 0, 0)
+
+        return RateLimitResult(
+            allowed=bool(int(allowed)),
+            limit=self.limit,
+            remaining=int(remaining),
+            retry_after=float(retry_after),
+            reset_after=float(reset_after),
+        )
+
+    def reset(self, identity):
+        """Forget the requests counted for ``identity``."""
+        cache.delete(self.key(identity))
+
+    def _hit_local(self, key, now):
+        raise NotImplementedError
+
+    @classmethod
+    def _get_script(cls, client):
+        # The Script object caches the SHA and reloads the script on
+        # NOSCRIPT; the client is passed on every call
+        script = cls._scripts.get(cls.SCRIPT)
+        if script is None:
+            script = cls._scripts[cls.SCRIPT] = client.register_script(cls.SCRIPT)
+        return script
+
+
+class RateLimiter(BaseLimiter):
+    """
+    GCRA limiter allowing ``limit`` requests per ``period`` and key.
+
+    Requests are spread over the period at one per ``period / limit``
+    seconds, with bursts of up to ``limit`` requests.
+    """
+
+    SCRIPT = GCRA_SCRIPT
+
+    def __init__(self, scope, rate):
+        """
+        Args:
+            scope: Namespace of the limiter's keys, e.g. 'login'
+            rate: Allowed rate, e.g. '5/m'
+        """
+        self.scope = scope
+        self.rate = rate
+        self.limit, self.period = parse_rate(rate)
+        self.emission = self.period / self.limit
+
+    def key(self, identity):
+        return f'{self.KEY_PREFIX}:{self.scope}:{self.limit}/{self.period}:{identity}'
+
+    def script_args(self):
+        return [self.emission, self.period]
+
+    def _hit_local(self, key, now):
+        tat = max(cache.get(key) or now, now)
+        new_tat = tat + self.emission
+        allow_at = new_tat - self.period
+        if now < allow_at:
+            return 0, 0, allow_at - now, tat - now
+        cache.set(key, new_tat, timeout=max(1, math.ceil(new_tat - now)))
+        return 1, math.floor((now - allow_at) / self.emission), 0, new_tat - now
+
+
+class TokenBucket(BaseLimiter):
+    """
+    Token bucket holding up to ``burst`` tokens, refilled at ``rate`` tokens
+    per second; every request takes one token.
+
+    Unlike ``RateLimiter`` the sustained rate and the burst size are set
+    independently, which suits quotas such as "600 requests per minute in
+    bursts of at most 100".
+    """
+
+    SCRIPT = TOKEN_BUCKET_SCRIPT
+
+    def __init__(self, scope, rate, burst):
+        """
+        Args:
+            scope: Namespace of the bucket keys, e.g. 'organization'
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.scope = scope
+        self.rate = rate
+        self.burst = self.limit = int(burst)
+
+    def key(self, identity):
+        return f'{self.KEY_PREFIX}:{self.scope}:bucket:{identity}'
+
+    def script_args(self):
+        return [self.rate, self.burst]
+
+    def _hit_local(self, key, now):
+        tokens, updated_at = cache.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + max(0, now - updated_at) * self.rate)
+        if tokens < 1:
+            return 0, 0, (1 - tokens) / self.rate, (self.burst - tokens) / self.rate
+        tokens -= 1
+        reset_after = (self.burst - tokens) / self.rate
+        cache.set(key, (tokens, now), timeout=max(1, math.ceil(reset_after)))
+        return 1, math.floor(tokens), 0, reset_after
+
+
+def get_redis_client(key):
+    """Return the raw redis-py client behind the default cache, if any."""
+    backend = getattr(cache, '_cache', None)
+    if backend is not None and hasattr(backend, 'get_client'):
+        # django.core.cache.backends.redis.RedisCache
+        return backend.get_client(key, write=True)
+    client = getattr(cache, 'client', None)
+    if client is not None and hasattr(client, 'get_client'):
+        # django-redis
+        return client.get_client(write=True)
+    return None
+
+
+def record(request, result):
+    """
+    Keep the most restrictive rate limit decision of a request for the
+    ``X-RateLimit-*`` headers.
+    """
+    http_request = getattr(request, '_request', request)
+    current = getattr(http_request, REQUEST_ATTR, None)
+    if current is None or (not result.allowed, -result.remaining) > (not current.allowed, -current.remaining):
+        setattr(http_request, REQUEST_ATTR, result)
+
+
+def hash_identity(value):
+    """Key identities such as email addresses without storing them in clear."""
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+class RateLimitThrottle(BaseThrottle):
+    """
+    DRF throttle backed by ``RateLimiter``.
+
+    Subclasses (usually built with ``rate_limit``) set ``scope``, ``rate``,
+    ``key`` and ``methods``. Supported keys:
+    - 'ip': the client address, honouring NUM_PROXIES
+    - 'user': the authenticated user, falling back to the address
+    - 'email': the ``email`` field of the request body; requests without
+      one are not limited by this throttle
+    """
+
+    scope = None
+    rate = None
+    key = 'ip'
+    methods = ('POST',)
+
+    def allow_request(self, request, view):
+        if self.methods and request.method not in self.methods:
+            return True
+
+        identity = self.get_identity(request)
+        if identity is None:
+            return True
+
+        self.result = RateLimiter(self.scope, self.rate).hit(identity)
+        record(request, self.result)
+        return self.result.allowed
+
+    def get_identity(self, request):
+        if self.key == 'user':
+            if request.user and request.user.is_authenticated:
+                return f'user:{request.user.pk}'
+            return f'ip:{self.get_ident(request)}'
+        if self.key == 'email':
+            email = request.data.get('email') if hasattr(request.data, 'get') else None
+            if not email or not isinstance(email, str):
+                return None
+            return f'email:{hash_identity(email.strip().lower())}'
+        return f'ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return math.ceil(self.result.retry_after)
+
+
+def rate_limit(scope, rate, key='ip', methods=('POST',)):
+    """
+    Build a ``RateLimitThrottle`` for a view's ``throttle_classes``.
+
+    Args:
+        scope: Namespace shared by the limits of one endpoint
+        rate: Allowed rate, e.g. '5/m'
+        key: 'ip', 'user' or 'email'
+        methods: HTTP methods that are limited; empty for all
+
+    Returns:
+        type: Throttle class
+    """
+    name = f'{scope.title().replace("_", "")}{key.title()}RateLimitThrottle'
+    return type(name, (RateLimitThrottle,), {
+        'scope': scope,
+        'rate': rate,
+        'key': key,
+        'methods': tuple(methods),
+    })
@@ -1,5 +1,5 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -29,6 +29,38 @@ def send_email_task(subject, recipient_list, template_name, context):
         logger.error(f"Failed to send email '{subject}' to {recipient_list}: {e}")
         raise e
 
+def send_email_batch(messages):
+    """
+    Send several HTML emails over a single mail connection.
+
+    Args:
+        messages: List of dicts with subject, recipient_list, template_name
+            and context, as taken by send_email_task
+
+    Returns:
+        list: Indexes of the messages that could not be sent
+    """
+    failed = []
+    with get_connection(fail_silently=False) as connection:
+        for index, message in enumerate(messages):
+            try:
+                html_message = render_to_string(message['template_name'], message['context'])
+                email = EmailMultiAlternatives(
+                    subject=message['subject'],
+                    body=strip_tags(html_message),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=message['recipient_list'],
+                    connection=connection,
+                )
+                email.attach_alternative(html_message, 'text/html')
+                email.send()
+            except Exception as e:
+                logger.error(f"Failed to send email '{message['subject']}' to {message['recipient_list']}: {e}")
+                failed.append(index)
+
+    logger.info(f"Sent {len(messages) - len(failed)} of {len(messages)} batched emails")
+    return failed
+
 @shared_task
 def debug_periodic_task():
     logger.info("Periodic task executed successfully.")
@@ -0,0 +1,197 @@
+"""
+Tests for admission control of password hashing.
+"""
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from apps.accounts.tests.factories import UserFactory
+from apps.core.admission import AdmissionPool, AdmissionRejected, get_password_hash_pool, reject_when_saturated
+
+ADMISSION_HASHERS = ['apps.core.hashers.AdmissionControlledArgon2PasswordHasher']
+
+
+@pytest.fixture
+def rejecting():
+    token = reject_when_saturated.set(True)
+    yield
+    reject_when_saturated.reset(token)
+
+
+def fill(pool):
+    """Take every slot of a pool, as concurrent hashes on other workers would."""
+    for index in range(pool.limit):
+        cache.set(pool.slot_key(index), 'busy', timeout=60)
+
+
+class TestAdmissionPool:
+    """Tests for AdmissionPool."""
+
+    def test_admit_holds_and_releases_slot(self):
+        """Test a slot is held inside the block and released after it."""
+        pool = AdmissionPool('test', limit=2, queue_timeout=0)
+
+        with pool.admit():
+            assert pool.metrics()['in_use'] == 1
+
+        metrics = pool.metrics()
+        assert metrics['in_use'] == 0
+        assert metrics['admitted'] == 1
+        assert metrics['rejected'] == 0
+
+    def test_admit_releases_slot_on_error(self):
+        """Test an exception inside the block does not leak the slot."""
+        pool = AdmissionPool('test', limit=1, queue_timeout=0)
+
+        with pytest.raises(ValueError):
+            with pool.admit():
+                raise ValueError
+
+        assert pool.metrics()['in_use'] == 0
+
+    def test_saturated_pool_rejects(self, rejecting):
+        """Test callers are rejected once the queue budget is spent."""
+        pool = AdmissionPool('test', limit=2, queue_timeout=0)
+        fill(pool)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with pool.admit():
+                pass
+
+        assert excinfo.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert excinfo.value.wait >= 1
+        assert pool.metrics()['rejected'] == 1
+        assert pool.metrics()['admitted'] == 0
+
+    def test_saturated_pool_lets_caller_through_outside_drf(self):
+        """Test code outside DRF views runs without a slot instead of failing."""
+        pool = AdmissionPool('test', limit=1, queue_timeout=0)
+        fill(pool)
+        ran = False
+
+        with pool.admit():
+            ran = True
+
+        assert ran
+        metrics = pool.metrics()
+        assert metrics['overflow'] == 1
+        assert metrics['rejected'] == 0
+
+    def test_waiter_is_admitted_when_slot_frees(self):
+        """Test a queued caller takes a slot released within its budget."""
+        pool = AdmissionPool('test', limit=1, queue_timeout=5)
+        fill(pool)
+
+        with patch('apps.core.admission.time.sleep', side_effect=lambda _: cache.delete(pool.slot_key(0))):
+            with pool.admit():
+                pass
+
+        assert pool.metrics()['admitted'] == 1
+
+    def test_expired_holder_does_not_free_reacquired_slot(self):
+        """Test a holder that outlived its slot leaves the new holder's slot alone."""
+        pool = AdmissionPool('test', limit=1, queue_timeout=0)
+
+        with pool.admit():
+            # The slot expired and another request took it
+            cache.set(pool.slot_key(0), 'other-holder', timeout=60)
+
+        assert cache.get(pool.slot_key(0)) == 'other-holder'
+
+    def test_limit_applies_per_host(self, rejecting):
+        """Test a saturated host does not take slots from another host."""
+        busy = AdmissionPool('test', limit=1, queue_timeout=0, host='web-1')
+        idle = AdmissionPool('test', limit=1, queue_timeout=0, host='web-2')
+        fill(busy)
+
+        with idle.admit():
+            assert idle.metrics()['in_use'] == 1
+
+    def test_cache_failure_admits(self):
+        """Test hashing is not blocked when the cache is unavailable."""
+        pool = AdmissionPool('test', limit=1, queue_timeout=0)
+
+        with patch('apps.core.admission.cache.add', side_effect=ConnectionError):
+            with pool.admit():
+                pass
+
+
+@pytest.mark.django_db
+class TestAdmissionControlledHasher:
+    """Tests for AdmissionControlledArgon2PasswordHasher."""
+
+    def test_hash_and_verify_are_admitted(self, settings):
+        """Test encoding and verifying each take a slot and are counted."""
+        settings.PASSWORD_HASHERS = ADMISSION_HASHERS
+
+        encoded = make_password('SecurePass123!')
+
+        assert encoded.startswith('argon2$')
+        assert check_password('SecurePass123!', encoded)
+        assert get_password_hash_pool().metrics()['admitted'] == 2
+
+    def test_login_returns_503_when_saturated(self, api_client, settings):
+        """Test a login flood fails fast instead of queueing on the workers."""
+        settings.PASSWORD_HASHERS = ADMISSION_HASHERS
+        settings.PASSWORD_HASH_QUEUE_TIMEOUT = 0
+        user = UserFactory(email='flood@example.com')
+        user.set_password('SecurePass123!')
+        user.save()
+        fill(get_password_hash_pool())
+
+        response = api_client.post(
+            reverse('login'),
+            {'email': 'flood@example.com', 'password': 'SecurePass123!'},
+        )
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert 'Retry-After' in response
+
+    def test_admin_login_is_not_rejected_when_saturated(self, client, settings):
+        """Test the Django admin, which cannot render a 503, still logs in."""
+        settings.PASSWORD_HASHERS = ADMISSION_HASHERS
+        settings.PASSWORD_HASH_QUEUE_TIMEOUT = 0
+        user = UserFactory(email='admin@example.com', is_staff=True, is_superuser=True)
+        user.set_password('SecurePass123!')
+        user.save()
+        fill(get_password_hash_pool())
+
+        response = client.post(
+            reverse('admin:login'),
+            {'username': 'admin@example.com', 'password': 'SecurePass123!', 'next': '/admin/'},
+        )
+
+        assert response.status_code == status.HTTP_302_FOUND
+        assert get_password_hash_pool().metrics()['overflow'] >= 1
+
+    def test_cheap_requests_unaffected_when_saturated(self, api_client, settings):
+        """Test requests that do not hash passwords are served normally."""
+        settings.PASSWORD_HASHERS = ADMISSION_HASHERS
+        fill(get_password_hash_pool())
+
+        response = api_client.get(reverse('core:liveness'))
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestPasswordHashingMetricsView:
+    """Tests for the password hashing metrics endpoint."""
+
+    def test_metrics_for_staff(self, api_client):
+        """Test staff can read the pool metrics."""
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+
+        response = api_client.get(reverse('core:password-hashing-metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['limit'] == get_password_hash_pool().limit
+        assert {'in_use', 'admitted', 'rejected', 'avg_wait_ms', 'avg_hold_ms'} <= set(response.data)
+
+    def test_metrics_forbidden_for_users(self, authenticated_client):
+        """Test regular users cannot read the pool metrics."""
+        response = authenticated_client.get(reverse('core:password-hashing-metrics'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,49 @@
+"""
+Tests for the read-through cache.
+"""
+import pytest
+from unittest.mock import MagicMock
+from django.core.cache import cache
+from apps.core.cache import ReadThroughCache
+
+
+@pytest.fixture
+def read_through():
+    cache.clear()
+    yield ReadThroughCache('test', timeout=60)
+    cache.clear()
+
+
+class TestReadThroughCache:
+    """Tests for ReadThroughCache."""
+
+    def test_value_is_computed_once(self, read_through):
+        """Test a warm key is served without recomputing."""
+        compute = MagicMock(return_value={'value': 1})
+
+        assert read_through.get('key', compute) == {'value': 1}
+        assert read_through.get('key', compute) == {'value': 1}
+        assert compute.call_count == 1
+
+    def test_invalidate_recomputes(self, read_through):
+        """Test invalidation makes the next read recompute."""
+        read_through.get('key', lambda: 'old')
+        read_through.invalidate()
+
+        assert read_through.get('key', lambda: 'new') == 'new'
+
+    def test_stale_value_served_while_refresh_in_progress(self, read_through):
+        """Test only the lock holder recomputes a stale key."""
+        read_through.get('key', lambda: 'old')
+        read_through.invalidate()
+        cache.add('test:key:lock', 1)
+        compute = MagicMock(return_value='new')
+
+        assert read_through.get('key', compute) == 'old'
+        compute.assert_not_called()
+
+    def test_expired_value_is_refreshed(self, read_through):
+        """Test a value past its freshness deadline is recomputed."""
+        read_through.get('key', lambda: 'old', timeout=-1)
+
+        assert read_through.get('key', lambda: 'new') == 'new'
@@ -0,0 +1,62 @@
+"""
+Tests for batched deletion.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from apps.accounts.tests.factories import UserFactory
+from apps.analytics.models import ActivityLog
+from apps.core.deletion import BatchDeleter, delete_in_batches
+
+
+@pytest.fixture
+def logs():
+    user = UserFactory()
+    return [
+        ActivityLog.objects.create(user=user, action='user.login')
+        for _ in range(7)
+    ]
+
+
+@pytest.mark.django_db
+class TestBatchDeleter:
+    """Tests for BatchDeleter."""
+
+    def test_deletes_matching_rows_in_batches(self, logs):
+        """Test only matching rows are deleted, batch by batch."""
+        keep = logs[0]
+        progress = MagicMock()
+
+        deleted = delete_in_batches(
+            'test',
+            ActivityLog.objects.exclude(pk=keep.pk),
+            batch_size=2,
+            pause=0,
+            progress=progress,
+        )
+
+        assert deleted == 6
+        assert list(ActivityLog.objects.values_list('pk', flat=True)) == [keep.pk]
+        assert [call.args for call in progress.call_args_list] == [(2, 1), (4, 2), (6, 3), (6, 4)]
+        assert cache.get(BatchDeleter('test', ActivityLog.objects.all()).checkpoint_key) is None
+
+    def test_resumes_from_checkpoint(self, logs):
+        """Test an interrupted run continues after the last completed batch."""
+        deleter = BatchDeleter('test', ActivityLog.objects.all(), batch_size=3, pause=0)
+
+        with patch('apps.core.deletion.time.sleep', side_effect=KeyboardInterrupt):
+            deleter.pause = 1
+            with pytest.raises(KeyboardInterrupt):
+                deleter.run()
+
+        assert ActivityLog.objects.count() == 4
+        assert cache.get(deleter.checkpoint_key)['deleted'] == 3
+
+        deleter.pause = 0
+        assert deleter.run() == 7
+        assert ActivityLog.objects.count() == 0
+
+    def test_batch_query_count(self, logs, django_assert_num_queries):
+        """Test a batch is a key lookup plus one DELETE, without loading rows."""
+        with django_assert_num_queries(2):
+            delete_in_batches('test', ActivityLog.objects.all(), batch_size=10, pause=0)
@@ -0,0 +1,74 @@
+"""
+Tests for pagination counts.
+"""
+import pytest
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.accounts.tests.factories import UserFactory
+from apps.core.pagination import EstimatedCountPaginator, StandardResultsSetPagination, count_rows
+
+User = get_user_model()
+
+
+class EstimatedView:
+    count_estimate_threshold = 1000
+
+
+@pytest.mark.django_db
+class TestCountRows:
+    """Tests for estimated counts."""
+
+    def test_exact_count_without_estimate(self):
+        """Test backends without planner estimates count exactly."""
+        UserFactory.create_batch(3)
+
+        assert count_rows(User.objects.all(), estimate_threshold=1) == (3, False)
+
+    def test_estimate_above_threshold(self, django_assert_num_queries):
+        """Test a large estimate is used without running COUNT(*)."""
+        with patch('apps.core.pagination.estimate_count', return_value=50000):
+            with django_assert_num_queries(0):
+                assert count_rows(User.objects.all(), estimate_threshold=1000) == (50000, True)
+
+    def test_exact_count_below_threshold(self):
+        """Test small results are counted exactly."""
+        UserFactory.create_batch(2)
+
+        with patch('apps.core.pagination.estimate_count', return_value=5):
+            assert count_rows(User.objects.all(), estimate_threshold=1000) == (2, False)
+
+    def test_paginator_reports_estimate(self):
+        """Test the page count follows the estimate."""
+        paginator = EstimatedCountPaginator(User.objects.order_by('pk'), 20, estimate_threshold=1000)
+
+        with patch('apps.core.pagination.estimate_count', return_value=50000):
+            assert paginator.num_pages == 2500
+        assert paginator.count_is_estimate is True
+
+
+@pytest.mark.django_db
+class TestStandardResultsSetPagination:
+    """Tests for the opt-in estimate meta."""
+
+    def paginate(self, view):
+        UserFactory.create_batch(3)
+        request = Request(APIRequestFactory().get('/'))
+        pagination = StandardResultsSetPagination()
+        page = pagination.paginate_queryset(User.objects.order_by('pk'), request, view=view)
+        return pagination.get_paginated_response(page).data['meta']
+
+    def test_meta_unchanged_without_opt_in(self):
+        """Test viewsets that do not opt in keep the existing meta."""
+        meta = self.paginate(view=None)
+
+        assert meta == {'page': 1, 'page_size': 20, 'total_count': 3, 'total_pages': 1}
+
+    def test_meta_flags_estimate(self):
+        """Test opted-in viewsets report whether the count is estimated."""
+        with patch('apps.core.pagination.estimate_count', return_value=50000):
+            meta = self.paginate(view=EstimatedView())
+
+        assert meta['total_count'] == 50000
+        assert meta['count_is_estimate'] is True
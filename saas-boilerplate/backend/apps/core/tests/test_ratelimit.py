@@ -0,0 +1,203 @@
+"""
+Tests for the GCRA rate limiter and its DRF throttle.
+"""
+import pytest
+from unittest.mock import patch
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from apps.authentication.utils import check_password_reset_rate_limit
+from apps.core.middleware.security import RateLimitHeadersMiddleware
+from apps.core.ratelimit import RateLimiter, RateLimitResult, TokenBucket, parse_rate, record
+
+
+class TestParseRate:
+    """Tests for parse_rate."""
+
+    @pytest.mark.parametrize('rate,expected', [
+        ('5/s', (5, 1)),
+        ('5/m', (5, 60)),
+        ('3/h', (3, 3600)),
+        ('100/d', (100, 86400)),
+        ('10/15m', (10, 900)),
+    ])
+    def test_parse_rate(self, rate, expected):
+        assert parse_rate(rate) == expected
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter on the local cache."""
+
+    def test_allows_burst_up_to_limit(self):
+        """Test a burst of ``limit`` requests is allowed and the next is not."""
+        limiter = RateLimiter('test', '3/m')
+
+        results = [limiter.hit('ip:1') for _ in range(4)]
+
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert [result.remaining for result in results] == [2, 1, 0, 0]
+        assert 0 < results[-1].retry_after <= 20
+        assert 40 < results[-1].reset_after <= 60
+
+    def test_denied_requests_are_not_counted(self):
+        """Test hammering a limited key does not push its window further out."""
+        limiter = RateLimiter('test', '1/m')
+        limiter.hit('ip:1')
+
+        first = limiter.hit('ip:1')
+        for _ in range(10):
+            limiter.hit('ip:1')
+        last = limiter.hit('ip:1')
+
+        assert not last.allowed
+        assert last.retry_after <= first.retry_after
+
+    def test_window_slides(self):
+        """Test capacity returns gradually as time passes."""
+        limiter = RateLimiter('test', '2/m')
+
+        with patch('apps.core.ratelimit.time.time', return_value=1000.0):
+            limiter.hit('ip:1')
+            limiter.hit('ip:1')
+            assert not limiter.hit('ip:1').allowed
+
+        # One emission interval (30s) later one request is allowed again
+        with patch('apps.core.ratelimit.time.time', return_value=1030.0):
+            assert limiter.hit('ip:1').allowed
+            assert not limiter.hit('ip:1').allowed
+
+    def test_keys_are_independent(self):
+        """Test identities and scopes do not share limits."""
+        limiter = RateLimiter('test', '1/m')
+
+        assert limiter.hit('ip:1').allowed
+        assert limiter.hit('ip:2').allowed
+        assert RateLimiter('other', '1/m').hit('ip:1').allowed
+
+    def test_reset(self):
+        """Test resetting an identity restores its full limit."""
+        limiter = RateLimiter('test', '1/m')
+        limiter.hit('ip:1')
+
+        limiter.reset('ip:1')
+
+        assert limiter.hit('ip:1').allowed
+
+    def test_disabled(self, settings):
+        """Test RATE_LIMIT_ENABLED turns every check into an allow."""
+        settings.RATE_LIMIT_ENABLED = False
+        limiter = RateLimiter('test', '1/m')
+
+        assert all(limiter.hit('ip:1').allowed for _ in range(5))
+
+    def test_cache_failure_allows(self):
+        """Test an unavailable cache fails open."""
+        limiter = RateLimiter('test', '1/m')
+
+        with patch('apps.core.ratelimit.cache.get', side_effect=ConnectionError):
+            assert limiter.hit('ip:1').allowed
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket on the local cache."""
+
+    def test_burst_then_refill(self):
+        """Test the bucket empties after ``burst`` hits and refills at ``rate``."""
+        bucket = TokenBucket('test', rate=2, burst=3)
+
+        with patch('apps.core.ratelimit.time.time', return_value=1000.0):
+            results = [bucket.hit('org:1') for _ in range(4)]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert [result.remaining for result in results] == [2, 1, 0, 0]
+        assert results[-1].retry_after == pytest.approx(0.5)
+
+        # Half a second adds one token at 2 tokens per second
+        with patch('apps.core.ratelimit.time.time', return_value=1000.5):
+            assert bucket.hit('org:1').allowed
+            assert not bucket.hit('org:1').allowed
+
+    def test_refill_is_capped_at_burst(self):
+        """Test an idle bucket holds no more than ``burst`` tokens."""
+        bucket = TokenBucket('test', rate=1, burst=2)
+
+        with patch('apps.core.ratelimit.time.time', return_value=1000.0):
+            bucket.hit('org:1')
+        with patch('apps.core.ratelimit.time.time', return_value=5000.0):
+            results = [bucket.hit('org:1') for _ in range(3)]
+
+        assert [result.allowed for result in results] == [True, True, False]
+
+
+class TestPasswordResetRateLimit:
+    """Tests for check_password_reset_rate_limit."""
+
+    def test_three_per_hour_per_email(self):
+        results = [check_password_reset_rate_limit('user@example.com') for _ in range(4)]
+
+        assert results == [False, False, False, True]
+
+    def test_email_is_normalized(self):
+        for _ in range(3):
+            check_password_reset_rate_limit('user@example.com')
+
+        assert check_password_reset_rate_limit(' User@Example.com ') is True
+
+
+class TestRateLimitHeadersMiddleware:
+    """Tests for RateLimitHeadersMiddleware."""
+
+    def render(self, request):
+        from django.http import HttpResponse
+        return RateLimitHeadersMiddleware(lambda _: HttpResponse())(request)
+
+    def test_no_headers_without_decision(self):
+        response = self.render(RequestFactory().get('/'))
+
+        assert 'X-RateLimit-Limit' not in response
+
+    def test_headers_show_most_restrictive_decision(self):
+        request = RequestFactory().post('/')
+        record(request, RateLimitResult(True, 10, 7, 0, 12.5))
+        record(request, RateLimitResult(True, 5, 2, 0, 36.2))
+        record(request, RateLimitResult(True, 10, 9, 0, 6.0))
+
+        response = self.render(request)
+
+        assert response['X-RateLimit-Limit'] == '5'
+        assert response['X-RateLimit-Remaining'] == '2'
+        assert response['X-RateLimit-Reset'] == '37'
+        assert 'Retry-After' not in response
+
+    def test_denied_decision_sets_retry_after(self):
+        request = RequestFactory().post('/')
+        record(request, RateLimitResult(False, 5, 0, 11.2, 60))
+
+        response = self.render(request)
+
+        assert response['X-RateLimit-Remaining'] == '0'
+        assert response['Retry-After'] == '12'
+
+
+@pytest.mark.django_db
+class TestRateLimitThrottle:
+    """Tests for throttles built with rate_limit on the auth endpoints."""
+
+    def test_password_reset_limited_per_email(self, api_client):
+        """Test the email key limits password resets across IPs."""
+        url = reverse('password_reset')
+
+        for i in range(3):
+            response = api_client.post(url, {'email': 'user@example.com'}, REMOTE_ADDR=f'198.51.100.{i}')
+            assert response.status_code == status.HTTP_200_OK
+
+        response = api_client.post(url, {'email': 'user@example.com'}, REMOTE_ADDR='198.51.100.9')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_get_requests_are_not_limited(self, api_client):
+        """Test throttles only count the configured methods."""
+        url = reverse('login')
+
+        for _ in range(10):
+            response = api_client.get(url)
+            assert response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+            assert 'X-RateLimit-Limit' not in response
@@ -4,7 +4,7 @@ Core app URL configuration.
 Includes health check and utility endpoints.
 """
 from django.urls import path
-from .views import HealthCheckView, ReadinessCheckView, LivenessCheckView
+from .views import HealthCheckView, ReadinessCheckView, LivenessCheckView, PasswordHashingMetricsView
 
 app_name = 'core'
 
@@ -13,4 +13,5 @@ urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health-detailed'),
     path('ready/', ReadinessCheckView.as_view(), name='readiness'),
     path('live/', LivenessCheckView.as_view(), name='liveness'),
+    path('metrics/password-hashing/', PasswordHashingMetricsView.as_view(), name='password-hashing-metrics'),
 ]
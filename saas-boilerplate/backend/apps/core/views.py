@@ -3,10 +3,11 @@ Core views including health checks and utility endpoints.
 """
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework import status
 from django.db import connection
 from django.core.cache import cache
+from .admission import get_password_hash_pool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -89,3 +90,17 @@ class LivenessCheckView(APIView):
 
     def get(self, request):
         return Response({'status': 'alive'}, status=status.HTTP_200_OK)
+
+
+class PasswordHashingMetricsView(APIView):
+    """
+    Admission control metrics for password hashing (staff only).
+
+    Reports the concurrency limit, slots in use, admitted, rejected and
+    overflow hashes (run without a slot outside DRF views), and total and
+    average queue wait and hash time in milliseconds.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_password_hash_pool().metrics(), status=status.HTTP_200_OK)
@@ -1,8 +1,12 @@
 """
 Team invitation utilities and email sending.
 """
-import secrets
+import hashlib
+import uuid
+from collections import Counter
 from datetime import timedelta
+from django.core.cache import cache
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
@@ -13,15 +17,14 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
-def generate_invitation_token():
-    """Generate a secure invitation token."""
-    return secrets.token_urlsafe(32)
-
-
 def create_invitation(organization, email, role, invited_by):
     """
     Create an invitation for a user to join an organization.
 
+    Re-inviting an address with a pending invitation refreshes it and issues
+    a new token. The plaintext token is available as ``invitation.token``
+    until the instance is discarded; it is never stored.
+
     Args:
         organization: Organization instance
         email: Email address to invite
@@ -50,22 +53,23 @@ def create_invitation(organization, email, role, invited_by):
     ).first()
 
     if existing_invitation:
-        # Extend expiry and update invitation
+        # Extend expiry, update invitation and rotate its token
         existing_invitation.expires_at = timezone.now() + timedelta(days=7)
         existing_invitation.role = role
         existing_invitation.invited_by = invited_by
+        existing_invitation.token = existing_invitation.set_token()
         existing_invitation.save()
         return existing_invitation
 
     # Create new invitation
-    invitation = Invitation.objects.create(
+    invitation, token = Invitation.create_invitation(
         email=email,
         organization=organization,
         role=role,
-        token=generate_invitation_token(),
+        invited_by=invited_by,
         expires_at=timezone.now() + timedelta(days=7),
-        invited_by=invited_by
     )
+    invitation.token = token
 
     return invitation
 
@@ -75,7 +79,8 @@ def send_invitation_email(invitation, request):
     Send invitation email to the invitee.
 
     Args:
-        invitation: Invitation instance
+        invitation: Invitation returned by create_invitation, carrying its
+            plaintext token
         request: HTTP request for building absolute URLs
     """
     # Build invitation URL
@@ -115,12 +120,12 @@ def accept_invitation(token, user):
     Returns:
         Tuple of (membership, error_message)
     """
-    try:
-        invitation = Invitation.objects.get(
-            token=token,
-            status='pending'
-        )
-    except Invitation.DoesNotExist:
+    invitation = Invitation.find_by_token(
+        token,
+        queryset=Invitation.objects.filter(status='pending').select_related('organization'),
+        email=user.email,
+    )
+    if invitation is None:
         return None, "Invalid or expired invitation"
 
     # Check if invitation is expired
@@ -171,3 +176,107 @@ def revoke_invitation(invitation):
         invitation.save()
         return True
     return False
+
+
+class BulkInvitationJob:
+    """
+    Per-email status of a bulk invitation, kept in the cache.
+
+    The request handler records which addresses were rejected up front and
+    queues the rest; background tasks then report each address as created,
+    already invited, sent or failed. Clients poll ``get`` for progress.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_INVALID = 'invalid'
+    STATUS_ALREADY_MEMBER = 'already_member'
+    STATUS_ALREADY_INVITED = 'already_invited'
+    STATUS_CREATED = 'created'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    TIMEOUT = 60 * 60 * 24  # seconds
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    @property
+    def key(self):
+        return f'organizations:bulk_invite:{self.job_id}'
+
+    def status_key(self, email):
+        digest = hashlib.sha256(email.encode()).hexdigest()[:24]
+        return f'{self.key}:{digest}'
+
+    @classmethod
+    def start(cls, organization, emails, invalid=()):
+        """
+        Open a job and reject addresses that already belong to members.
+
+        Existing members are found with a single query.
+
+        Args:
+            organization: Organization invited to
+            emails: Normalized, de-duplicated email addresses
+            invalid: Rejected inputs to report back
+
+        Returns:
+            tuple: (job, list of emails to invite)
+        """
+        job = cls(uuid.uuid4().hex)
+        members = set(
+            Membership.objects
+            .filter(organization=organization, is_active=True)
+            .annotate(email_lower=Lower('user__email'))
+            .filter(email_lower__in=emails)
+            .values_list('email_lower', flat=True)
+        )
+
+        statuses = {value: cls.STATUS_INVALID for value in invalid}
+        for email in emails:
+            statuses[email] = cls.STATUS_ALREADY_MEMBER if email in members else cls.STATUS_QUEUED
+
+        cache.set(
+            job.key,
+            {'organization_id': str(organization.pk), 'emails': list(statuses)},
+            timeout=cls.TIMEOUT,
+        )
+        job.set_statuses(statuses)
+        queued = [email for email in emails if email not in members]
+        return job, queued
+
+    def set_statuses(self, statuses):
+        """
+        Record the status of several addresses.
+
+        Args:
+            statuses: Dict of {email: status}
+        """
+        cache.set_many(
+            {self.status_key(email): status for email, status in statuses.items()},
+            timeout=self.TIMEOUT,
+        )
+
+    def get(self):
+        """
+        Return the job's progress.
+
+        Returns:
+            dict or None: organization_id, per-email statuses and a summary
+            count per status; None if the job is unknown or expired
+        """
+        job = cache.get(self.key)
+        if job is None:
+            return None
+
+        found = cache.get_many([self.status_key(email) for email in job['emails']])
+        statuses = {
+            email: found.get(self.status_key(email), self.STATUS_QUEUED)
+            for email in job['emails']
+        }
+        return {
+            'job_id': self.job_id,
+            'organization_id': job['organization_id'],
+            'statuses': statuses,
+            'summary': dict(Counter(statuses.values())),
+        }
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from apps.organizations.models import Organization
+
+class Command(BaseCommand):
+    help = 'Recomputes Organization.member_count from active memberships'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted organizations without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            Organization.objects
+            .annotate(actual_count=Organization.active_member_counts())
+            .exclude(member_count=F('actual_count'))
+        )
+
+        fixed = 0
+        for org in drifted.only('id', 'slug', 'member_count'):
+            self.stdout.write(f'{org.slug}: {org.member_count} -> {org.actual_count}')
+            if not options['dry_run']:
+                # Recompute in the UPDATE itself so concurrent changes are not lost
+                Organization.objects.filter(pk=org.pk).update(
+                    member_count=Organization.active_member_counts()
+                )
+            fixed += 1
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {fixed} organization member counts'))
@@ -0,0 +1,184 @@
+"""
+Request-scoped membership resolution.
+
+Permission classes, view helpers and billing views all need the caller's
+membership in the organization being accessed. ``get_membership`` loads it
+once per request and organization and memoizes it on the underlying
+HttpRequest, so the same lookup is never repeated within a request.
+
+Role checks go one step further: ``OrganizationRoleCache`` keeps each user's
+``{org_slug: role}`` map in the shared cache, so most permission checks are
+answered without touching the database at all.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from .models import Membership, Organization
+
+ADMIN_ROLES = (Membership.ROLE_OWNER, Membership.ROLE_ADMIN)
+
+_CACHE_ATTR = '_membership_cache'
+_ROLES_ATTR = '_organization_roles'
+
+
+class OrganizationRoleCache:
+    """
+    Cross-request map of user_id -> {org_slug: role} for active memberships.
+
+    A miss loads all of the user's active memberships in one query. Entries
+    are dropped by the signal handlers in ``signals.py`` whenever a
+    membership changes or an organization's slug changes.
+    """
+
+    TIMEOUT = 60 * 60  # seconds
+
+    @staticmethod
+    def key(user_id):
+        return f'organizations:roles:{user_id}'
+
+    @classmethod
+    def get(cls, user_id):
+        """
+        Return the user's roles keyed by organization slug.
+
+        Args:
+            user_id: User primary key
+
+        Returns:
+            dict: {org_slug: role}
+        """
+        key = cls.key(user_id)
+        roles = cache.get(key)
+        if roles is None:
+            roles = dict(
+                Membership.objects
+                .filter(user_id=user_id, is_active=True)
+                .values_list('organization__slug', 'role')
+            )
+            cache.set(key, roles, timeout=cls.TIMEOUT)
+        return roles
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """
+        Drop the cached roles of users.
+
+        Entries are deleted immediately and again after commit, so a reader
+        racing the transaction cannot leave the pre-commit roles cached.
+        """
+        keys = [cls.key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_membership(request, organization):
+    """
+    Return the requesting user's active membership in an organization.
+
+    The result, including a negative one, is memoized on the request. The
+    membership is loaded with its organization, so callers that only have a
+    slug can use ``membership.organization`` without another query.
+
+    Args:
+        request: Django or DRF request
+        organization: Organization instance or slug
+
+    Returns:
+        Membership or None: The active membership, or None if the user is
+        anonymous or not an active member
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return None
+
+    # DRF wraps the HttpRequest; memoize on the wrapped request so every
+    # wrapper (and middleware) shares the same cache
+    http_request = getattr(request, '_request', request)
+    memo = http_request.__dict__.setdefault(_CACHE_ATTR, {})
+
+    # Reuse the organization TenantMiddleware already resolved
+    tenant = getattr(http_request, 'requested_organization', None)
+    if tenant is not None and organization == tenant.slug:
+        organization = tenant
+
+    if isinstance(organization, Organization):
+        key = ('id', organization.pk)
+        queryset = Membership.objects.filter(organization=organization)
+    else:
+        key = ('slug', organization)
+        queryset = Membership.objects.select_related('organization').filter(organization__slug=organization)
+
+    if key not in memo:
+        membership = queryset.filter(user=user, is_active=True).first()
+        if membership and isinstance(organization, Organization):
+            membership.organization = organization
+        memo[key] = membership
+        if membership:
+            memo[('id', membership.organization_id)] = membership
+            memo[('slug', membership.organization.slug)] = membership
+
+    return memo[key]
+
+
+def get_tenant(request):
+    """
+    Return the organization TenantMiddleware resolved for the request, if the
+    requesting user is an active member of it.
+
+    The requested organization comes from a client-supplied header,
+    subdomain or URL, so it must not be trusted without this check. The
+    check goes through ``get_role``, so a warm request needs no query.
+
+    Args:
+        request: Django or DRF request
+
+    Returns:
+        Organization or None
+    """
+    http_request = getattr(request, '_request', request)
+    organization = getattr(http_request, 'requested_organization', None)
+    if organization is None or get_role(request, organization) is None:
+        return None
+    return organization
+
+
+def get_role(request, organization):
+    """
+    Return the requesting user's role in an organization.
+
+    Answered from the shared role cache unless the request already loaded
+    the membership itself.
+
+    Args:
+        request: Django or DRF request
+        organization: Organization instance or slug
+
+    Returns:
+        str: Role ('owner', 'admin', 'member') or None if not a member
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return None
+
+    http_request = getattr(request, '_request', request)
+    if isinstance(organization, Organization):
+        key, slug = ('id', organization.pk), organization.slug
+    else:
+        key, slug = ('slug', organization), organization
+
+    # A membership already loaded by this request is authoritative
+    memo = http_request.__dict__.get(_CACHE_ATTR, {})
+    if key in memo:
+        return memo[key].role if memo[key] else None
+
+    if _ROLES_ATTR not in http_request.__dict__:
+        http_request.__dict__[_ROLES_ATTR] = OrganizationRoleCache.get(user.pk)
+    return http_request.__dict__[_ROLES_ATTR].get(slug)
+
+
+def forget_memberships(request):
+    """Drop the memoized memberships of a request after changing them."""
+    http_request = getattr(request, '_request', request)
+    http_request.__dict__.pop(_CACHE_ATTR, None)
+    http_request.__dict__.pop(_ROLES_ATTR, None)
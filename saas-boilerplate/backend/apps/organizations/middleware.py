@@ -0,0 +1,61 @@
+"""
+Tenant resolution middleware.
+"""
+from django.conf import settings
+from .tenancy import OrganizationCache
+
+
+class TenantMiddleware:
+    """
+    Resolve the active organization (tenant) once per request.
+
+    The tenant slug comes from, most specific first:
+    - the ``organization_slug`` URL kwarg of nested organization routes
+    - the ``X-Organization`` header
+    - the subdomain of ``TENANT_BASE_DOMAIN`` (e.g. acme.example.com)
+
+    Sets ``request.requested_organization`` to the active Organization or
+    None, looked up through ``OrganizationCache``. The slug is supplied by the
+    client and nothing here checks that the caller belongs to the
+    organization: use ``membership.get_tenant`` for a verified tenant, or
+    check ``get_membership`` before acting on it.
+    """
+
+    HEADER = 'HTTP_X_ORGANIZATION'
+    URL_KWARG = 'organization_slug'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.base_domain = getattr(settings, 'TENANT_BASE_DOMAIN', '').lower().lstrip('.')
+        self.reserved_subdomains = set(getattr(settings, 'TENANT_RESERVED_SUBDOMAINS', ()))
+
+    def __call__(self, request):
+        self.set_tenant(request, request.META.get(self.HEADER) or self.get_subdomain(request))
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slug = view_kwargs.get(self.URL_KWARG)
+        if slug and getattr(request.requested_organization, 'slug', None) != slug:
+            self.set_tenant(request, slug)
+        return None
+
+    def get_subdomain(self, request):
+        if not self.base_domain:
+            return None
+
+        host = request.get_host().split(':', 1)[0].lower()
+        suffix = f'.{self.base_domain}'
+        if not host.endswith(suffix):
+            return None
+
+        subdomain = host[:-len(suffix)]
+        if not subdomain or '.' in subdomain or subdomain in self.reserved_subdomains:
+            return None
+        return subdomain
+
+    def set_tenant(self, request, slug):
+        organization = OrganizationCache.get(slug) if slug else None
+        if organization is not None and not organization.is_active:
+            organization = None
+
+        request.requested_organization = organization
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_member_counts(apps, schema_editor):
+    Organization = apps.get_model('organizations', 'Organization')
+    Membership = apps.get_model('organizations', 'Membership')
+    counts = (
+        Membership.objects
+        .filter(organization=models.OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('organization')
+        .annotate(count=models.Count('pk'))
+        .values('count')
+    )
+    Organization.objects.update(member_count=Coalesce(models.Subquery(counts), 0))
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0004_rename_org_active_created_idx_organizatio_is_acti_a02541_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['user', 'is_active'], include=('organization', 'role'), name='org_membership_user_active_idx'),
+        ),
+        migrations.RunPython(populate_member_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organization_member_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='token_selector',
+            field=models.CharField(blank=True, help_text='Public half of the invitation token, used for lookup', max_length=32, null=True, unique=True),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import check_password
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 from apps.core.models import BaseModel
 import uuid
 import secrets
@@ -19,6 +22,9 @@ class Organization(BaseModel):
     is_active = models.BooleanField(default=True, db_index=True)
     settings = models.JSONField(default=dict, blank=True)
 
+    # Active memberships; kept current by the Membership signal handlers
+    member_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=['is_active', 'created_at']),
@@ -27,6 +33,28 @@ class Organization(BaseModel):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def active_member_counts(cls):
+        """
+        Subquery expression counting an organization's active memberships.
+        """
+        counts = (
+            Membership.objects
+            .filter(organization=models.OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('organization')
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        )
+        return Coalesce(models.Subquery(counts), 0)
+
+    @classmethod
+    def adjust_member_count(cls, organization_id, delta):
+        """Atomically add ``delta`` to an organization's member count."""
+        cls.objects.filter(pk=organization_id).update(
+            member_count=Greatest(models.F('member_count') + delta, 0)
+        )
+
 class Membership(BaseModel):
     """
     Links a User to an Organization with a specific Role.
@@ -51,6 +79,12 @@ class Membership(BaseModel):
         unique_together = ('user', 'organization')
         indexes = [
             models.Index(fields=['organization', 'role']),
+            # Covers the "my organizations" listing for index-only scans
+            models.Index(
+                fields=['user', 'is_active'],
+                include=['organization', 'role'],
+                name='org_membership_user_active_idx',
+            ),
         ]
 
     def __str__(self):
@@ -61,7 +95,17 @@ class Invitation(BaseModel):
     Pending invitation for a user to join an organization.
 
     Security: Tokens are hashed before storage to prevent compromise if database is breached.
+    A token is "<selector>.<verifier>": the selector finds the row through a
+    unique index and the verifier is checked against an HMAC-SHA256 digest in
+    constant time.
     """
+    TOKEN_SEPARATOR = '.'
+    SELECTOR_BYTES = 12
+    TOKEN_HASH_PREFIX = 'hmac_sha256$'
+    TOKEN_HMAC_SALT = 'apps.organizations.Invitation.token'
+    # Most legacy invitations a single lookup hashes against
+    LEGACY_CANDIDATE_LIMIT = 5
+
     STATUS_PENDING = 'pending'
     STATUS_ACCEPTED = 'accepted'
     STATUS_EXPIRED = 'expired'
@@ -77,6 +121,13 @@ class Invitation(BaseModel):
     email = models.EmailField(db_index=True)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='invitations')
     role = models.CharField(max_length=20, choices=Membership.ROLE_CHOICES, default=Membership.ROLE_MEMBER)
+    token_selector = models.CharField(
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_('Public half of the invitation token, used for lookup'),
+    )
     token_hash = models.CharField(max_length=255, unique=True, help_text=_('Hashed invitation token'))
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
     expires_at = models.DateTimeField()
@@ -101,27 +152,108 @@ class Invitation(BaseModel):
         Returns tuple: (invitation, plaintext_token)
         The plaintext token should be sent to the user and never stored.
         """
-        # Generate secure random token (32 bytes = 64 hex chars)
-        plaintext_token = secrets.token_urlsafe(32)
+        invitation, plaintext_token = cls.build_invitation(
+            email=email,
+            organization=organization,
+            role=role,
+            invited_by=invited_by,
+            expires_at=expires_at,
+        )
+        invitation.save()
 
-        # Hash the token before storage
-        token_hash = make_password(plaintext_token)
+        return invitation, plaintext_token
+
+    @classmethod
+    def build_invitation(cls, email, organization, role, invited_by, expires_at):
+        """
+        Build an unsaved invitation with a secure random token, e.g. for
+        bulk_create.
 
-        invitation = cls.objects.create(
+        Returns tuple: (invitation, plaintext_token)
+        """
+        invitation = cls(
             email=email,
             organization=organization,
             role=role,
             invited_by=invited_by,
             expires_at=expires_at,
-            token_hash=token_hash,
         )
+        plaintext_token = invitation.set_token()
 
         return invitation, plaintext_token
 
+    def set_token(self):
+        """
+        Generate a new "<selector>.<verifier>" token for this invitation.
+
+        The selector is stored as is for an indexed lookup; only an
+        HMAC-SHA256 digest of the verifier is stored, so a database leak does
+        not reveal usable tokens. Returns the plaintext token.
+        """
+        selector = secrets.token_urlsafe(self.SELECTOR_BYTES)
+        verifier = secrets.token_urlsafe(32)
+
+        self.token_selector = selector
+        self.token_hash = self._hash_verifier(verifier)
+
+        return f'{selector}{self.TOKEN_SEPARATOR}{verifier}'
+
+    @classmethod
+    def find_by_token(cls, plaintext_token, queryset=None, email=None):
+        """
+        Return the invitation a plaintext token belongs to, or None.
+
+        Costs one indexed lookup by selector and one HMAC. Tokens issued
+        before selectors existed can only be checked with a password hash
+        per candidate, so they are resolved only when the invitee's email is
+        given, and only against at most ``LEGACY_CANDIDATE_LIMIT`` pending
+        legacy invitations sent to it; those expire within the invitation
+        lifetime.
+
+        Args:
+            plaintext_token: Token from the invitation link
+            queryset: Invitations to search (all by default)
+            email: Email address of the user accepting; required for
+                legacy tokens
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        selector, separator, _ = plaintext_token.partition(cls.TOKEN_SEPARATOR)
+
+        if separator:
+            invitation = queryset.filter(token_selector=selector).first()
+            if invitation and invitation.verify_token(plaintext_token):
+                return invitation
+            return None
+
+        if not email:
+            return None
+        legacy = queryset.filter(
+            token_selector__isnull=True,
+            status=cls.STATUS_PENDING,
+            expires_at__gt=timezone.now(),
+            email__iexact=email,
+        ).order_by('-expires_at')[:cls.LEGACY_CANDIDATE_LIMIT]
+        for invitation in legacy:
+            if invitation.verify_token(plaintext_token):
+                return invitation
+        return None
+
     def verify_token(self, plaintext_token):
         """
         Verify that the provided plaintext token matches this invitation.
 
         Returns True if valid, False otherwise.
         """
-        return check_password(plaintext_token, self.token_hash)
+        if self.token_selector is None:
+            # Legacy token hashed with make_password
+            return check_password(plaintext_token, self.token_hash)
+
+        selector, separator, verifier = plaintext_token.partition(self.TOKEN_SEPARATOR)
+        if not separator or not constant_time_compare(selector, self.token_selector):
+            return False
+        return constant_time_compare(self._hash_verifier(verifier), self.token_hash)
+
+    @classmethod
+    def _hash_verifier(cls, verifier):
+        digest = salted_hmac(cls.TOKEN_HMAC_SALT, verifier, algorithm='sha256').hexdigest()
+        return f'{cls.TOKEN_HASH_PREFIX}{digest}'
@@ -1,236 +1,129 @@
 """
 Role-based permission classes for organization access control.
+
+Every check reads the caller's membership through the request-scoped
+resolver in ``membership.py``, so a request makes at most one membership
+query per organization however many checks it runs.
 """
 from rest_framework import permissions
 from .models import Membership
+from .membership import ADMIN_ROLES, get_role
+
+ALL_ROLES = tuple(role for role, _ in Membership.ROLE_CHOICES)
+
+
+def _get_org_slug(view):
+    return view.kwargs.get('slug') or view.kwargs.get('organization_slug')
 
 
-class IsOrgMember(permissions.BasePermission):
+def _get_object_organization(obj):
+    if hasattr(obj, 'organization'):
+        return obj.organization
+    if hasattr(obj, 'memberships'):
+        # Object is an Organization
+        return obj
+    return None
+
+
+class OrgRolePermission(permissions.BasePermission):
     """
-    Permission check that user is a member of the organization.
+    Base permission allowing members whose role is in ``get_roles``.
+
     Organization can be identified by:
-    - 'organization' in view.kwargs (lookup by slug)
-    - 'organization_id' in view.kwargs
-    - self.organization on the object being accessed
+    - 'slug' or 'organization_slug' in view.kwargs
+    - obj.organization, or obj itself when it is an Organization
     """
+    roles = ALL_ROLES
+
+    def get_roles(self, request):
+        return self.roles
 
     def has_permission(self, request, view):
-        """Check if user has access to the organization."""
+        """Check the user's role in the organization from the URL."""
         if not request.user or not request.user.is_authenticated:
             return False
 
-        # Get organization slug from URL
-        org_slug = view.kwargs.get('slug') or view.kwargs.get('organization_slug')
+        org_slug = _get_org_slug(view)
         if not org_slug:
             # If no organization in URL, allow (will be checked at object level)
             return True
 
-        # Check if user is a member of this organization
-        return Membership.objects.filter(
-            user=request.user,
-            organization__slug=org_slug,
-            is_active=True
-        ).exists()
+        return get_role(request, org_slug) in self.get_roles(request)
 
     def has_object_permission(self, request, view, obj):
-        """Check if user has access to the specific object."""
+        """Check the user's role in the object's organization."""
         if not request.user or not request.user.is_authenticated:
             return False
 
-        # Get organization from object
-        if hasattr(obj, 'organization'):
-            organization = obj.organization
-        elif hasattr(obj, 'memberships'):
-            # Object is an Organization
-            organization = obj
-        else:
+        organization = _get_object_organization(obj)
+        if organization is None:
             return False
 
-        # Check membership
-        return Membership.objects.filter(
-            user=request.user,
-            organization=organization,
-            is_active=True
-        ).exists()
+        return get_role(request, organization) in self.get_roles(request)
 
 
-class IsOrgAdmin(permissions.BasePermission):
+class IsOrgMember(OrgRolePermission):
     """
-    Permission check that user is an admin or owner of the organization.
+    Permission check that user is a member of the organization.
     """
+    roles = ALL_ROLES
 
-    def has_permission(self, request, view):
-        """Check if user is admin of the organization."""
-        if not request.user or not request.user.is_authenticated:
-            return False
 
-        # Get organization slug from URL
-        org_slug = view.kwargs.get('slug') or view.kwargs.get('organization_slug')
-        if not org_slug:
-            return True  # Will be checked at object level
-
-        # Check if user is admin or owner
-        return Membership.objects.filter(
-            user=request.user,
-            organization__slug=org_slug,
-            role__in=['admin', 'owner'],
-            is_active=True
-        ).exists()
-
-    def has_object_permission(self, request, view, obj):
-        """Check if user is admin of the organization."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-
-        # Get organization from object
-        if hasattr(obj, 'organization'):
-            organization = obj.organization
-        elif hasattr(obj, 'memberships'):
-            organization = obj
-        else:
-            return False
-
-        # Check admin membership
-        return Membership.objects.filter(
-            user=request.user,
-            organization=organization,
-            role__in=['admin', 'owner'],
-            is_active=True
-        ).exists()
+class IsOrgAdmin(OrgRolePermission):
+    """
+    Permission check that user is an admin or owner of the organization.
+    """
+    roles = ADMIN_ROLES
 
 
-class IsOrgOwner(permissions.BasePermission):
+class IsOrgOwner(OrgRolePermission):
     """
     Permission check that user is the owner of the organization.
     """
+    roles = (Membership.ROLE_OWNER,)
 
-    def has_permission(self, request, view):
-        """Check if user is owner of the organization."""
-        if not request.user or not request.user.is_authenticated:
-            return False
 
-        # Get organization slug from URL
-        org_slug = view.kwargs.get('slug') or view.kwargs.get('organization_slug')
-        if not org_slug:
-            return True  # Will be checked at object level
-
-        # Check if user is owner
-        return Membership.objects.filter(
-            user=request.user,
-            organization__slug=org_slug,
-            role='owner',
-            is_active=True
-        ).exists()
-
-    def has_object_permission(self, request, view, obj):
-        """Check if user is owner of the organization."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-
-        # Get organization from object
-        if hasattr(obj, 'organization'):
-            organization = obj.organization
-        elif hasattr(obj, 'memberships'):
-            organization = obj
-        else:
-            return False
-
-        # Check owner membership
-        return Membership.objects.filter(
-            user=request.user,
-            organization=organization,
-            role='owner',
-            is_active=True
-        ).exists()
-
-
-class IsOrgMemberReadOnly(permissions.BasePermission):
+class IsOrgMemberReadOnly(OrgRolePermission):
     """
     Allow members to read, but only admins to write.
     """
 
-    def has_permission(self, request, view):
-        """Check permission based on request method."""
-        if not request.user or not request.user.is_authenticated:
-            return False
-
-        org_slug = view.kwargs.get('slug') or view.kwargs.get('organization_slug')
-        if not org_slug:
-            return True
-
-        # Read operations allowed for members
+    def get_roles(self, request):
         if request.method in permissions.SAFE_METHODS:
-            return Membership.objects.filter(
-                user=request.user,
-                organization__slug=org_slug,
-                is_active=True
-            ).exists()
-
-        # Write operations require admin
-        return Membership.objects.filter(
-            user=request.user,
-            organization__slug=org_slug,
-            role__in=['admin', 'owner'],
-            is_active=True
-        ).exists()
-
-    def has_object_permission(self, request, view, obj):
-        """Check object-level permission."""
-        if not request.user or not request.user.is_authenticated:
-            return False
+            return ALL_ROLES
+        return ADMIN_ROLES
 
-        # Get organization
-        if hasattr(obj, 'organization'):
-            organization = obj.organization
-        elif hasattr(obj, 'memberships'):
-            organization = obj
-        else:
-            return False
 
-        # Read operations allowed for members
-        if request.method in permissions.SAFE_METHODS:
-            return Membership.objects.filter(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            ).exists()
-
-        # Write operations require admin
-        return Membership.objects.filter(
-            user=request.user,
-            organization=organization,
-            role__in=['admin', 'owner'],
-            is_active=True
-        ).exists()
-
-
-def get_user_role_in_org(user, organization):
+def get_user_role_in_org(user, organization, request=None):
     """
     Helper function to get user's role in an organization.
 
     Args:
         user: User instance
         organization: Organization instance or slug
+        request: Current request; when it belongs to ``user`` the memoized
+            membership is used
 
     Returns:
         str: Role ('owner', 'admin', 'member') or None if not a member
     """
-    try:
-        if isinstance(organization, str):
-            from .models import Organization
-            organization = Organization.objects.get(slug=organization)
-
-        membership = Membership.objects.get(
-            user=user,
-            organization=organization,
-            is_active=True
-        )
-        return membership.role
-    except Membership.DoesNotExist:
-        return None
-
-
-def user_can_invite_members(user, organization):
+    if request is not None and request.user == user:
+        return get_role(request, organization)
+
+    if isinstance(organization, str):
+        lookup = {'organization__slug': organization}
+    else:
+        lookup = {'organization': organization}
+
+    return (
+        Membership.objects
+        .filter(user=user, is_active=True, **lookup)
+        .values_list('role', flat=True)
+        .first()
+    )
+
+
+def user_can_invite_members(user, organization, request=None):
     """
     Check if user can invite members to the organization.
     Only admins and owners can invite.
@@ -238,15 +131,16 @@ def user_can_invite_members(user, organization):
     Args:
         user: User instance
         organization: Organization instance
+        request: Current request, to reuse its memoized membership
 
     Returns:
         bool: True if user can invite, False otherwise
     """
-    role = get_user_role_in_org(user, organization)
-    return role in ['admin', 'owner']
+    role = get_user_role_in_org(user, organization, request=request)
+    return role in ADMIN_ROLES
 
 
-def user_can_manage_subscription(user, organization):
+def user_can_manage_subscription(user, organization, request=None):
     """
     Check if user can manage subscription for the organization.
     Only admins and owners can manage subscriptions.
@@ -254,9 +148,10 @@ def user_can_manage_subscription(user, organization):
     Args:
         user: User instance
         organization: Organization instance
+        request: Current request, to reuse its memoized membership
 
     Returns:
         bool: True if user can manage subscription, False otherwise
     """
-    role = get_user_role_in_org(user, organization)
-    return role in ['admin', 'owner']
+    role = get_user_role_in_org(user, organization, request=request)
+    return role in ADMIN_ROLES
@@ -1,10 +1,14 @@
+import csv
+import io
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
 from rest_framework import serializers
 from .models import Organization, Membership, Invitation
 from apps.accounts.serializers import UserSerializer
 
 class OrganizationSerializer(serializers.ModelSerializer):
     role = serializers.SerializerMethodField()
-    member_count = serializers.SerializerMethodField()
     slug = serializers.SlugField(required=False, allow_blank=True)
 
     class Meta:
@@ -24,11 +28,6 @@ class OrganizationSerializer(serializers.ModelSerializer):
             return obj.user_role
         return None
 
-    def get_member_count(self, obj):
-        if hasattr(obj, 'member_count'):
-            return obj.member_count
-        return obj.memberships.count()
-
 class MembershipSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_full_name = serializers.CharField(source='user.full_name', read_only=True)
@@ -50,3 +49,56 @@ class InvitationSerializer(serializers.ModelSerializer):
 class CreateInvitationSerializer(serializers.Serializer):
     email = serializers.EmailField()
     role = serializers.ChoiceField(choices=Membership.ROLE_CHOICES, default=Membership.ROLE_MEMBER)
+
+class BulkInvitationSerializer(serializers.Serializer):
+    """
+    Bulk invitation input: a list of emails and/or a CSV file.
+
+    CSV files use the column headed "email", or the first column when there
+    is no such header. Addresses are lowercased and de-duplicated; invalid
+    ones are returned separately in ``invalid`` instead of failing the batch.
+    """
+    emails = serializers.ListField(child=serializers.CharField(), required=False)
+    file = serializers.FileField(required=False)
+    role = serializers.ChoiceField(choices=Membership.ROLE_CHOICES, default=Membership.ROLE_MEMBER)
+
+    def validate_file(self, value):
+        try:
+            text = value.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise serializers.ValidationError("CSV file must be UTF-8 encoded.")
+
+        rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+        if not rows:
+            return []
+
+        header = [cell.strip().lower() for cell in rows[0]]
+        if 'email' in header:
+            column = header.index('email')
+            rows = rows[1:]
+        else:
+            column = 0
+        return [row[column] for row in rows if len(row) > column]
+
+    def validate(self, attrs):
+        raw = list(attrs.get('emails') or []) + list(attrs.pop('file', None) or [])
+        if not raw:
+            raise serializers.ValidationError("Provide a list of emails or a CSV file.")
+
+        emails, invalid = {}, {}
+        for value in raw:
+            email = value.strip().lower()
+            try:
+                validate_email(email)
+            except DjangoValidationError:
+                invalid[value.strip()] = None
+            else:
+                emails[email] = None
+
+        max_emails = settings.INVITATION_BULK_MAX_EMAILS
+        if len(emails) > max_emails:
+            raise serializers.ValidationError(f"At most {max_emails} emails can be invited at once.")
+
+        attrs['emails'] = list(emails)
+        attrs['invalid'] = list(invalid)
+        return attrs
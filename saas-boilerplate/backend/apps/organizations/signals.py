@@ -0,0 +1,68 @@
+"""
+Organization signal handlers
+
+Keep the cached user -> organization role map, the slug -> organization
+cache and the denormalized organization member counts in step with the
+database.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .membership import OrganizationRoleCache
+from .models import Membership, Organization
+from .tenancy import OrganizationCache
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_member_roles(sender, instance, **kwargs):
+    OrganizationRoleCache.invalidate(instance.user_id)
+
+
+@receiver(post_init, sender=Membership)
+def remember_membership_state(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._counted_is_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=Membership)
+def count_membership_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        if instance.is_active:
+            Organization.adjust_member_count(instance.organization_id, 1)
+    elif instance._counted_is_active is not None and instance._counted_is_active != instance.is_active:
+        Organization.adjust_member_count(instance.organization_id, 1 if instance.is_active else -1)
+
+    instance._counted_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=Membership)
+def count_membership_deleted(sender, instance, **kwargs):
+    if instance._counted_is_active:
+        Organization.adjust_member_count(instance.organization_id, -1)
+
+
+@receiver(post_init, sender=Organization)
+def remember_organization_slug(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._cached_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_cached_organization(sender, instance, **kwargs):
+    OrganizationCache.invalidate(instance.slug, instance._cached_slug)
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization_roles(sender, instance, created, raw=False, **kwargs):
+    # Role maps are keyed by slug, so only a rename affects them. Deleting an
+    # organization cascades to its memberships, which invalidate themselves.
+    if raw or created or instance._cached_slug == instance.slug:
+        return
+
+    user_ids = Membership.objects.filter(organization=instance).values_list('user_id', flat=True)
+    OrganizationRoleCache.invalidate(*user_ids)
+    instance._cached_slug = instance.slug
@@ -0,0 +1,116 @@
+"""
+Celery tasks for organizations
+
+Background creation and delivery of bulk invitations.
+"""
+from celery import shared_task
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Lower
+from django.utils import timezone
+from apps.core.tasks import send_email_batch
+from .invitations import BulkInvitationJob
+from .models import Invitation, Organization
+
+User = get_user_model()
+
+
+@shared_task
+def create_bulk_invitations(job_id, organization_id, invited_by_id, emails, role):
+    """
+    Create the invitations of a bulk invite and queue their emails.
+
+    Addresses with a pending invitation are skipped in one query; the rest
+    are hashed and inserted with bulk_create, then emailed in chunks of
+    INVITATION_EMAIL_BATCH_SIZE.
+
+    Args:
+        job_id: BulkInvitationJob to report to
+        organization_id: Organization invited to
+        invited_by_id: Inviting user
+        emails: Normalized email addresses to invite
+        role: Role granted on acceptance
+    """
+    job = BulkInvitationJob(job_id)
+    organization = Organization.objects.get(pk=organization_id)
+    invited_by = User.objects.get(pk=invited_by_id)
+
+    pending = set(
+        Invitation.objects
+        .filter(
+            organization=organization,
+            status=Invitation.STATUS_PENDING,
+            expires_at__gt=timezone.now(),
+        )
+        .annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=emails)
+        .values_list('email_lower', flat=True)
+    )
+    job.set_statuses({email: BulkInvitationJob.STATUS_ALREADY_INVITED for email in pending})
+
+    expires_at = timezone.now() + timedelta(days=7)
+    built = [
+        Invitation.build_invitation(
+            email=email,
+            organization=organization,
+            role=role,
+            invited_by=invited_by,
+            expires_at=expires_at,
+        )
+        for email in emails
+        if email not in pending
+    ]
+    Invitation.objects.bulk_create([invitation for invitation, _ in built], batch_size=500)
+    job.set_statuses({invitation.email: BulkInvitationJob.STATUS_CREATED for invitation, _ in built})
+
+    batch_size = settings.INVITATION_EMAIL_BATCH_SIZE
+    items = [[invitation.email, token] for invitation, token in built]
+    for start in range(0, len(items), batch_size):
+        send_invitation_email_batch.delay(
+            job_id,
+            organization.name,
+            invited_by.full_name,
+            items[start:start + batch_size],
+        )
+
+    return f"Created {len(built)} invitations for bulk invite {job_id}"
+
+
+@shared_task
+def send_invitation_email_batch(job_id, organization_name, inviter_name, items):
+    """
+    Send one chunk of bulk invitation emails over a single connection.
+
+    Args:
+        job_id: BulkInvitationJob to report to
+        organization_name: Name shown in the email
+        inviter_name: Name of the inviting user
+        items: List of [email, plaintext token] pairs
+    """
+    messages = [
+        {
+            'subject': f"You've been invited to join {organization_name}",
+            'recipient_list': [email],
+            'template_name': 'emails/invitation.html',
+            'context': {
+                'inviter_name': inviter_name,
+                'organization_name': organization_name,
+                'accept_url': f"{settings.FRONTEND_URL}/invitations/{token}",
+            },
+        }
+        for email, token in items
+    ]
+
+    job = BulkInvitationJob(job_id)
+    try:
+        failed = set(send_email_batch(messages))
+    except Exception:
+        job.set_statuses({email: BulkInvitationJob.STATUS_FAILED for email, _ in items})
+        raise
+
+    job.set_statuses({
+        email: BulkInvitationJob.STATUS_FAILED if index in failed else BulkInvitationJob.STATUS_SENT
+        for index, (email, _) in enumerate(items)
+    })
+    return f"Sent {len(items) - len(failed)} of {len(items)} invitation emails"
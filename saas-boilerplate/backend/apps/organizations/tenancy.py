@@ -0,0 +1,93 @@
+"""
+Organization (tenant) lookup by slug.
+
+TenantMiddleware resolves the active organization on every org-scoped
+request. ``OrganizationCache`` answers slug lookups from an in-process LRU,
+then the shared cache, and only then the database.
+"""
+import copy
+from django.core.cache import cache
+from django.db import transaction
+from apps.core.cache import LocalLRUCache
+from .models import Organization
+
+
+class OrganizationCache:
+    """
+    Two-level slug -> Organization cache.
+
+    Rows are cached as field values and rebuilt with ``Organization.from_db``
+    so every caller gets its own instance and model signals such as
+    post_init still run. Signal handlers invalidate both levels on save and
+    delete; other processes' LRU entries expire after ``LOCAL_TIMEOUT``.
+
+    Unknown slugs are cached too, for ``MISS_TIMEOUT``, so requests naming a
+    bogus organization do not each reach the database. Creating the
+    organization invalidates the miss like any other save.
+    """
+
+    TIMEOUT = 60 * 60  # seconds
+    LOCAL_TIMEOUT = 30  # seconds
+    MISS_TIMEOUT = 60  # seconds
+    # Cached in place of the field values of an unknown slug
+    MISSING = ()
+    FIELDS = tuple(field.attname for field in Organization._meta.concrete_fields)
+
+    _local = LocalLRUCache(max_size=1024, timeout=LOCAL_TIMEOUT)
+
+    @staticmethod
+    def key(slug):
+        return f'organizations:by_slug:{slug}'
+
+    @classmethod
+    def get(cls, slug):
+        """
+        Return the organization with a slug.
+
+        Args:
+            slug: Organization slug
+
+        Returns:
+            Organization or None: A fresh instance, or None if no
+            organization has the slug
+        """
+        values = cls._local.get(slug)
+        if values is None:
+            key = cls.key(slug)
+            values = cache.get(key)
+            if values is None:
+                values = Organization.objects.filter(slug=slug).values_list(*cls.FIELDS).first()
+                if values is None:
+                    cache.set(key, cls.MISSING, timeout=cls.MISS_TIMEOUT)
+                    values = cls.MISSING
+                else:
+                    cache.set(key, values, timeout=cls.TIMEOUT)
+            cls._local.set(slug, values)
+
+        if values == cls.MISSING:
+            return None
+
+        # Copy so mutable fields (settings) are never shared between requests
+        return Organization.from_db('default', cls.FIELDS, copy.deepcopy(values))
+
+    @classmethod
+    def invalidate(cls, *slugs):
+        """
+        Drop cached organizations by slug, now and again after commit.
+        """
+        slugs = [slug for slug in slugs if slug]
+        if not slugs:
+            return
+
+        def delete():
+            for slug in slugs:
+                cls._local.delete(slug)
+            cache.delete_many([cls.key(slug) for slug in slugs])
+
+        delete()
+        transaction.on_commit(delete)
+
+    @classmethod
+    def clear_local(cls):
+        """Empty this process's LRU."""
+        cls._local.clear()
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import patch
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from apps.accounts.tests.factories import UserFactory
+from apps.organizations.invitations import BulkInvitationJob
+from apps.organizations.models import Invitation, Membership
+from apps.organizations.tasks import create_bulk_invitations, send_invitation_email_batch
+from apps.organizations.tests.factories import InvitationFactory, MembershipFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestBulkInvite:
+    def url(self, organization):
+        return reverse('organization-members-bulk-invite', kwargs={'organization_slug': organization.slug})
+
+    def test_bulk_invite_queues_new_emails(
+        self, authenticated_client, organization, django_capture_on_commit_callbacks
+    ):
+        MembershipFactory(organization=organization, user=UserFactory(email='member@example.com'))
+        payload = {
+            'emails': ['New@Example.com', 'new@example.com', 'other@example.com', 'MEMBER@example.com', 'nope'],
+            'role': 'admin',
+        }
+
+        with patch('apps.organizations.views.create_bulk_invitations.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(self.url(organization), payload, format='json')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['statuses'] == {
+            'nope': 'invalid',
+            'new@example.com': 'queued',
+            'other@example.com': 'queued',
+            'member@example.com': 'already_member',
+        }
+        job_id, organization_id, _, emails, role = delay.call_args.args
+        assert job_id == response.data['job_id']
+        assert emails == ['new@example.com', 'other@example.com']
+        assert role == 'admin'
+
+    def test_bulk_invite_accepts_csv(self, authenticated_client, organization):
+        upload = SimpleUploadedFile(
+            'team.csv',
+            b'name,email\nAda,ada@example.com\nAlan,alan@example.com\n',
+            content_type='text/csv',
+        )
+
+        with patch('apps.organizations.views.create_bulk_invitations.delay'):
+            response = authenticated_client.post(self.url(organization), {'file': upload}, format='multipart')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['summary'] == {'queued': 2}
+
+    def test_bulk_invite_requires_admin(self, api_client, organization):
+        member = UserFactory()
+        MembershipFactory(user=member, organization=organization, role=Membership.ROLE_MEMBER)
+        api_client.force_authenticate(user=member)
+
+        response = api_client.post(self.url(organization), {'emails': ['a@example.com']}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_background_creation_and_delivery(self, authenticated_client, user, organization, settings):
+        settings.INVITATION_EMAIL_BATCH_SIZE = 2
+        InvitationFactory(organization=organization, email='pending@example.com')
+        job, queued = BulkInvitationJob.start(
+            organization, ['pending@example.com', 'a@example.com', 'b@example.com', 'c@example.com'],
+        )
+
+        with patch(
+            'apps.organizations.tasks.send_invitation_email_batch.delay',
+            side_effect=send_invitation_email_batch,
+        ) as delay:
+            create_bulk_invitations(job.job_id, str(organization.pk), str(user.pk), queued, 'member')
+
+        assert delay.call_count == 2
+        assert Invitation.objects.filter(organization=organization).count() == 4
+        assert sorted(message.to[0] for message in mail.outbox) == ['a@example.com', 'b@example.com', 'c@example.com']
+
+        url = reverse(
+            'organization-members-bulk-invite-status',
+            kwargs={'organization_slug': organization.slug, 'job_id': job.job_id},
+        )
+        response = authenticated_client.get(url)
+        assert response.data['summary'] == {'already_invited': 1, 'sent': 3}
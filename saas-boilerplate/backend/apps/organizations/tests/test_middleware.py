@@ -0,0 +1,133 @@
+"""
+Tests for tenant resolution.
+"""
+import pytest
+from unittest.mock import MagicMock
+from django.core.cache import cache
+from django.test import RequestFactory
+from apps.accounts.tests.factories import UserFactory
+from apps.organizations.membership import get_tenant
+from apps.organizations.middleware import TenantMiddleware
+from apps.organizations.tenancy import OrganizationCache
+from apps.organizations.tests.factories import MembershipFactory, OrganizationFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    OrganizationCache.clear_local()
+    yield
+    cache.clear()
+    OrganizationCache.clear_local()
+
+
+@pytest.fixture
+def middleware():
+    return TenantMiddleware(MagicMock())
+
+
+@pytest.mark.django_db
+class TestTenantMiddleware:
+    """Tests for TenantMiddleware."""
+
+    def test_resolves_header(self, middleware):
+        """Test the X-Organization header selects the tenant."""
+        org = OrganizationFactory(slug='acme')
+        user = UserFactory()
+        MembershipFactory(user=user, organization=org, role='admin')
+        request = RequestFactory().get('/', HTTP_X_ORGANIZATION='acme')
+        request.user = user
+
+        middleware(request)
+
+        assert request.requested_organization == org
+        assert get_tenant(request) == org
+
+    def test_non_member_gets_no_tenant(self, middleware):
+        """Test naming an organization does not make it the caller's tenant."""
+        org = OrganizationFactory(slug='acme')
+        request = RequestFactory().get('/', HTTP_X_ORGANIZATION='acme')
+        request.user = UserFactory()
+
+        middleware(request)
+
+        assert request.requested_organization == org
+        assert get_tenant(request) is None
+
+    def test_url_kwarg_overrides_header(self, middleware):
+        """Test nested organization routes win over the header."""
+        OrganizationFactory(slug='acme')
+        other = OrganizationFactory(slug='other')
+        request = RequestFactory().get('/', HTTP_X_ORGANIZATION='acme')
+        request.user = UserFactory()
+
+        middleware(request)
+        middleware.process_view(request, None, (), {'organization_slug': 'other'})
+
+        assert request.requested_organization == other
+
+    def test_resolves_subdomain(self, settings):
+        """Test tenants can be addressed by subdomain."""
+        settings.TENANT_BASE_DOMAIN = 'example.com'
+        settings.ALLOWED_HOSTS = ['.example.com']
+        org = OrganizationFactory(slug='acme')
+        middleware = TenantMiddleware(MagicMock())
+
+        request = RequestFactory().get('/', HTTP_HOST='acme.example.com')
+        middleware(request)
+        assert request.requested_organization == org
+
+        request = RequestFactory().get('/', HTTP_HOST='www.example.com')
+        middleware(request)
+        assert request.requested_organization is None
+
+    def test_unknown_or_inactive_tenant(self, middleware):
+        """Test unknown and deactivated organizations are not attached."""
+        OrganizationFactory(slug='closed', is_active=False)
+
+        for slug in ('missing', 'closed'):
+            request = RequestFactory().get('/', HTTP_X_ORGANIZATION=slug)
+            middleware(request)
+            assert request.requested_organization is None
+
+
+@pytest.mark.django_db
+class TestOrganizationCache:
+    """Tests for OrganizationCache."""
+
+    def test_warm_lookup_needs_no_queries(self, django_assert_num_queries):
+        """Test repeated lookups are served from cache."""
+        org = OrganizationFactory(slug='acme')
+        OrganizationCache.get('acme')
+
+        with django_assert_num_queries(0):
+            assert OrganizationCache.get('acme') == org
+        OrganizationCache.clear_local()
+        with django_assert_num_queries(0):
+            assert OrganizationCache.get('acme') == org
+
+    def test_save_invalidates(self, django_capture_on_commit_callbacks):
+        """Test renames and updates are visible immediately."""
+        org = OrganizationFactory(slug='acme', name='Acme')
+        OrganizationCache.get('acme')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            org.name = 'Acme Inc'
+            org.slug = 'acme-inc'
+            org.save()
+
+        assert OrganizationCache.get('acme') is None
+        assert OrganizationCache.get('acme-inc').name == 'Acme Inc'
+
+    def test_unknown_slug_is_cached_until_created(self, django_assert_num_queries):
+        """Test bogus slugs do not reach the database on every lookup."""
+        assert OrganizationCache.get('ghost') is None
+
+        with django_assert_num_queries(0):
+            assert OrganizationCache.get('ghost') is None
+        OrganizationCache.clear_local()
+        with django_assert_num_queries(0):
+            assert OrganizationCache.get('ghost') is None
+
+        org = OrganizationFactory(slug='ghost')
+        assert OrganizationCache.get('ghost') == org
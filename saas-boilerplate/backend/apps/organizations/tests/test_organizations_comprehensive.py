@@ -17,6 +17,7 @@ from rest_framework import status
 from apps.organizations.models import Organization, Membership, Invitation
 from apps.organizations.tests.factories import OrganizationFactory, MembershipFactory, InvitationFactory
 from apps.accounts.tests.factories import UserFactory
+from apps.analytics.models import ActivityLog
 
 
 @pytest.mark.django_db
@@ -93,6 +94,10 @@ class TestOrganizationCreate:
         assert membership.role == Membership.ROLE_OWNER
         assert membership.is_active is True
 
+        # Verify the creation is audited
+        log = ActivityLog.objects.get(user=user, action='org.created')
+        assert log.metadata['organization_id'] == str(org.pk)
+
     def test_create_organization_generates_unique_slug(self, authenticated_client, user):
         """Test organization creation generates unique slugs."""
         url = reverse('organization-list')
@@ -459,9 +464,63 @@ class TestSecureInvitationToken:
         assert invitation.token_hash != plaintext_token
 
         # Token hash should be a proper hash (starts with algorithm identifier)
-        assert invitation.token_hash.startswith('pbkdf2_sha256$') or \
-               invitation.token_hash.startswith('argon2$') or \
-               invitation.token_hash.startswith('md5$')
+        assert invitation.token_hash.startswith('hmac_sha256$')
+        assert invitation.token_selector not in invitation.token_hash
+
+    def test_find_by_token_is_one_lookup(self, django_assert_num_queries):
+        """Test a token is resolved with a single indexed query."""
+        org = OrganizationFactory()
+        InvitationFactory.create_batch(3, organization=org)
+        invitation, plaintext_token = Invitation.create_invitation(
+            email='test@example.com',
+            organization=org,
+            role=Membership.ROLE_MEMBER,
+            invited_by=UserFactory(),
+            expires_at=timezone.now() + timedelta(days=7)
+        )
+        selector = plaintext_token.split('.')[0]
+
+        with django_assert_num_queries(1):
+            assert Invitation.find_by_token(plaintext_token) == invitation
+        assert Invitation.find_by_token(f'{selector}.wrong-verifier') is None
+        assert Invitation.find_by_token('unknown.token') is None
+
+    def test_legacy_token_still_accepted(self):
+        """Test invitations issued before selectors keep working."""
+        from django.contrib.auth.hashers import make_password
+
+        invitation = InvitationFactory(email='legacy@example.com', token_hash=make_password('legacy-token'))
+
+        assert Invitation.find_by_token('legacy-token', email='LEGACY@example.com') == invitation
+        assert Invitation.find_by_token('other-token', email='legacy@example.com') is None
+
+    def test_legacy_lookup_hashes_a_bounded_set(self):
+        """Test a token without a selector cannot make us hash every legacy invitation."""
+        InvitationFactory.create_batch(3, email='other@example.com')
+        InvitationFactory.create_batch(Invitation.LEGACY_CANDIDATE_LIMIT + 2, email='victim@example.com')
+
+        with patch('apps.organizations.models.check_password', return_value=False) as mock_check:
+            assert Invitation.find_by_token('guess') is None
+            assert mock_check.call_count == 0
+
+            assert Invitation.find_by_token('guess', email='victim@example.com') is None
+            assert mock_check.call_count == Invitation.LEGACY_CANDIDATE_LIMIT
+
+    def test_accept_invitation_creates_membership(self):
+        """Test accepting by token creates the membership."""
+        from apps.organizations.invitations import accept_invitation, create_invitation
+
+        org = OrganizationFactory()
+        user = UserFactory(email='joiner@example.com')
+        invitation = create_invitation(org, 'joiner@example.com', Membership.ROLE_ADMIN, UserFactory())
+
+        membership, error = accept_invitation(invitation.token, user)
+
+        assert error is None
+        assert membership.role == Membership.ROLE_ADMIN
+        invitation.refresh_from_db()
+        assert invitation.status == Invitation.STATUS_ACCEPTED
+        assert accept_invitation(invitation.token, user) == (None, "Invalid or expired invitation")
 
 
 @pytest.mark.django_db
@@ -509,3 +568,62 @@ class TestMembershipRoles:
         MembershipFactory(user=user, organization=org2)
 
         assert user.memberships.filter(is_active=True).count() == 2
+
+
+@pytest.mark.django_db
+class TestMemberCount:
+    """Tests for the denormalized organization member count."""
+
+    def test_member_count_follows_memberships(self):
+        """Test create, deactivate, reactivate and delete keep the count."""
+        org = OrganizationFactory()
+        first = MembershipFactory(organization=org)
+        second = MembershipFactory(organization=org)
+        MembershipFactory(organization=org, is_active=False)
+
+        org.refresh_from_db()
+        assert org.member_count == 2
+
+        first.is_active = False
+        first.save()
+        second.delete()
+        org.refresh_from_db()
+        assert org.member_count == 0
+
+        first.is_active = True
+        first.save()
+        org.refresh_from_db()
+        assert org.member_count == 1
+
+    def test_list_returns_role_and_count_in_one_query(
+        self, authenticated_client, user, django_assert_num_queries
+    ):
+        """Test the org list reports accurate counts with a single query."""
+        org = OrganizationFactory()
+        MembershipFactory(user=user, organization=org, role=Membership.ROLE_ADMIN)
+        MembershipFactory.create_batch(2, organization=org)
+        other = OrganizationFactory()
+        MembershipFactory(user=user, organization=other, role=Membership.ROLE_MEMBER)
+
+        url = reverse('organization-list')
+        with django_assert_num_queries(2):  # organizations + pagination count
+            response = authenticated_client.get(url)
+
+        counts = {item['slug']: (item['role'], item['member_count']) for item in response.data['data']}
+        assert counts == {org.slug: ('admin', 3), other.slug: ('member', 1)}
+
+    def test_repair_member_counts(self):
+        """Test the repair command fixes drifted counts."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        org = OrganizationFactory()
+        MembershipFactory.create_batch(2, organization=org)
+        Organization.objects.filter(pk=org.pk).update(member_count=7)
+
+        out = StringIO()
+        call_command('repair_member_counts', stdout=out)
+
+        org.refresh_from_db()
+        assert org.member_count == 2
+        assert 'Repaired 1 organization member counts' in out.getvalue()
@@ -0,0 +1,113 @@
+import pytest
+from types import SimpleNamespace
+from django.core.cache import cache
+from django.test import RequestFactory
+from apps.accounts.tests.factories import UserFactory
+from apps.organizations.membership import OrganizationRoleCache, get_membership, get_role
+from apps.organizations.models import Membership
+from apps.organizations.permissions import (
+    IsOrgAdmin,
+    IsOrgMember,
+    IsOrgMemberReadOnly,
+    IsOrgOwner,
+    get_user_role_in_org,
+)
+from apps.organizations.tests.factories import MembershipFactory, OrganizationFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def organization():
+    return OrganizationFactory(slug='acme')
+
+
+def make_request(user, method='get'):
+    request = getattr(RequestFactory(), method)('/')
+    request.user = user
+    return request
+
+
+@pytest.mark.django_db
+class TestMembershipResolver:
+    def test_permission_checks_share_one_query(self, organization, django_assert_num_queries):
+        user = UserFactory()
+        MembershipFactory(user=user, organization=organization, role=Membership.ROLE_ADMIN)
+        request = make_request(user, 'post')
+        view = SimpleNamespace(kwargs={'organization_slug': 'acme'})
+
+        with django_assert_num_queries(1):
+            assert IsOrgMember().has_permission(request, view)
+            assert IsOrgAdmin().has_permission(request, view)
+            assert not IsOrgOwner().has_permission(request, view)
+            assert IsOrgMemberReadOnly().has_permission(request, view)
+            assert IsOrgAdmin().has_object_permission(request, view, organization)
+            assert get_user_role_in_org(user, organization, request=request) == 'admin'
+
+    def test_non_member_is_memoized(self, organization, django_assert_num_queries):
+        request = make_request(UserFactory())
+
+        with django_assert_num_queries(1):
+            assert get_membership(request, 'acme') is None
+            assert get_membership(request, 'acme') is None
+
+    def test_inactive_membership_is_denied(self, organization):
+        user = UserFactory()
+        MembershipFactory(user=user, organization=organization, is_active=False)
+        request = make_request(user)
+        view = SimpleNamespace(kwargs={'slug': 'acme'})
+
+        assert not IsOrgMember().has_permission(request, view)
+        assert get_user_role_in_org(user, 'acme') is None
+
+    def test_read_only_requires_admin_to_write(self, organization):
+        user = UserFactory()
+        MembershipFactory(user=user, organization=organization, role=Membership.ROLE_MEMBER)
+        view = SimpleNamespace(kwargs={'slug': 'acme'})
+
+        assert IsOrgMemberReadOnly().has_permission(make_request(user, 'get'), view)
+        assert not IsOrgMemberReadOnly().has_permission(make_request(user, 'patch'), view)
+
+
+@pytest.mark.django_db
+class TestOrganizationRoleCache:
+    def test_warm_roles_need_no_queries(self, organization, django_assert_num_queries):
+        user = UserFactory()
+        MembershipFactory(user=user, organization=organization, role=Membership.ROLE_ADMIN)
+        OrganizationRoleCache.get(user.pk)
+        view = SimpleNamespace(kwargs={'organization_slug': 'acme'})
+
+        with django_assert_num_queries(0):
+            assert IsOrgAdmin().has_permission(make_request(user), view)
+            assert get_role(make_request(user), 'other') is None
+
+    def test_membership_changes_invalidate(self, organization, django_capture_on_commit_callbacks):
+        user = UserFactory()
+        with django_capture_on_commit_callbacks(execute=True):
+            membership = MembershipFactory(user=user, organization=organization, role=Membership.ROLE_MEMBER)
+        assert OrganizationRoleCache.get(user.pk) == {'acme': 'member'}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership.role = Membership.ROLE_ADMIN
+            membership.save()
+        assert OrganizationRoleCache.get(user.pk) == {'acme': 'admin'}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership.delete()
+        assert OrganizationRoleCache.get(user.pk) == {}
+
+    def test_slug_change_invalidates_members(self, organization, django_capture_on_commit_callbacks):
+        user = UserFactory()
+        MembershipFactory(user=user, organization=organization, role=Membership.ROLE_OWNER)
+        assert OrganizationRoleCache.get(user.pk) == {'acme': 'owner'}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            organization.slug = 'acme-inc'
+            organization.save()
+
+        assert OrganizationRoleCache.get(user.pk) == {'acme-inc': 'owner'}
@@ -1,13 +1,19 @@
 from rest_framework import viewsets, status, permissions, decorators, mixins
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from django.db.models import Count, F, Value, CharField
+from django.db import transaction
+from django.http import Http404
+from django.db.models import F
 from django.utils import timezone
 from .models import Organization, Membership, Invitation
+from .invitations import BulkInvitationJob
+from .membership import ADMIN_ROLES, get_membership
 from .serializers import (
     OrganizationSerializer, MembershipSerializer, 
-    InvitationSerializer, CreateInvitationSerializer
+    InvitationSerializer, CreateInvitationSerializer,
+    BulkInvitationSerializer,
 )
+from .tasks import create_bulk_invitations
+from apps.analytics.services import ActivityLogger
 from apps.core.tasks import send_email_task
 from django.conf import settings
 import uuid
@@ -18,12 +24,13 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     lookup_field = 'slug'
 
     def get_queryset(self):
+        # The role comes from the same filtered membership join, and
+        # member_count is denormalized, so listing needs a single query
         return Organization.objects.filter(
             memberships__user=self.request.user,
             memberships__is_active=True
         ).annotate(
             user_role=F('memberships__role'),
-            member_count=Count('memberships')
         ).order_by('-created_at')
 
     def perform_create(self, serializer):
@@ -37,6 +44,27 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             organization=org,
             role=Membership.ROLE_OWNER
         )
+        org.user_role = Membership.ROLE_OWNER
+        org.refresh_from_db(fields=['member_count'])
+        ActivityLogger.log(
+            'org.created', user=self.request.user, request=self.request,
+            organization_id=str(org.pk),
+        )
+
+    def perform_update(self, serializer):
+        org = serializer.save()
+        ActivityLogger.log(
+            'org.updated', user=self.request.user, request=self.request,
+            organization_id=str(org.pk),
+        )
+
+    def perform_destroy(self, instance):
+        organization_id = str(instance.pk)
+        instance.delete()
+        ActivityLogger.log(
+            'org.deleted', user=self.request.user, request=self.request,
+            organization_id=organization_id,
+        )
 
 class MemberViewSet(mixins.RetrieveModelMixin,
                     mixins.UpdateModelMixin,
@@ -55,24 +83,44 @@ class MemberViewSet(mixins.RetrieveModelMixin,
         ).select_related('user')
 
     def check_admin_permissions(self, organization):
-        membership = organization.memberships.filter(user=self.request.user).first()
-        if not membership or membership.role not in [Membership.ROLE_OWNER, Membership.ROLE_ADMIN]:
+        membership = get_membership(self.request, organization)
+        if not membership or membership.role not in ADMIN_ROLES:
             self.permission_denied(self.request, message="Only admins and owners can manage members.")
 
     def update(self, request, *args, **kwargs):
         # Custom update to check permissions
-        instance = self.get_object()
-        self.check_admin_permissions(instance.organization)
+        self.get_object()
+        self.check_admin_permissions(self.kwargs.get('organization_slug'))
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        previous_role = serializer.instance.role
+        membership = serializer.save()
+        if membership.role != previous_role:
+            ActivityLogger.log(
+                'org.role_changed', user=self.request.user, request=self.request,
+                organization_id=str(membership.organization_id),
+                member_id=str(membership.user_id),
+                old_role=previous_role,
+                new_role=membership.role,
+            )
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        ActivityLogger.log(
+            'org.member_removed', user=self.request.user, request=self.request,
+            organization_id=str(instance.organization_id),
+            member_id=str(instance.user_id),
+        )
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        self.check_admin_permissions(instance.organization)
+        self.check_admin_permissions(self.kwargs.get('organization_slug'))
         
         # Prevent removing the last owner
         if instance.role == Membership.ROLE_OWNER:
             owner_count = Membership.objects.filter(
-                organization=instance.organization, 
+                organization_id=instance.organization_id,
                 role=Membership.ROLE_OWNER,
                 is_active=True
             ).count()
@@ -86,7 +134,10 @@ class MemberViewSet(mixins.RetrieveModelMixin,
 
     @decorators.action(detail=False, methods=['post'])
     def invite(self, request, organization_slug=None):
-        org = get_object_or_404(Organization, slug=organization_slug, memberships__user=request.user)
+        membership = get_membership(request, organization_slug)
+        if not membership:
+            raise Http404
+        org = membership.organization
         self.check_admin_permissions(org)
 
         serializer = CreateInvitationSerializer(data=request.data)
@@ -107,6 +158,11 @@ class MemberViewSet(mixins.RetrieveModelMixin,
             invited_by=request.user,
             expires_at=timezone.now() + timezone.timedelta(days=7)
         )
+        ActivityLogger.log(
+            'org.member_invited', user=request.user, request=request,
+            organization_id=str(org.pk),
+            invitation_id=str(invitation.pk),
+        )
 
         # Send email
         accept_url = f"{settings.FRONTEND_URL}/invitations/{token}"
@@ -123,6 +179,49 @@ class MemberViewSet(mixins.RetrieveModelMixin,
 
         return Response({"detail": "Invitation sent"}, status=status.HTTP_201_CREATED)
 
+    @decorators.action(detail=False, methods=['post'], url_path='bulk-invite')
+    def bulk_invite(self, request, organization_slug=None):
+        """
+        Invite a list or CSV of emails; creation and delivery run in the
+        background and progress is reported by bulk_invite_status.
+        """
+        membership = get_membership(request, organization_slug)
+        if not membership:
+            raise Http404
+        org = membership.organization
+        self.check_admin_permissions(org)
+
+        serializer = BulkInvitationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        job, queued = BulkInvitationJob.start(org, data['emails'], invalid=data['invalid'])
+        if queued:
+            transaction.on_commit(lambda: create_bulk_invitations.delay(
+                job.job_id, str(org.pk), str(request.user.pk), queued, data['role'],
+            ))
+
+        return Response(
+            {
+                **job.get(),
+                "status_url": request.build_absolute_uri(f"{request.path.rstrip('/')}/{job.job_id}/"),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @decorators.action(detail=False, methods=['get'], url_path=r'bulk-invite/(?P<job_id>[0-9a-f]{32})')
+    def bulk_invite_status(self, request, organization_slug=None, job_id=None):
+        """Report the per-email status of a bulk invitation."""
+        membership = get_membership(request, organization_slug)
+        if not membership:
+            raise Http404
+        self.check_admin_permissions(membership.organization)
+
+        progress = BulkInvitationJob(job_id).get()
+        if not progress or progress['organization_id'] != str(membership.organization_id):
+            raise Http404
+        return Response(progress)
+
 class InvitationViewSet(mixins.RetrieveModelMixin,
                         mixins.DestroyModelMixin,
                         mixins.ListModelMixin,
@@ -141,8 +240,8 @@ class InvitationViewSet(mixins.RetrieveModelMixin,
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         # Check permissions
-        membership = instance.organization.memberships.filter(user=request.user).first()
-        if not membership or membership.role not in [Membership.ROLE_OWNER, Membership.ROLE_ADMIN]:
+        membership = get_membership(request, self.kwargs.get('organization_slug'))
+        if not membership or membership.role not in ADMIN_ROLES:
              return Response({"detail": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
         
         instance.status = Invitation.STATUS_REVOKED
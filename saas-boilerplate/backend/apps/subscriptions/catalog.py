@@ -0,0 +1,149 @@
+"""
+In-process catalog of active plans.
+
+Every worker keeps the active plans in memory, indexed by id and by Stripe
+price id, together with the public plan list pre-rendered as JSON, so
+resolving a price or serving the pricing page costs no query. The catalog
+is tagged with a version stored in the shared cache; Plan signal handlers,
+bulk ``Plan.objects.update()`` and ``seed_plans`` bump the version and
+workers reload when they see it change.
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from rest_framework.renderers import JSONRenderer
+from .models import Plan
+from .serializers import PlanSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot(NamedTuple):
+    """Active plans as loaded for one catalog version. Treat as read-only."""
+
+    version: Optional[int]
+    plans: tuple
+    by_id: dict
+    by_price_id: dict
+    # Public plan list as served by PlanListView
+    rendered: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+    @classmethod
+    def load(cls, version):
+        plans = tuple(Plan.objects.filter(is_active=True).order_by('display_order'))
+        rendered = JSONRenderer().render(PlanSerializer(plans, many=True).data)
+        by_price_id = {}
+        for plan in plans:
+            by_price_id[plan.stripe_price_id_yearly] = (plan, 'yearly')
+        for plan in plans:
+            # A price id used as both wins as monthly, as the old lookup did
+            by_price_id[plan.stripe_price_id_monthly] = (plan, 'monthly')
+        return cls(
+            version=version,
+            plans=plans,
+            by_id={plan.pk: plan for plan in plans},
+            by_price_id=by_price_id,
+            rendered=rendered,
+            etag=f'"{hashlib.sha256(rendered).hexdigest()[:32]}"',
+            # Over all plans, so deactivating one also moves it forward
+            last_modified=Plan.objects.aggregate(last=Max('updated_at'))['last'],
+        )
+
+
+class PlanCatalog:
+    """
+    Per-process snapshot of the active plans, reloaded when the version key
+    changes. The version is read at most once per ``VERSION_CHECK_INTERVAL``,
+    so another worker's change is picked up within that interval; changes
+    made in this process are seen immediately.
+    """
+
+    VERSION_KEY = 'subscriptions:plan_catalog:version'
+    VERSION_CHECK_INTERVAL = 1  # seconds
+
+    _snapshot = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls):
+        """
+        Return the current snapshot, reloading it if the version changed.
+
+        Returns:
+            CatalogSnapshot
+        """
+        snapshot = cls._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+            return snapshot
+
+        with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is not None and now - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+                return snapshot
+            version = cls._read_version()
+            # An unreadable version reloads on every check rather than
+            # serving an outdated catalog indefinitely
+            if snapshot is None or version is None or version != snapshot.version:
+                snapshot = CatalogSnapshot.load(version)
+                cls._snapshot = snapshot
+            cls._checked_at = now
+        return snapshot
+
+    @classmethod
+    def active_plans(cls):
+        """Active plans ordered by display_order."""
+        return cls.get().plans
+
+    @classmethod
+    def get_plan(cls, plan_id) -> Optional[Plan]:
+        """Return the active plan with this id, or None."""
+        return cls.get().by_id.get(plan_id)
+
+    @classmethod
+    def resolve_price(cls, price_id: str) -> Optional[tuple[Plan, str]]:
+        """
+        Return the active plan a Stripe price belongs to and its billing cycle.
+
+        Returns:
+            tuple or None: (plan, 'monthly' | 'yearly'), or None if no active
+            plan uses the price
+        """
+        return cls.get().by_price_id.get(price_id)
+
+    @classmethod
+    def invalidate(cls):
+        """Bump the catalog version, now and again after commit."""
+
+        def bump():
+            cls.clear_local()
+            try:
+                cache.add(cls.VERSION_KEY, 0, timeout=None)
+                cache.incr(cls.VERSION_KEY)
+            except Exception as e:
+                logger.warning(f"Plan catalog invalidation failed: {e}")
+
+        bump()
+        transaction.on_commit(bump)
+
+    @classmethod
+    def clear_local(cls):
+        """Drop this process's snapshot."""
+        cls._snapshot = None
+
+    @classmethod
+    def _read_version(cls):
+        try:
+            return cache.get(cls.VERSION_KEY, 0)
+        except Exception as e:
+            logger.warning(f"Plan catalog version read failed: {e}")
+            return None
@@ -2,6 +2,7 @@ from decimal import Decimal
 
 from django.core.management.base import BaseCommand
 
+from apps.subscriptions.catalog import PlanCatalog
 from apps.subscriptions.models import Plan
 
 
@@ -14,7 +15,7 @@ DEFAULT_PLANS = [
         "stripe_price_id_yearly": "price_starter_yearly",
         "price_monthly": Decimal("29.00"),
         "price_yearly": Decimal("290.00"),
-        "limits": {"users": 5, "projects": 10},
+        "limits": {"users": 5, "projects": 10, "api_requests_per_minute": 300, "api_burst": 100},
         "features": ["Basic analytics", "Email support", "Projects: 10"],
         "display_order": 1,
     },
@@ -26,7 +27,7 @@ DEFAULT_PLANS = [
         "stripe_price_id_yearly": "price_pro_yearly",
         "price_monthly": Decimal("99.00"),
         "price_yearly": Decimal("990.00"),
-        "limits": {"users": 25, "projects": 100},
+        "limits": {"users": 25, "projects": 100, "api_requests_per_minute": 1200, "api_burst": 300},
         "features": ["Advanced analytics", "Priority support", "SSO (SAML/OIDC)"],
         "display_order": 2,
     },
@@ -38,7 +39,7 @@ DEFAULT_PLANS = [
         "stripe_price_id_yearly": "price_enterprise_yearly",
         "price_monthly": Decimal("299.00"),
         "price_yearly": Decimal("2990.00"),
-        "limits": {"users": 500, "projects": 1000},
+        "limits": {"users": 500, "projects": 1000, "api_requests_per_minute": 6000, "api_burst": 1000},
         "features": ["Dedicated support", "Custom SLA", "Security reviews"],
         "display_order": 3,
     },
@@ -72,4 +73,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.WARNING(f"Updated plan {plan.id}"))
 
+        # Saves already bump the catalog version; bump once more so workers
+        # reload even when seeding changed nothing through save()
+        PlanCatalog.invalidate()
         self.stdout.write(self.style.SUCCESS("Plan seeding complete."))
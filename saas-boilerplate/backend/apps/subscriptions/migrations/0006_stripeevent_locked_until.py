@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0005_stripeevent_async_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeevent',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,29 @@
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
 from apps.organizations.models import Organization
 from apps.core.models import TenantOneToOneModel
 
+class PlanQuerySet(models.QuerySet):
+    """
+    Plan queryset whose bulk ``update()`` moves ``updated_at`` and drops the
+    cached plan data, as the signal handlers do when a single plan is saved.
+    """
+
+    def update(self, **kwargs):
+        from .catalog import PlanCatalog
+        from .quotas import PlanLimitsCache
+
+        kwargs.setdefault('updated_at', timezone.now())
+        plan_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        if rows:
+            PlanLimitsCache.invalidate(plan_ids=plan_ids)
+            PlanCatalog.invalidate()
+        return rows
+
+
 class Plan(models.Model):
     id = models.CharField(primary_key=True, max_length=50) # e.g. 'starter'
     name = models.CharField(max_length=100)
@@ -17,6 +39,9 @@ class Plan(models.Model):
 
     is_active = models.BooleanField(default=True)
     display_order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PlanQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -62,20 +87,125 @@ class Subscription(TenantOneToOneModel):
 class StripeEvent(models.Model):
     """
     Stores processed Stripe webhook events for idempotency and audit.
+
+    In asynchronous ingestion the webhook only stores the verified event as
+    ``received``; a Celery worker then processes it (see ``tasks.py``).
+    ``processed_at`` is set when the event is first recorded.
+
+    Exactly one worker processes an event at a time: the row is inserted
+    with ``INSERT ... ON CONFLICT DO NOTHING`` so redeliveries never
+    overwrite it, and a worker must ``claim`` it, which atomically moves it
+    to ``processing`` under a lease. A lease left by a crashed worker
+    expires and the event becomes claimable again.
+
+    Events of ``SNAPSHOT_TYPES`` carry the subscription's complete state, so
+    one made redundant by a newer snapshot is marked ``superseded`` instead
+    of being applied.
     """
+    STATUS_RECEIVED = 'received'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+    STATUS_SUPERSEDED = 'superseded'
+
+    SNAPSHOT_TYPES = (
+        'customer.subscription.created',
+        'customer.subscription.updated',
+        'customer.subscription.deleted',
+        'customer.subscription.canceled',
+    )
 
     event_id = models.CharField(max_length=255, unique=True, db_index=True)
     type = models.CharField(max_length=100, db_index=True)
     payload = models.JSONField()
-    status = models.CharField(max_length=50, default='processed')
+    status = models.CharField(max_length=50, default=STATUS_PROCESSED)
     message = models.CharField(max_length=255, blank=True)
     processed_at = models.DateTimeField(auto_now_add=True)
 
+    # Subscription the event is about, for per-subscription ordering
+    stripe_subscription_id = models.CharField(max_length=255, blank=True, default='')
+    # When Stripe created the event
+    stripe_created = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # End of the current processing lease, or of a failed event's retry backoff
+    locked_until = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-processed_at']
         indexes = [
             models.Index(fields=['type', 'processed_at']),
+            models.Index(fields=['status', 'processed_at'], name='subscr_stripeevent_pending_idx'),
+            models.Index(
+                fields=['stripe_subscription_id', 'stripe_created'],
+                name='subscr_stripeevent_order_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.type} ({self.event_id})"
+
+    @classmethod
+    def insert_if_absent(cls, **values):
+        """
+        Insert an event unless one with the same event_id exists, in one
+        ``INSERT ... ON CONFLICT (event_id) DO NOTHING`` statement.
+
+        Returns:
+            bool: True if this call inserted the row
+        """
+        event = cls(**values)
+        fields = [field for field in cls._meta.concrete_fields if not field.primary_key]
+        params = [
+            field.get_db_prep_save(field.pre_save(event, add=True), connection)
+            for field in fields
+        ]
+        quote = connection.ops.quote_name
+        sql = (
+            f"INSERT INTO {quote(cls._meta.db_table)} "
+            f"({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({quote(cls._meta.get_field('event_id').column)}) DO NOTHING"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount == 1
+
+    @classmethod
+    def claimable(cls, now=None):
+        """
+        Condition matching events a worker may claim: waiting or failed
+        events with attempts left, and events whose lease has expired.
+        """
+        now = now or timezone.now()
+        waiting = models.Q(status__in=(cls.STATUS_RECEIVED, cls.STATUS_FAILED))
+        abandoned = models.Q(status=cls.STATUS_PROCESSING, locked_until__lt=now)
+        return (waiting | abandoned) & models.Q(attempts__lt=settings.STRIPE_WEBHOOK_MAX_ATTEMPTS)
+
+    @classmethod
+    def claim(cls, event_id, lease_seconds=None):
+        """
+        Take exclusive ownership of an event for processing.
+
+        A single conditional UPDATE moves the event to ``processing`` and
+        counts the attempt, so of several concurrent callers exactly one
+        wins; the others get None and should return right away.
+
+        Args:
+            event_id: Stripe event id
+            lease_seconds: How long the claim lasts before another worker
+                may take over (STRIPE_WEBHOOK_LEASE_SECONDS by default)
+
+        Returns:
+            StripeEvent or None: The claimed event, or None if it is
+            processed, being processed, or out of attempts
+        """
+        now = timezone.now()
+        lease = settings.STRIPE_WEBHOOK_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        claimed = cls.objects.filter(cls.claimable(now), event_id=event_id).update(
+            status=cls.STATUS_PROCESSING,
+            locked_until=now + timedelta(seconds=lease),
+            attempts=models.F('attempts') + 1,
+        )
+        if not claimed:
+            return None
+        return cls.objects.get(event_id=event_id)
@@ -0,0 +1,137 @@
+"""
+Per-organization API quotas derived from plan limits.
+
+A plan's ``limits`` may set:
+- ``api_requests_per_minute``: sustained request rate; null for unlimited
+- ``api_burst``: requests allowed at once (defaults to the per-minute rate)
+
+Organizations without a current subscription get ``API_QUOTA_DEFAULT_LIMITS``,
+as do requests outside an organization the caller belongs to.
+``PlanLimitsCache`` answers "what are this organization's limits" from an
+in-process LRU so the throttle adds no database query to a request.
+"""
+from typing import NamedTuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from apps.core.cache import LocalLRUCache
+from .models import Plan, Subscription
+
+# Subscription statuses that grant the plan's limits
+QUOTA_STATUSES = ('trialing', 'active', 'past_due')
+
+_NO_PLAN = ''
+
+
+class ApiQuota(NamedTuple):
+    """Sustained rate (requests per second) and burst of an organization."""
+
+    rate: float
+    burst: int
+
+
+def quota_from_limits(limits):
+    """
+    Build the API quota a plan's limits describe.
+
+    Args:
+        limits: Plan.limits dict
+
+    Returns:
+        ApiQuota or None: None if the plan's API usage is unlimited
+    """
+    defaults = settings.API_QUOTA_DEFAULT_LIMITS
+    per_minute = limits.get('api_requests_per_minute', defaults['api_requests_per_minute'])
+    if per_minute is None:
+        return None
+    burst = limits.get('api_burst') or defaults.get('api_burst') or per_minute
+    return ApiQuota(rate=per_minute / 60, burst=max(1, int(burst)))
+
+
+class PlanLimitsCache:
+    """
+    Two maps, each cached in an in-process LRU in front of the shared cache:
+    organization id -> current plan id, and plan id -> plan limits.
+
+    Subscription and Plan signal handlers invalidate both levels; other
+    processes' LRU entries expire after ``LOCAL_TIMEOUT``.
+    """
+
+    TIMEOUT = 60 * 60  # seconds
+    LOCAL_TIMEOUT = 30  # seconds
+
+    _local = LocalLRUCache(max_size=4096, timeout=LOCAL_TIMEOUT)
+
+    @staticmethod
+    def organization_key(organization_id):
+        return f'subscriptions:plan_for_org:{organization_id}'
+
+    @staticmethod
+    def plan_key(plan_id):
+        return f'subscriptions:plan_limits:{plan_id}'
+
+    @classmethod
+    def get_quota(cls, organization_id):
+        """
+        Return an organization's API quota.
+
+        Args:
+            organization_id: Organization primary key
+
+        Returns:
+            ApiQuota or None: None if the organization's API usage is unlimited
+        """
+        plan_id = cls._get(cls.organization_key(organization_id), lambda: cls._load_plan_id(organization_id))
+        if plan_id == _NO_PLAN:
+            return quota_from_limits({})
+        limits = cls._get(cls.plan_key(plan_id), lambda: cls._load_limits(plan_id))
+        return quota_from_limits(limits)
+
+    @classmethod
+    def invalidate(cls, organization_ids=(), plan_ids=()):
+        """
+        Drop cached plans of organizations and cached plan limits, now and
+        again after commit.
+        """
+        keys = [cls.organization_key(pk) for pk in organization_ids if pk]
+        keys += [cls.plan_key(pk) for pk in plan_ids if pk]
+        if not keys:
+            return
+
+        def delete():
+            for key in keys:
+                cls._local.delete(key)
+            cache.delete_many(keys)
+
+        delete()
+        transaction.on_commit(delete)
+
+    @classmethod
+    def clear_local(cls):
+        """Empty this process's LRU."""
+        cls._local.clear()
+
+    @classmethod
+    def _get(cls, key, load):
+        value = cls._local.get(key)
+        if value is None:
+            value = cache.get(key)
+            if value is None:
+                value = load()
+                cache.set(key, value, timeout=cls.TIMEOUT)
+            cls._local.set(key, value)
+        return value
+
+    @staticmethod
+    def _load_plan_id(organization_id):
+        plan_id = (
+            Subscription.objects
+            .filter(organization_id=organization_id, status__in=QUOTA_STATUSES)
+            .values_list('plan_id', flat=True)
+            .first()
+        )
+        return plan_id or _NO_PLAN
+
+    @staticmethod
+    def _load_limits(plan_id):
+        return Plan.objects.filter(pk=plan_id).values_list('limits', flat=True).first() or {}
@@ -4,7 +4,7 @@ from .models import Subscription, Plan
 class PlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
-        fields = '__all__'
+        exclude = ('updated_at',)
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     plan_details = PlanSerializer(source='plan', read_only=True)
@@ -9,6 +9,7 @@ from django.db import transaction
 from django.utils import timezone as django_timezone
 
 from apps.organizations.models import Organization
+from .catalog import PlanCatalog
 from .models import Plan, Subscription, StripeEvent
 
 logger = logging.getLogger(__name__)
@@ -56,15 +57,7 @@ def _resolve_plan_from_price_id(price_id: str) -> Optional[tuple[Plan, str]]:
     """
     Resolve a Plan from a Stripe Price ID and return the billing cycle.
     """
-    plan = Plan.objects.filter(stripe_price_id_monthly=price_id, is_active=True).first()
-    if plan:
-        return plan, "monthly"
-
-    plan = Plan.objects.filter(stripe_price_id_yearly=price_id, is_active=True).first()
-    if plan:
-        return plan, "yearly"
-
-    return None
+    return PlanCatalog.resolve_price(price_id)
 
 
 def ensure_customer(organization: Organization, email: Optional[str] = None) -> str:
@@ -196,17 +189,30 @@ def sync_subscription_from_stripe(subscription: dict) -> Subscription:
     return subscription_obj
 
 
-def record_event(event: dict, *, status: str, message: str | None = None) -> None:
+def _event_subscription_id(event: dict) -> str:
     """
-    Persist a webhook event for idempotency and auditability.
+    Return the Stripe subscription an event is about, or ''.
     """
-    event_id = event.get("id", "")
-    StripeEvent.objects.update_or_create(
-        event_id=event_id,
-        defaults={
-            "type": event.get("type", "unknown"),
-            "payload": event,
-            "status": status,
-            "message": message or "",
-        },
+    data_object = event.get("data", {}).get("object", {}) or {}
+    if event.get("type", "").startswith("customer.subscription."):
+        return data_object.get("id") or ""
+    return data_object.get("subscription") or ""
+
+
+def receive_event(event: dict) -> bool:
+    """
+    Persist a verified webhook event in the received state for processing.
+
+    An event that is already stored is left untouched, whatever its state,
+    so a redelivery can never reset an event another worker is processing.
+
+    Returns True if the event was new.
+    """
+    return StripeEvent.insert_if_absent(
+        event_id=event.get("id", ""),
+        type=event.get("type", "unknown"),
+        payload=event,
+        status=StripeEvent.STATUS_RECEIVED,
+        stripe_subscription_id=_event_subscription_id(event),
+        stripe_created=_coerce_timestamp(event.get("created")),
     )
@@ -0,0 +1,30 @@
+"""
+Subscription signal handlers
+
+Keep the cached organization plans and plan limits behind the API quotas,
+and the plan catalog, in step with the database, including subscriptions
+synced from Stripe.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .catalog import PlanCatalog
+from .models import Plan, Subscription
+from .quotas import PlanLimitsCache
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_organization_plan(sender, instance, **kwargs):
+    PlanLimitsCache.invalidate(organization_ids=[instance.organization_id])
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_plan_limits(sender, instance, **kwargs):
+    PlanLimitsCache.invalidate(plan_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_plan_catalog(sender, instance, **kwargs):
+    PlanCatalog.invalidate()
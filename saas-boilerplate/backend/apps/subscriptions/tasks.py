@@ -0,0 +1,147 @@
+"""
+Celery tasks for subscriptions
+
+Asynchronous processing of Stripe webhook events stored by the webhook view.
+"""
+import logging
+from celery import shared_task
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .models import StripeEvent
+from .webhooks import process_event
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = settings.STRIPE_WEBHOOK_LEASE_SECONDS
+
+
+def subscription_lock_key(stripe_subscription_id):
+    return f'subscriptions:stripe_events_lock:{stripe_subscription_id}'
+
+
+def pending_events():
+    """Events a worker may claim, excluding exhausted failures."""
+    return StripeEvent.objects.filter(StripeEvent.claimable())
+
+
+def coalesce_events(events):
+    """
+    Supersede pending subscription snapshots made redundant by the newest
+    pending one, in a single UPDATE.
+
+    Args:
+        events: A subscription's pending events, oldest first
+
+    Returns:
+        list: The events still to process, oldest first
+    """
+    snapshots = [event for event in events if event.type in StripeEvent.SNAPSHOT_TYPES]
+    if len(snapshots) < 2:
+        return events
+
+    latest = snapshots[-1]
+    redundant = {event.pk for event in snapshots[:-1]}
+    superseded = pending_events().filter(pk__in=redundant).update(
+        status=StripeEvent.STATUS_SUPERSEDED,
+        message=f"Superseded by {latest.event_id}",
+        locked_until=None,
+    )
+    logger.info(f"Coalesced {superseded} Stripe events into {latest.event_id}")
+    return [event for event in events if event.pk not in redundant]
+
+
+@shared_task(bind=True, max_retries=None)
+def process_stripe_event(self, event_id):
+    """
+    Process a stored Stripe event, in order with its subscription's events.
+
+    Events about the same subscription are processed by one worker at a
+    time under a cache lock, oldest first by Stripe's ``created``; the
+    worker holding the lock drains every pending event of the subscription,
+    so a later event is never applied before an earlier one. Of the
+    subscription snapshots pending, only the newest is applied, and a
+    snapshot older than one already applied is discarded. Each event is
+    claimed before it is processed, so a duplicate delivery handled inline
+    or by another worker is never processed twice. A failed event stops the
+    drain and is retried with exponential backoff until
+    STRIPE_WEBHOOK_MAX_ATTEMPTS is reached.
+
+    Args:
+        event_id: Stripe event id
+    """
+    event = pending_events().filter(event_id=event_id).first()
+    if event is None:
+        return f"Stripe event {event_id} has nothing to process"
+
+    if not event.stripe_subscription_id:
+        events = [event]
+        lock_key = None
+    else:
+        lock_key = subscription_lock_key(event.stripe_subscription_id)
+        if not cache.add(lock_key, event_id, timeout=LOCK_TIMEOUT):
+            # Another worker is draining this subscription's events
+            raise self.retry(countdown=1)
+
+    try:
+        if lock_key:
+            events = coalesce_events(list(
+                pending_events().filter(
+                    stripe_subscription_id=event.stripe_subscription_id,
+                ).order_by('stripe_created', 'processed_at')
+            ))
+        for pending in events:
+            claimed = StripeEvent.claim(pending.event_id)
+            if claimed is None:
+                continue
+            try:
+                process_event(claimed)
+            except Exception as exc:
+                if claimed.attempts >= settings.STRIPE_WEBHOOK_MAX_ATTEMPTS:
+                    logger.error(f"Stripe event {claimed.event_id} failed {claimed.attempts} times; giving up")
+                    continue
+                countdown = min(2 ** claimed.attempts * 5, 15 * 60)
+                # Hold the sweeper off until the retry is due
+                StripeEvent.objects.filter(
+                    event_id=claimed.event_id,
+                    status=StripeEvent.STATUS_FAILED,
+                ).update(locked_until=timezone.now() + timedelta(seconds=countdown))
+                raise self.retry(exc=exc, countdown=countdown, args=[claimed.event_id])
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+
+    return f"Processed Stripe event {event_id}"
+
+
+@shared_task
+def enqueue_pending_stripe_events(older_than_minutes=5):
+    """
+    Re-queue stored Stripe events that were never picked up, e.g. because
+    the broker was down when the webhook arrived, events whose worker died
+    holding the lease, and failed events with attempts left whose retry
+    backoff has passed, in case their Celery retry was lost.
+
+    Args:
+        older_than_minutes: Only events received at least this long ago
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(minutes=older_than_minutes)
+    event_ids = list(
+        pending_events()
+        .filter(
+            Q(status=StripeEvent.STATUS_RECEIVED, processed_at__lt=cutoff)
+            | Q(status=StripeEvent.STATUS_PROCESSING)
+            | (
+                Q(status=StripeEvent.STATUS_FAILED)
+                & (Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            )
+        )
+        .values_list('event_id', flat=True)
+    )
+    for event_id in event_ids:
+        process_stripe_event.delay(event_id)
+
+    return f"Queued {len(event_ids)} pending Stripe events"
@@ -0,0 +1,155 @@
+"""
+Tests for the in-process plan catalog.
+"""
+import pytest
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from apps.subscriptions.catalog import PlanCatalog
+from apps.subscriptions.models import Plan
+from apps.subscriptions.services import _resolve_plan_from_price_id
+
+
+def make_plan(plan_id='starter', **kwargs):
+    values = {
+        'id': plan_id,
+        'name': plan_id.title(),
+        'stripe_price_id_monthly': f'price_{plan_id}_monthly',
+        'stripe_price_id_yearly': f'price_{plan_id}_yearly',
+        'price_monthly': 10,
+        'price_yearly': 100,
+    }
+    values.update(kwargs)
+    return Plan.objects.create(**values)
+
+
+@pytest.mark.django_db
+class TestPlanCatalog:
+    """Tests for PlanCatalog."""
+
+    def test_resolves_price_ids(self):
+        plan = make_plan()
+
+        assert _resolve_plan_from_price_id('price_starter_monthly') == (plan, 'monthly')
+        assert _resolve_plan_from_price_id('price_starter_yearly') == (plan, 'yearly')
+        assert _resolve_plan_from_price_id('price_unknown') is None
+
+    def test_excludes_inactive_plans(self):
+        make_plan('legacy', is_active=False)
+
+        assert PlanCatalog.get_plan('legacy') is None
+        assert _resolve_plan_from_price_id('price_legacy_monthly') is None
+
+    def test_active_plans_in_display_order(self):
+        make_plan('pro', display_order=2)
+        make_plan('starter', display_order=1)
+
+        assert [plan.pk for plan in PlanCatalog.active_plans()] == ['starter', 'pro']
+
+    def test_warm_lookups_make_no_queries(self, django_assert_num_queries):
+        make_plan()
+        PlanCatalog.get()
+
+        with django_assert_num_queries(0):
+            PlanCatalog.get_plan('starter')
+            PlanCatalog.resolve_price('price_starter_yearly')
+
+    def test_plan_save_invalidates(self):
+        plan = make_plan()
+        PlanCatalog.get()
+
+        plan.stripe_price_id_monthly = 'price_starter_monthly_v2'
+        plan.save()
+
+        assert PlanCatalog.resolve_price('price_starter_monthly_v2') == (plan, 'monthly')
+        assert PlanCatalog.resolve_price('price_starter_monthly') is None
+
+    def test_version_bump_from_another_worker_reloads(self, monkeypatch):
+        """Test a worker reloads when another process bumps the version."""
+        make_plan()
+        snapshot = PlanCatalog.get()
+        # Another worker changes the plan; this process only sees the version
+        Plan.objects.filter(pk='starter').update(name='Renamed')
+        PlanCatalog._snapshot = snapshot
+        monkeypatch.setattr(PlanCatalog, 'VERSION_CHECK_INTERVAL', 0)
+
+        assert PlanCatalog.get_plan('starter').name == 'Renamed'
+
+    def test_bulk_update_invalidates(self):
+        """Test a queryset update, as used by admin bulk actions, reloads the catalog."""
+        plan = make_plan()
+        before = PlanCatalog.get()
+
+        Plan.objects.filter(pk=plan.pk).update(is_active=False)
+
+        assert PlanCatalog.get_plan('starter') is None
+        assert PlanCatalog.get().last_modified > before.last_modified
+
+    def test_seed_plans_bumps_version(self):
+        version = cache.get(PlanCatalog.VERSION_KEY, 0)
+
+        call_command('seed_plans', stdout=StringIO())
+
+        assert cache.get(PlanCatalog.VERSION_KEY) > version
+        assert PlanCatalog.get_plan('starter') is not None
+
+
+@pytest.mark.django_db
+class TestPlanListView:
+    """Tests for the pre-rendered plan list."""
+
+    def test_warm_plan_list_queries_no_plans(self, api_client, django_assert_num_queries):
+        make_plan()
+        api_client.get(reverse('plan-list'))
+
+        with django_assert_num_queries(0):
+            response = api_client.get(reverse('plan-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [plan['id'] for plan in response.json()] == ['starter']
+
+    def test_caching_headers(self, api_client, settings):
+        settings.PLAN_LIST_MAX_AGE = 120
+        plan = make_plan()
+
+        response = api_client.get(reverse('plan-list'))
+
+        assert response['Content-Type'] == 'application/json'
+        assert response['ETag'].startswith('"') and not response['ETag'].startswith('W/')
+        assert response['Last-Modified'] == http_date(int(Plan.objects.get(pk=plan.pk).updated_at.timestamp()))
+        assert 'public' in response['Cache-Control']
+        assert 'max-age=120' in response['Cache-Control']
+
+    def test_matching_etag_gets_304(self, api_client):
+        make_plan()
+        etag = api_client.get(reverse('plan-list'))['ETag']
+
+        response = api_client.get(reverse('plan-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+        assert response['ETag'] == etag
+
+    def test_unchanged_since_gets_304(self, api_client):
+        make_plan()
+        last_modified = api_client.get(reverse('plan-list'))['Last-Modified']
+
+        response = api_client.get(reverse('plan-list'), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_plan_change_changes_etag(self, api_client):
+        """Test a stale ETag gets the new plan list once a plan changes."""
+        plan = make_plan()
+        etag = api_client.get(reverse('plan-list'))['ETag']
+
+        plan.name = 'Starter 2'
+        plan.save()
+        response = api_client.get(reverse('plan-list'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.json()[0]['name'] == 'Starter 2'
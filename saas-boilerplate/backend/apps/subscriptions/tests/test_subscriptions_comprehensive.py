@@ -94,9 +94,9 @@ class TestPlanList:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 2
+        assert len(response.json()) == 2
 
-        plan_ids = [p['id'] for p in response.data]
+        plan_ids = [p['id'] for p in response.json()]
         assert 'starter' in plan_ids
         assert 'pro' in plan_ids
 
@@ -117,7 +117,7 @@ class TestPlanList:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        plan_ids = [p['id'] for p in response.data]
+        plan_ids = [p['id'] for p in response.json()]
         assert 'inactive' not in plan_ids
 
     def test_list_plans_ordered_by_display_order(self, api_client):
@@ -154,7 +154,7 @@ class TestPlanList:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        plan_ids = [p['id'] for p in response.data]
+        plan_ids = [p['id'] for p in response.json()]
         assert plan_ids == ['plan1', 'plan2', 'plan3']
 
     def test_list_plans_requires_no_authentication(self, api_client, plan):
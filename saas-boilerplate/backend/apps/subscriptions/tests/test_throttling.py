@@ -0,0 +1,219 @@
+"""
+Tests for per-organization API quotas.
+"""
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.accounts.tests.factories import UserFactory
+from apps.organizations.tests.factories import MembershipFactory, OrganizationFactory
+from apps.organizations.tenancy import OrganizationCache
+from apps.subscriptions.models import Plan, Subscription
+from apps.subscriptions.quotas import ApiQuota, PlanLimitsCache, quota_from_limits
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    PlanLimitsCache.clear_local()
+    OrganizationCache.clear_local()
+    yield
+    PlanLimitsCache.clear_local()
+    OrganizationCache.clear_local()
+
+
+def make_plan(plan_id='starter', **limits):
+    return Plan.objects.create(
+        id=plan_id,
+        name=plan_id.title(),
+        stripe_price_id_monthly=f'price_{plan_id}_monthly',
+        stripe_price_id_yearly=f'price_{plan_id}_yearly',
+        price_monthly=10,
+        price_yearly=100,
+        limits=limits,
+    )
+
+
+def subscribe(organization, plan, status='active'):
+    now = timezone.now()
+    return Subscription.objects.create(
+        organization=organization,
+        plan=plan,
+        stripe_price_id=plan.stripe_price_id_monthly,
+        billing_cycle='monthly',
+        current_period_start=now,
+        current_period_end=now + timedelta(days=30),
+        status=status,
+    )
+
+
+class TestQuotaFromLimits:
+    """Tests for quota_from_limits."""
+
+    def test_plan_limits(self):
+        assert quota_from_limits({'api_requests_per_minute': 600, 'api_burst': 50}) == ApiQuota(10, 50)
+
+    def test_burst_defaults(self, settings):
+        settings.API_QUOTA_DEFAULT_LIMITS = {'api_requests_per_minute': 60}
+
+        assert quota_from_limits({'api_requests_per_minute': 120}) == ApiQuota(2, 120)
+
+    def test_missing_limits_use_defaults(self, settings):
+        settings.API_QUOTA_DEFAULT_LIMITS = {'api_requests_per_minute': 60, 'api_burst': 5}
+
+        assert quota_from_limits({'users': 5}) == ApiQuota(1, 5)
+
+    def test_null_rate_is_unlimited(self):
+        assert quota_from_limits({'api_requests_per_minute': None}) is None
+
+
+@pytest.mark.django_db
+class TestPlanLimitsCache:
+    """Tests for PlanLimitsCache."""
+
+    def test_quota_from_subscription_plan(self):
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=600, api_burst=50))
+
+        assert PlanLimitsCache.get_quota(org.pk) == ApiQuota(10, 50)
+
+    def test_default_quota_without_subscription(self, settings):
+        settings.API_QUOTA_DEFAULT_LIMITS = {'api_requests_per_minute': 60, 'api_burst': 5}
+        org = OrganizationFactory()
+
+        assert PlanLimitsCache.get_quota(org.pk) == ApiQuota(1, 5)
+
+    def test_canceled_subscription_gets_default_quota(self, settings):
+        settings.API_QUOTA_DEFAULT_LIMITS = {'api_requests_per_minute': 60, 'api_burst': 5}
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=600), status='canceled')
+
+        assert PlanLimitsCache.get_quota(org.pk) == ApiQuota(1, 5)
+
+    def test_cached_lookup_makes_no_queries(self, django_assert_num_queries):
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=600))
+        PlanLimitsCache.get_quota(org.pk)
+
+        with django_assert_num_queries(0):
+            PlanLimitsCache.get_quota(org.pk)
+
+    def test_subscription_change_invalidates(self):
+        org = OrganizationFactory()
+        subscription = subscribe(org, make_plan(api_requests_per_minute=60, api_burst=5))
+        PlanLimitsCache.get_quota(org.pk)
+
+        subscription.plan = make_plan('pro', api_requests_per_minute=600, api_burst=50)
+        subscription.save()
+
+        assert PlanLimitsCache.get_quota(org.pk) == ApiQuota(10, 50)
+
+    def test_plan_change_invalidates(self):
+        org = OrganizationFactory()
+        plan = make_plan(api_requests_per_minute=60, api_burst=5)
+        subscribe(org, plan)
+        PlanLimitsCache.get_quota(org.pk)
+
+        plan.limits = {'api_requests_per_minute': 120, 'api_burst': 10}
+        plan.save()
+
+        assert PlanLimitsCache.get_quota(org.pk) == ApiQuota(2, 10)
+
+
+@pytest.mark.django_db
+class TestOrganizationRateThrottle:
+    """Tests for OrganizationRateThrottle."""
+
+    def get(self, client, organization):
+        return client.get(reverse('plan-list'), HTTP_X_ORGANIZATION=organization.slug)
+
+    def member_client(self, organization):
+        client = APIClient()
+        client.force_authenticate(user=MembershipFactory(organization=organization).user)
+        return client
+
+    def test_burst_then_throttled(self):
+        """Test an organization gets its burst and is then throttled."""
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=60, api_burst=3))
+        client = self.member_client(org)
+
+        responses = [self.get(client, org) for _ in range(4)]
+
+        assert [r.status_code for r in responses[:3]] == [status.HTTP_200_OK] * 3
+        assert responses[2]['X-RateLimit-Limit'] == '3'
+        assert responses[2]['X-RateLimit-Remaining'] == '0'
+        assert responses[3].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(responses[3]['Retry-After']) >= 1
+
+    def test_members_share_the_organization_bucket(self):
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=60, api_burst=2))
+        first, second = self.member_client(org), self.member_client(org)
+
+        self.get(first, org)
+        self.get(first, org)
+
+        assert self.get(second, org).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_tenants_have_separate_buckets(self):
+        """Test a noisy organization does not use up another one's quota."""
+        plan = make_plan(api_requests_per_minute=60, api_burst=2)
+        noisy, quiet = OrganizationFactory(), OrganizationFactory()
+        subscribe(noisy, plan)
+        subscribe(quiet, plan)
+        noisy_client = self.member_client(noisy)
+
+        for _ in range(5):
+            self.get(noisy_client, noisy)
+
+        assert self.get(noisy_client, noisy).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert self.get(self.member_client(quiet), quiet).status_code == status.HTTP_200_OK
+
+    def test_non_member_cannot_drain_organization_bucket(self, api_client):
+        """Test naming another tenant charges the caller's own bucket, not the tenant's."""
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=60, api_burst=2))
+        outsider = APIClient()
+        outsider.force_authenticate(user=UserFactory())
+
+        for client in (api_client, outsider):
+            for _ in range(5):
+                self.get(client, org)
+
+        assert self.get(self.member_client(org), org).status_code == status.HTTP_200_OK
+
+    def test_warm_tenant_request_makes_no_queries(self, django_assert_num_queries):
+        """Test the membership check and quota come from the caches once warm."""
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=600, api_burst=50))
+        client = self.member_client(org)
+        self.get(client, org)
+
+        with django_assert_num_queries(0):
+            response = self.get(client, org)
+
+        assert response['X-RateLimit-Limit'] == '50'
+
+    def test_unlimited_plan(self):
+        org = OrganizationFactory()
+        subscribe(org, make_plan(api_requests_per_minute=None))
+        client = self.member_client(org)
+
+        for _ in range(10):
+            response = self.get(client, org)
+            assert response.status_code == status.HTTP_200_OK
+            assert 'X-RateLimit-Limit' not in response
+
+    def test_requests_without_organization_get_default_quota(self, api_client, settings):
+        """Test requests outside a tenant are limited per client address."""
+        settings.API_QUOTA_DEFAULT_LIMITS = {'api_requests_per_minute': 1, 'api_burst': 2}
+
+        responses = [api_client.get(reverse('plan-list')) for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [
+            status.HTTP_200_OK,
+            status.HTTP_200_OK,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ]
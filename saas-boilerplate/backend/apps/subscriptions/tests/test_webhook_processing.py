@@ -0,0 +1,363 @@
+"""
+Tests for asynchronous Stripe webhook ingestion and processing.
+"""
+import json
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from apps.subscriptions.models import StripeEvent
+from apps.subscriptions.services import receive_event
+from apps.subscriptions.tasks import (
+    enqueue_pending_stripe_events,
+    process_stripe_event,
+    subscription_lock_key,
+)
+
+
+def make_event(event_id, event_type='customer.subscription.updated', subscription_id='sub_123', created=1700000000):
+    data_object = {'id': subscription_id} if event_type.startswith('customer.subscription.') else {
+        'id': 'in_123',
+        'subscription': subscription_id,
+    }
+    return {
+        'id': event_id,
+        'type': event_type,
+        'created': created,
+        'data': {'object': data_object},
+    }
+
+
+@pytest.mark.django_db
+class TestAsyncIngestion:
+    """Tests for the webhook view in asynchronous mode."""
+
+    @pytest.fixture(autouse=True)
+    def async_mode(self, settings):
+        settings.STRIPE_WEBHOOK_ASYNC = True
+
+    def post(self, client, event):
+        with patch('stripe.Webhook.construct_event', return_value=event):
+            return client.post(
+                reverse('stripe-webhook'),
+                data=json.dumps({'id': event['id']}),
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE='sig',
+            )
+
+    def test_stores_event_and_acknowledges(self, client, django_capture_on_commit_callbacks, settings):
+        """Test the view only stores the event and queues it after the coalescing window."""
+        settings.STRIPE_WEBHOOK_COALESCE_SECONDS = 3
+        event = make_event('evt_async')
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch, \
+                patch('apps.subscriptions.tasks.process_stripe_event.apply_async') as mock_apply:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = self.post(client, event)
+
+        assert response.status_code == 200
+        mock_dispatch.assert_not_called()
+        mock_apply.assert_called_once_with(args=['evt_async'], countdown=3)
+        stored = StripeEvent.objects.get(event_id='evt_async')
+        assert stored.status == StripeEvent.STATUS_RECEIVED
+        assert stored.stripe_subscription_id == 'sub_123'
+
+    def test_broker_failure_still_acknowledges(self, client, django_capture_on_commit_callbacks):
+        """Test a broker outage leaves the event for the sweeper instead of failing Stripe."""
+        with patch('apps.subscriptions.tasks.process_stripe_event.apply_async', side_effect=ConnectionError):
+            with django_capture_on_commit_callbacks(execute=True):
+                response = self.post(client, make_event('evt_broker_down'))
+
+        assert response.status_code == 200
+        assert StripeEvent.objects.get(event_id='evt_broker_down').status == StripeEvent.STATUS_RECEIVED
+
+
+@pytest.mark.django_db
+class TestReceiveEvent:
+    """Tests for receive_event."""
+
+    def test_subscription_event(self):
+        assert receive_event(make_event('evt_1', created=1700000000)) is True
+
+        stored = StripeEvent.objects.get(event_id='evt_1')
+        assert stored.status == StripeEvent.STATUS_RECEIVED
+        assert stored.stripe_subscription_id == 'sub_123'
+        assert stored.stripe_created.timestamp() == 1700000000
+
+    def test_invoice_event(self):
+        receive_event(make_event('evt_2', event_type='invoice.paid', subscription_id='sub_456'))
+
+        assert StripeEvent.objects.get(event_id='evt_2').stripe_subscription_id == 'sub_456'
+
+    def test_event_without_subscription(self):
+        receive_event({'id': 'evt_3', 'type': 'customer.created', 'data': {'object': {'id': 'cus_1'}}})
+
+        assert StripeEvent.objects.get(event_id='evt_3').stripe_subscription_id == ''
+
+    def test_redelivery_does_not_overwrite(self):
+        """Test a redelivered event leaves the stored row untouched."""
+        receive_event(make_event('evt_4'))
+        StripeEvent.objects.filter(event_id='evt_4').update(status=StripeEvent.STATUS_PROCESSED)
+
+        assert receive_event(make_event('evt_4')) is False
+        assert StripeEvent.objects.get(event_id='evt_4').status == StripeEvent.STATUS_PROCESSED
+        assert StripeEvent.objects.filter(event_id='evt_4').count() == 1
+
+
+@pytest.mark.django_db
+class TestClaim:
+    """Tests for StripeEvent.claim."""
+
+    def test_claim_is_exclusive(self):
+        """Test only the first of two workers gets the event."""
+        receive_event(make_event('evt_claim'))
+
+        first = StripeEvent.claim('evt_claim')
+        second = StripeEvent.claim('evt_claim')
+
+        assert first.status == StripeEvent.STATUS_PROCESSING
+        assert first.attempts == 1
+        assert first.locked_until > timezone.now()
+        assert second is None
+
+    def test_expired_lease_can_be_reclaimed(self):
+        """Test an event abandoned by a crashed worker is picked up again."""
+        receive_event(make_event('evt_crashed'))
+        StripeEvent.claim('evt_crashed')
+        StripeEvent.objects.filter(event_id='evt_crashed').update(
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+
+        reclaimed = StripeEvent.claim('evt_crashed')
+
+        assert reclaimed is not None
+        assert reclaimed.attempts == 2
+
+    def test_processed_event_cannot_be_claimed(self):
+        receive_event(make_event('evt_processed'))
+        StripeEvent.objects.filter(event_id='evt_processed').update(status=StripeEvent.STATUS_PROCESSED)
+
+        assert StripeEvent.claim('evt_processed') is None
+
+
+@pytest.mark.django_db
+class TestSyncIngestion:
+    """Tests for the webhook view processing events inline."""
+
+    def post(self, client, event):
+        with patch('stripe.Webhook.construct_event', return_value=event):
+            return client.post(
+                reverse('stripe-webhook'),
+                data=json.dumps({'id': event['id']}),
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE='sig',
+            )
+
+    def test_redelivery_is_processed_once(self, client):
+        """Test Stripe retrying a delivered event does not apply it twice."""
+        event = make_event('evt_twice')
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            first = self.post(client, event)
+            second = self.post(client, event)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        mock_dispatch.assert_called_once()
+        stored = StripeEvent.objects.get(event_id='evt_twice')
+        assert stored.status == StripeEvent.STATUS_PROCESSED
+        assert stored.locked_until is None
+
+    def test_event_claimed_elsewhere_is_acknowledged(self, client):
+        """Test a delivery racing a worker that holds the event returns at once."""
+        event = make_event('evt_busy')
+        receive_event(event)
+        StripeEvent.claim('evt_busy')
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            response = self.post(client, event)
+
+        assert response.status_code == 200
+        mock_dispatch.assert_not_called()
+
+
+@pytest.mark.django_db
+class TestProcessStripeEvent:
+    """Tests for the process_stripe_event task."""
+
+    def test_processes_subscription_events_in_created_order(self):
+        """Test a subscription's pending events are applied oldest first."""
+        receive_event(make_event('evt_late', created=1700000300))
+        receive_event(make_event('evt_early', event_type='invoice.paid', created=1700000100))
+        receive_event(make_event('evt_other', subscription_id='sub_other', created=1700000000))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            process_stripe_event('evt_late')
+
+        assert [call.args[0]['id'] for call in mock_dispatch.call_args_list] == ['evt_early', 'evt_late']
+        assert set(
+            StripeEvent.objects.filter(status=StripeEvent.STATUS_PROCESSED).values_list('event_id', flat=True)
+        ) == {'evt_early', 'evt_late'}
+        assert not cache.get(subscription_lock_key('sub_123'))
+
+    def test_skips_processed_event(self):
+        receive_event(make_event('evt_done'))
+        StripeEvent.objects.filter(event_id='evt_done').update(status=StripeEvent.STATUS_PROCESSED)
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            process_stripe_event('evt_done')
+
+        mock_dispatch.assert_not_called()
+
+    def test_waits_for_subscription_lock(self):
+        """Test a second worker backs off while the subscription is being processed."""
+        receive_event(make_event('evt_locked'))
+        cache.add(subscription_lock_key('sub_123'), 'evt_other')
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            with pytest.raises(Retry):
+                process_stripe_event('evt_locked')
+
+        mock_dispatch.assert_not_called()
+
+    def test_failure_is_recorded_and_retried(self):
+        """Test a failing event is marked failed and stops later events."""
+        receive_event(make_event('evt_bad', event_type='invoice.paid', created=1700000100))
+        receive_event(make_event('evt_next', created=1700000200))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event', side_effect=[ValueError('boom')]) as mock_dispatch:
+            with pytest.raises(ValueError):
+                process_stripe_event('evt_next')
+
+        assert mock_dispatch.call_count == 1
+        bad = StripeEvent.objects.get(event_id='evt_bad')
+        assert bad.status == StripeEvent.STATUS_FAILED
+        assert bad.attempts == 1
+        assert bad.message == 'boom'
+        assert bad.locked_until > timezone.now()
+        assert StripeEvent.objects.get(event_id='evt_next').status == StripeEvent.STATUS_RECEIVED
+        assert not cache.get(subscription_lock_key('sub_123'))
+
+    def test_exhausted_event_does_not_block_subscription(self, settings):
+        """Test an event past its attempts is skipped so later events proceed."""
+        settings.STRIPE_WEBHOOK_MAX_ATTEMPTS = 1
+        receive_event(make_event('evt_bad', event_type='invoice.paid', created=1700000100))
+        receive_event(make_event('evt_next', created=1700000200))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event', side_effect=[ValueError('boom'), None]):
+            process_stripe_event('evt_next')
+
+        assert StripeEvent.objects.get(event_id='evt_bad').status == StripeEvent.STATUS_FAILED
+        assert StripeEvent.objects.get(event_id='evt_next').status == StripeEvent.STATUS_PROCESSED
+
+
+@pytest.mark.django_db
+class TestCoalescing:
+    """Tests for coalescing bursts of subscription events."""
+
+    def test_burst_applies_only_latest_snapshot(self):
+        """Test a plan-change storm results in a single subscription sync."""
+        for index, created in enumerate([1700000100, 1700000300, 1700000200]):
+            receive_event(make_event(f'evt_{index}', created=created))
+
+        with patch('apps.subscriptions.webhooks.sync_subscription_from_stripe') as mock_sync:
+            process_stripe_event('evt_0')
+
+        mock_sync.assert_called_once()
+        assert StripeEvent.objects.get(event_id='evt_1').status == StripeEvent.STATUS_PROCESSED
+        for event_id in ('evt_0', 'evt_2'):
+            superseded = StripeEvent.objects.get(event_id=event_id)
+            assert superseded.status == StripeEvent.STATUS_SUPERSEDED
+            assert superseded.message == 'Superseded by evt_1'
+
+    def test_other_event_types_are_not_coalesced(self):
+        """Test events that are not subscription snapshots are still applied."""
+        receive_event(make_event('evt_update', created=1700000100))
+        receive_event(make_event('evt_paid', event_type='invoice.paid', created=1700000200))
+        receive_event(make_event('evt_update_2', created=1700000300))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            process_stripe_event('evt_update')
+
+        assert [call.args[0]['id'] for call in mock_dispatch.call_args_list] == ['evt_paid', 'evt_update_2']
+
+    def test_out_of_order_snapshot_is_discarded(self):
+        """Test an event older than the applied state does not roll it back."""
+        receive_event(make_event('evt_new', created=1700000300))
+        with patch('apps.subscriptions.webhooks._dispatch_event'):
+            process_stripe_event('evt_new')
+        receive_event(make_event('evt_old', created=1700000100))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            process_stripe_event('evt_old')
+
+        mock_dispatch.assert_not_called()
+        old = StripeEvent.objects.get(event_id='evt_old')
+        assert old.status == StripeEvent.STATUS_SUPERSEDED
+        assert old.message == 'Superseded by evt_new'
+
+    def test_snapshots_of_other_subscriptions_are_kept(self):
+        receive_event(make_event('evt_a', subscription_id='sub_a', created=1700000300))
+        with patch('apps.subscriptions.webhooks._dispatch_event'):
+            process_stripe_event('evt_a')
+        receive_event(make_event('evt_b', subscription_id='sub_b', created=1700000100))
+
+        with patch('apps.subscriptions.webhooks._dispatch_event') as mock_dispatch:
+            process_stripe_event('evt_b')
+
+        mock_dispatch.assert_called_once()
+
+
+@pytest.mark.django_db
+class TestEnqueuePendingStripeEvents:
+    """Tests for the enqueue_pending_stripe_events sweeper."""
+
+    def test_requeues_stale_received_events(self):
+        receive_event(make_event('evt_stale'))
+        StripeEvent.objects.filter(event_id='evt_stale').update(processed_at=timezone.now() - timedelta(minutes=10))
+        receive_event(make_event('evt_fresh'))
+
+        with patch('apps.subscriptions.tasks.process_stripe_event.delay') as mock_delay:
+            enqueue_pending_stripe_events(older_than_minutes=5)
+
+        mock_delay.assert_called_once_with('evt_stale')
+
+    def test_requeues_expired_leases(self):
+        receive_event(make_event('evt_held'))
+        receive_event(make_event('evt_abandoned'))
+        StripeEvent.objects.filter(event_id__in=['evt_held', 'evt_abandoned']).update(
+            processed_at=timezone.now() - timedelta(minutes=10),
+            status=StripeEvent.STATUS_PROCESSING,
+            locked_until=timezone.now() + timedelta(minutes=1),
+        )
+        StripeEvent.objects.filter(event_id='evt_abandoned').update(
+            locked_until=timezone.now() - timedelta(minutes=1),
+        )
+
+        with patch('apps.subscriptions.tasks.process_stripe_event.delay') as mock_delay:
+            enqueue_pending_stripe_events(older_than_minutes=5)
+
+        mock_delay.assert_called_once_with('evt_abandoned')
+
+    def test_requeues_failed_events_once_backoff_passes(self, settings):
+        """Test a failed event whose Celery retry was lost is not stranded."""
+        settings.STRIPE_WEBHOOK_MAX_ATTEMPTS = 3
+        for event_id in ('evt_due', 'evt_backing_off', 'evt_exhausted'):
+            receive_event(make_event(event_id))
+        StripeEvent.objects.update(
+            status=StripeEvent.STATUS_FAILED,
+            attempts=1,
+            locked_until=timezone.now() - timedelta(minutes=1),
+        )
+        StripeEvent.objects.filter(event_id='evt_backing_off').update(
+            locked_until=timezone.now() + timedelta(minutes=1),
+        )
+        StripeEvent.objects.filter(event_id='evt_exhausted').update(attempts=3)
+
+        with patch('apps.subscriptions.tasks.process_stripe_event.delay') as mock_delay:
+            enqueue_pending_stripe_events(older_than_minutes=5)
+
+        mock_delay.assert_called_once_with('evt_due')
@@ -0,0 +1,48 @@
+"""
+Per-organization API throttling.
+"""
+import math
+from rest_framework.throttling import BaseThrottle
+from apps.core.ratelimit import TokenBucket, record
+from apps.organizations.membership import get_tenant
+from .quotas import PlanLimitsCache, quota_from_limits
+
+
+class OrganizationRateThrottle(BaseThrottle):
+    """
+    Token-bucket throttle per organization, sized by its plan's limits.
+
+    The organization is the tenant TenantMiddleware resolved for the
+    request, and only counts when the caller is an active member of it, so
+    nobody can spend another tenant's quota by naming it. Every other
+    request gets the default quota, keyed by user or client address. Every
+    organization has its own bucket, so a noisy tenant drains only its own
+    tokens and cannot starve the others. The quota comes from
+    ``PlanLimitsCache`` and the bucket is updated with one atomic script, so
+    the throttle adds no database query once the caller's roles are cached.
+    """
+
+    scope = 'organization'
+
+    def allow_request(self, request, view):
+        organization = get_tenant(request)
+        if organization is not None:
+            quota = PlanLimitsCache.get_quota(organization.pk)
+            identity = f'org:{organization.pk}'
+        else:
+            quota = quota_from_limits({})
+            identity = self.get_identity(request)
+        if quota is None:
+            return True
+
+        self.result = TokenBucket(self.scope, quota.rate, quota.burst).hit(identity)
+        record(request, self.result)
+        return self.result.allowed
+
+    def get_identity(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return math.ceil(self.result.retry_after)
@@ -1,34 +1,66 @@
 from rest_framework import views, status, permissions
 from rest_framework.response import Response
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from .models import Subscription, Plan
 from .serializers import (
     SubscriptionSerializer,
-    PlanSerializer,
     CheckoutSessionRequestSerializer,
     BillingPortalRequestSerializer,
 )
+from .catalog import PlanCatalog
 from .services import create_checkout_session, create_billing_portal_session
-from apps.organizations.models import Organization, Membership
+from apps.organizations.models import Membership
+from apps.organizations.membership import get_membership
+
+def _get_member_organization(request, org_slug):
+    """Return the organization the requesting user is an active member of, or 404."""
+    membership = get_membership(request, org_slug)
+    if not membership:
+        raise Http404
+    return membership.organization
+
 
 class PlanListView(views.APIView):
+    """
+    Public plan list, served as the JSON pre-rendered by the plan catalog.
+
+    Responses carry a strong ETag and Last-Modified so clients and proxies
+    can revalidate, and conditional requests that match get a 304.
+    """
+
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        plans = Plan.objects.filter(is_active=True).order_by('display_order')
-        serializer = PlanSerializer(plans, many=True)
-        return Response(serializer.data)
+        snapshot = PlanCatalog.get()
+        response = HttpResponse(snapshot.rendered, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        if snapshot.last_modified:
+            response['Last-Modified'] = http_date(snapshot.last_modified.timestamp())
+        patch_cache_control(response, public=True, max_age=settings.PLAN_LIST_MAX_AGE)
+
+        last_modified = int(snapshot.last_modified.timestamp()) if snapshot.last_modified else None
+        not_modified = get_conditional_response(
+            request,
+            etag=snapshot.etag,
+            last_modified=last_modified,
+            response=response,
+        )
+        return not_modified or response
 
 class SubscriptionView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        org_slug = request.query_params.get('organization')
+        org_slug = request.query_params.get('organization') or getattr(request.requested_organization, 'slug', None)
         if not org_slug:
             return Response({"detail": "Organization slug required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        org = get_object_or_404(Organization, slug=org_slug, memberships__user=request.user)
-        
+        org = _get_member_organization(request, org_slug)
+
         try:
             subscription = org.subscription
             serializer = SubscriptionSerializer(subscription)
@@ -50,13 +82,8 @@ class CreateCheckoutSessionView(views.APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        org = get_object_or_404(
-            Organization,
-            slug=data['organization'],
-            memberships__user=request.user,
-        )
-        membership = org.memberships.filter(user=request.user).first()
-        if membership and membership.role != Membership.ROLE_OWNER:
+        org = _get_member_organization(request, data['organization'])
+        if get_membership(request, org).role != Membership.ROLE_OWNER:
             return Response({"detail": "Only organization owners can manage billing."}, status=status.HTTP_403_FORBIDDEN)
         plan = get_object_or_404(Plan, id=data['plan_id'], is_active=True)
 
@@ -90,13 +117,8 @@ class CreateBillingPortalView(views.APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        org = get_object_or_404(
-            Organization,
-            slug=data['organization'],
-            memberships__user=request.user,
-        )
-        membership = org.memberships.filter(user=request.user).first()
-        if membership and membership.role != Membership.ROLE_OWNER:
+        org = _get_member_organization(request, data['organization'])
+        if get_membership(request, org).role != Membership.ROLE_OWNER:
             return Response({"detail": "Only organization owners can manage billing."}, status=status.HTTP_403_FORBIDDEN)
 
         if not org.stripe_customer_id:
@@ -1,7 +1,9 @@
 import json
 import logging
+from typing import Optional
 
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
@@ -9,7 +11,7 @@ from django.views.decorators.http import require_POST
 from .models import StripeEvent
 from .services import (
     _get_stripe_client,
-    record_event,
+    receive_event,
     sync_subscription_from_stripe,
 )
 
@@ -26,6 +28,11 @@ logger = logging.getLogger(__name__)
 def stripe_webhook(request):
     """
     Handle Stripe webhooks with signature verification and idempotency.
+
+    The verified event is stored as ``received``. With STRIPE_WEBHOOK_ASYNC
+    it is then queued for the ``process_stripe_event`` task and Stripe gets
+    its 200 right away, however long processing takes; otherwise it is
+    processed inline and a failure returns 500 so Stripe redelivers it.
     """
     stripe = _get_stripe_client(require_api_key=False)
     payload = request.body
@@ -41,31 +48,113 @@ def stripe_webhook(request):
         return HttpResponse(status=400)
 
     event_id = event.get('id')
-    event_type = event.get('type')
 
     if not event_id:
         logger.warning("Stripe webhook: missing event id")
         return HttpResponse(status=400)
 
-    # Idempotency: skip events already processed
-    if StripeEvent.objects.filter(event_id=event_id, status='processed').exists():
+    # Idempotency: a redelivered event is never stored twice, and only the
+    # worker that claims an event processes it
+    created = receive_event(event)
+
+    if settings.STRIPE_WEBHOOK_ASYNC:
+        if created:
+            transaction.on_commit(lambda: _enqueue_event(event_id))
+        return HttpResponse(status=200)
+
+    stripe_event = StripeEvent.claim(event_id)
+    if stripe_event is None:
+        # Already processed, or being processed by another request
         return HttpResponse(status=200)
 
     try:
-        _dispatch_event(event)
-        record_event(event, status='processed')
+        process_event(stripe_event)
+    except Exception:  # noqa: BLE001 - already logged and recorded
+        return HttpResponse(status=500)
+
+    return HttpResponse(status=200)
+
+
+def _enqueue_event(event_id: str) -> None:
+    from .tasks import process_stripe_event
+
+    try:
+        # Wait out the coalescing window so a burst of events about one
+        # subscription is drained, and coalesced, by a single task
+        process_stripe_event.apply_async(args=[event_id], countdown=settings.STRIPE_WEBHOOK_COALESCE_SECONDS)
+    except Exception as exc:  # noqa: BLE001 - the sweeper re-queues it
+        logger.warning("Stripe webhook: could not queue event %s: %s", event_id, exc)
+
+
+def process_event(stripe_event: StripeEvent) -> None:
+    """
+    Dispatch a claimed event to its handler and record the outcome.
+
+    A subscription snapshot older than one already applied is discarded.
+
+    The handler's exception is re-raised after the failure is recorded so
+    callers can retry.
+    """
+    applied = _latest_applied_snapshot(stripe_event)
+    if applied is not None:
+        # Stripe delivered an older state after a newer one was applied
+        logger.info("Stripe webhook: %s is older than applied %s; discarding", stripe_event.event_id, applied)
+        supersede_event(stripe_event, applied)
+        return
+
+    try:
+        _dispatch_event(stripe_event.payload)
     except Exception as exc:  # noqa: BLE001 - want to log any failure
         logger.exception("Stripe webhook processing failed: %s", exc)
-        print(f"WEBHOOK EXCEPTION: {exc}")
-        record_event(event, status='failed', message=str(exc))
+        stripe_event.status = StripeEvent.STATUS_FAILED
+        stripe_event.message = str(exc)[:255]
+        stripe_event.locked_until = None
+        stripe_event.save(update_fields=['status', 'message', 'locked_until'])
         if sentry_sdk:
             with sentry_sdk.isolation_scope() as scope:
-                scope.set_tag("stripe_event_id", event_id)
-                scope.set_tag("stripe_event_type", event_type)
+                scope.set_tag("stripe_event_id", stripe_event.event_id)
+                scope.set_tag("stripe_event_type", stripe_event.type)
                 sentry_sdk.capture_exception(exc)
-        return HttpResponse(status=500)
+        raise
 
-    return HttpResponse(status=200)
+    stripe_event.status = StripeEvent.STATUS_PROCESSED
+    stripe_event.message = ''
+    stripe_event.locked_until = None
+    stripe_event.save(update_fields=['status', 'message', 'locked_until'])
+
+
+def supersede_event(stripe_event: StripeEvent, by_event_id: str) -> None:
+    """
+    Record that a newer snapshot of the subscription makes an event redundant.
+    """
+    stripe_event.status = StripeEvent.STATUS_SUPERSEDED
+    stripe_event.message = f"Superseded by {by_event_id}"
+    stripe_event.locked_until = None
+    stripe_event.save(update_fields=['status', 'message', 'locked_until'])
+
+
+def _latest_applied_snapshot(stripe_event: StripeEvent) -> Optional[str]:
+    """
+    Return the id of an applied snapshot newer than the event, if the event
+    is a snapshot.
+    """
+    if (
+        stripe_event.type not in StripeEvent.SNAPSHOT_TYPES
+        or not stripe_event.stripe_subscription_id
+        or stripe_event.stripe_created is None
+    ):
+        return None
+    return (
+        StripeEvent.objects
+        .filter(
+            stripe_subscription_id=stripe_event.stripe_subscription_id,
+            stripe_created__gt=stripe_event.stripe_created,
+            type__in=StripeEvent.SNAPSHOT_TYPES,
+            status=StripeEvent.STATUS_PROCESSED,
+        )
+        .values_list('event_id', flat=True)
+        .first()
+    )
 
 
 def _dispatch_event(event: dict) -> None:
@@ -3,6 +3,7 @@ import environ
 import os
 import sys
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +34,14 @@ FIELD_ENCRYPTION_KEY = env('FIELD_ENCRYPTION_KEY', default=None)
 if TESTING and not FIELD_ENCRYPTION_KEY:
     FIELD_ENCRYPTION_KEY = 'VlxeRplHGOCApdZsfhfjKtpDkA6CrBdgnO3MPC7rDfk='
 
+# Server-side secret mixed into backup code HMACs, kept apart from SECRET_KEY
+# so rotating one does not invalidate the other. Only local development and
+# tests fall back to SECRET_KEY; everywhere else it must be set explicitly
+if DEBUG or TESTING:
+    BACKUP_CODE_PEPPER = env('BACKUP_CODE_PEPPER', default=SECRET_KEY)
+else:
+    BACKUP_CODE_PEPPER = env('BACKUP_CODE_PEPPER')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -77,7 +86,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
-    'apps.core.middleware.TenantMiddleware', # Custom tenant middleware
+    'apps.organizations.middleware.TenantMiddleware', # Custom tenant middleware
+    'apps.core.middleware.security.RateLimitHeadersMiddleware',
+    'apps.core.middleware.admission.AdmissionControlMiddleware',
 ]
 
 # Additional Security Middleware for Production
@@ -148,12 +159,21 @@ if TESTING:
     ]
 else:
     PASSWORD_HASHERS = [
-        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'apps.core.hashers.AdmissionControlledArgon2PasswordHasher',
         'django.contrib.auth.hashers.PBKDF2PasswordHasher',
         'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
         'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
     ]
 
+# Admission control for Argon2 work (apps.core.admission): at most
+# PASSWORD_HASH_CONCURRENCY hashes run at once across the workers of each
+# host (size it to the host's cores, not the fleet), keeping the rest free
+# for cheap requests; callers wait up to PASSWORD_HASH_QUEUE_TIMEOUT seconds
+# for a slot before getting a 503
+PASSWORD_HASH_CONCURRENCY = env.int('PASSWORD_HASH_CONCURRENCY', default=2)
+PASSWORD_HASH_QUEUE_TIMEOUT = env.float('PASSWORD_HASH_QUEUE_TIMEOUT', default=0.5)
+PASSWORD_HASH_SLOT_TIMEOUT = env.int('PASSWORD_HASH_SLOT_TIMEOUT', default=10)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -245,6 +265,9 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
         'rest_framework.filters.SearchFilter',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'apps.subscriptions.throttling.OrganizationRateThrottle',
+    ),
     'EXCEPTION_HANDLER': 'apps.core.exceptions.custom_exception_handler',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -268,6 +291,11 @@ else:
         pass # Warning: CORS_ALLOWED_ORIGINS is empty
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'x-organization')
+
+# Multi-tenancy: resolve the organization from <slug>.TENANT_BASE_DOMAIN
+TENANT_BASE_DOMAIN = env('TENANT_BASE_DOMAIN', default='')
+TENANT_RESERVED_SUBDOMAINS = env.list('TENANT_RESERVED_SUBDOMAINS', default=['www', 'api', 'app'])
 
 # Redis
 REDIS_URL = env('REDIS_URL', default='redis://redis:6379/0')
@@ -319,6 +347,16 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(hour=1, minute=0),
         'options': {'expires': 3600},
     },
+    'reconcile-dashboard-counters': {
+        'task': 'apps.analytics.tasks.reconcile_dashboard_counters',
+        'schedule': crontab(minute='*/15'),
+        'options': {'expires': 900},
+    },
+    'create-activity-log-partitions': {
+        'task': 'apps.analytics.tasks.create_activity_log_partitions',
+        'schedule': crontab(hour=0, minute=30),
+        'kwargs': {'months_ahead': 3},
+    },
     'cleanup-old-activity-logs': {
         'task': 'apps.analytics.tasks.cleanup_old_activity_logs',
         'schedule': crontab(hour=2, minute=0, day_of_week=0),
@@ -334,8 +372,28 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(minute=0, hour='*/6'),
         'kwargs': {'hours': 24},
     },
+    'enqueue-pending-stripe-events': {
+        'task': 'apps.subscriptions.tasks.enqueue_pending_stripe_events',
+        'schedule': crontab(minute='*/5'),
+        'kwargs': {'older_than_minutes': 5},
+        'options': {'expires': 300},
+    },
 }
 
+# Activity log
+# Buffer audit writes in-process and flush them in batches off the request path;
+# tests write inline so entries are visible to assertions
+ACTIVITY_LOG_BUFFERED = env.bool('ACTIVITY_LOG_BUFFERED', default=not TESTING)
+ACTIVITY_LOG_BUFFER_SIZE = env.int('ACTIVITY_LOG_BUFFER_SIZE', default=5000)
+ACTIVITY_LOG_BATCH_SIZE = env.int('ACTIVITY_LOG_BATCH_SIZE', default=200)
+ACTIVITY_LOG_FLUSH_INTERVAL = env.float('ACTIVITY_LOG_FLUSH_INTERVAL', default=1.0)
+# Flushes a failing record is retried for before it goes to the fallback log
+ACTIVITY_LOG_MAX_ATTEMPTS = env.int('ACTIVITY_LOG_MAX_ATTEMPTS', default=5)
+
+# Invitations
+INVITATION_BULK_MAX_EMAILS = env.int('INVITATION_BULK_MAX_EMAILS', default=1000)
+INVITATION_EMAIL_BATCH_SIZE = env.int('INVITATION_EMAIL_BATCH_SIZE', default=50)
+
 # Email
 if TESTING:
     EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
@@ -362,6 +420,17 @@ STRIPE_SECRET_KEY = env('STRIPE_SECRET_KEY', default='')
 STRIPE_PUBLISHABLE_KEY = env('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_WEBHOOK_SECRET = env('STRIPE_WEBHOOK_SECRET', default='')
 STRIPE_API_VERSION = env('STRIPE_API_VERSION', default='2023-10-16')
+# Store verified webhook events and process them in Celery workers instead of
+# inside the request; tests process inline since they run without a broker
+STRIPE_WEBHOOK_ASYNC = env.bool('STRIPE_WEBHOOK_ASYNC', default=not TESTING)
+STRIPE_WEBHOOK_MAX_ATTEMPTS = env.int('STRIPE_WEBHOOK_MAX_ATTEMPTS', default=8)
+# How long a worker owns a claimed event before another worker may take over
+STRIPE_WEBHOOK_LEASE_SECONDS = env.int('STRIPE_WEBHOOK_LEASE_SECONDS', default=300)
+# Delay before a queued event is processed, so a burst of events about one
+# subscription is coalesced into a single update
+STRIPE_WEBHOOK_COALESCE_SECONDS = env.int('STRIPE_WEBHOOK_COALESCE_SECONDS', default=2)
+# How long clients and proxies may reuse the public plan list before revalidating
+PLAN_LIST_MAX_AGE = env.int('PLAN_LIST_MAX_AGE', default=60)
 
 # AllAuth
 SITE_ID = 1
@@ -499,9 +568,16 @@ ADMINS = [
 ]
 MANAGERS = ADMINS
 
-# Rate Limiting
-RATELIMIT_ENABLE = True
-RATELIMIT_USE_CACHE = 'default'
+# Rate Limiting (apps.core.ratelimit, GCRA on the default cache)
+RATE_LIMIT_ENABLED = env.bool('RATE_LIMIT_ENABLED', default=True)
+
+# Per-organization API quota (apps.subscriptions.quotas) for organizations
+# without a current subscription and for plans whose limits omit the keys;
+# also the per-user/per-address quota of requests outside a verified tenant
+API_QUOTA_DEFAULT_LIMITS = {
+    'api_requests_per_minute': env.int('API_QUOTA_DEFAULT_REQUESTS_PER_MINUTE', default=120),
+    'api_burst': env.int('API_QUOTA_DEFAULT_BURST', default=60),
+}
 
 # Sentry
 if not DEBUG and not TESTING:
@@ -1,8 +1,10 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from apps.accounts.tests.factories import UserFactory
 from apps.organizations.tests.factories import OrganizationFactory, MembershipFactory
+from apps.subscriptions.catalog import PlanCatalog
 
 @pytest.fixture
 def api_client():
@@ -28,3 +30,10 @@ def mock_celery_tasks():
     """Mock all Celery tasks to prevent actual task execution during tests."""
     with patch('apps.core.tasks.send_email_task.delay', return_value=MagicMock()):
         yield
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with empty caches so rate limits and plans do not leak between tests."""
+    cache.clear()
+    PlanCatalog.clear_local()
+    yield